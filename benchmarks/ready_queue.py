@@ -0,0 +1,106 @@
+"""
+Measure the cost of an ExecutionGraph tick on a large study.
+
+A graph of independent chains of steps is built and conducted against a fake
+scheduler that keeps every submitted job running until it is told to finish
+them. The time of the first tick (which submits the head of every chain), of
+an idle tick (where nothing changes) and of a tick where every job in flight
+finishes and the next step of each chain is submitted is reported.
+
+Only the parts of the ExecutionGraph API that predate the ready queue are
+used, so the benchmark can be run on either side of that change.
+
+Usage: python benchmarks/ready_queue.py [number of chains] [chain length]
+"""
+
+import logging
+import sys
+import time
+
+from maestrowf.abstracts.enums import JobStatusCode, State, SubmissionCode
+from maestrowf.datastructures.core import ExecutionGraph, StudyStep
+from maestrowf.interfaces import ScriptAdapterFactory
+
+SOURCE = "_source"
+
+
+class FakeScheduler(object):
+    """A scheduler adapter that runs jobs until they are finished."""
+
+    jobs = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, step, path, cwd):
+        """Submit a job, which runs until 'finish_all' is called."""
+        jobid = str(len(self.jobs))
+        self.jobs[jobid] = State.RUNNING
+        return SubmissionCode.OK, jobid
+
+    def check_jobs(self, joblist):
+        """Report the state of the requested jobs."""
+        return JobStatusCode.OK, \
+            dict((jobid, self.jobs[jobid]) for jobid in joblist)
+
+    @classmethod
+    def finish_all(cls):
+        """Finish every job that is running."""
+        for jobid, state in cls.jobs.items():
+            if state == State.RUNNING:
+                cls.jobs[jobid] = State.FINISHED
+
+
+def build_graph(num_chains, length):
+    """Build a graph of independent chains of scheduled steps."""
+    dag = ExecutionGraph()
+    dag.add_description("ready_queue", "A large synthetic study.")
+    dag.add_node(SOURCE, None)
+    for i in range(num_chains):
+        parent = SOURCE
+        for j in range(length):
+            step = StudyStep()
+            step.name = "step{}_X.{}".format(j, i)
+            step.run["walltime"] = "00:10:00"
+            dag.add_step(step.name, step, "/study/X.{}".format(i), 0)
+            dag.add_edge(parent, step.name)
+            record = dag.values[step.name]
+            record.to_be_scheduled = True
+            record.script = "/study/X.{}/{}.sh".format(i, step.name)
+            parent = step.name
+    dag.set_adapter({"type": "fake"})
+    return dag
+
+
+def measure(label, tick):
+    """Time a tick and print the result."""
+    start = time.time()
+    tick()
+    print("{:<34} {:>8.3f}s".format(label, time.time() - start))
+
+
+def main():
+    num_chains = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    logging.disable(logging.CRITICAL)
+    ScriptAdapterFactory.factories["fake"] = FakeScheduler
+    dag = build_graph(num_chains, length)
+
+    print("Steps: {} in {} chains".format(num_chains * length, num_chains))
+    measure("first tick (submit chain heads)", dag.execute_ready_steps)
+    measure("idle tick", dag.execute_ready_steps)
+    measure("idle tick", dag.execute_ready_steps)
+    FakeScheduler.finish_all()
+    try:
+        measure("tick finishing {} jobs".format(num_chains),
+                dag.execute_ready_steps)
+    except TypeError:
+        # Before the ready queue, finishing a job called mark_end() without
+        # a state.
+        print("tick finishing {} jobs: not supported".format(num_chains))
+        return
+    measure("idle tick", dag.execute_ready_steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Measure the memory and pickle size of the step records of an ExecutionGraph.
+
+A graph of independent steps is built and every step is taken through a
+complete run (submitted, running, finished) so that all of the execution
+state of each record is populated. The memory held by the graph and its
+records (excluding the StudySteps, which are built before measuring) and the
+size and timing of a pickle of the graph are reported.
+
+The records alone are then compared against a baseline of dict-backed
+records, laid out the way step records were before they used __slots__ (a
+State, datetime timestamps and a list of job identifiers per record), and
+against the RecordTable that graphs are pickled with.
+
+Usage: python benchmarks/record_memory.py [number of steps]
+"""
+
+from datetime import datetime
+import gc
+import logging
+import pickle
+import sys
+import time
+import tracemalloc
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import ExecutionGraph, StudyStep
+from maestrowf.datastructures.core.executiongraph import RecordTable, \
+    _StepRecord
+
+SOURCE = "_source"
+
+
+class DictRecord(object):
+    """A step record that keeps its state in a per-instance dictionary."""
+
+    def __init__(self, step, workspace):
+        """Initialize a record the way records were before __slots__."""
+        self.workspace = workspace
+        self.jobid = []
+        self.script = ""
+        self.restart_script = ""
+        self.to_be_scheduled = False
+        self.step = step
+        self.restart_limit = 1
+        self._num_restarts = 0
+        self._submit_time = None
+        self._start_time = None
+        self._end_time = None
+        self.status = State.INITIALIZED
+
+    def mark_submitted(self):
+        """Mark the submission time of the record."""
+        self.status = State.PENDING
+        self._submit_time = datetime.now()
+
+    def mark_running(self):
+        """Mark the start time of the record."""
+        self.status = State.RUNNING
+        self._start_time = datetime.now()
+
+    def mark_end(self, state):
+        """Mark the end time of the record."""
+        self.status = state
+        self._end_time = datetime.now()
+
+
+def build_steps(num_steps):
+    """Build the steps of the study, one per combination of a parameter."""
+    steps = []
+    for i in range(num_steps):
+        step = StudyStep()
+        step.name = "step_X.{}".format(i)
+        step.description = "A parameterized step."
+        step.run["cmd"] = "echo {}".format(i)
+        step.run["walltime"] = "00:10:00"
+        steps.append((step.name, step, "/study/X.{}".format(i), 1))
+    return steps
+
+
+def run_record(record, name, workspace):
+    """Take a record through a complete run."""
+    record.script = "{}/{}.sh".format(workspace, name)
+    record.mark_submitted()
+    record.mark_running()
+    if isinstance(record.jobid, list):
+        record.jobid.append(name)
+    else:
+        record.jobid += (name,)
+    record.mark_end(State.FINISHED)
+
+
+def time_pickle(obj):
+    """Pickle and unpickle an object, returning the size and timings."""
+    start = time.time()
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    dump_time = time.time() - start
+    start = time.time()
+    pickle.loads(data)
+    load_time = time.time() - start
+    return len(data), dump_time, load_time
+
+
+def measure_records(steps, make_record):
+    """Build and run a list of records, returning them and their memory."""
+    gc.collect()
+    tracemalloc.start()
+    records = []
+    for name, step, workspace, _ in steps:
+        record = make_record(step, workspace)
+        run_record(record, name, workspace)
+        records.append(record)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, memory
+
+
+def main():
+    num_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logging.disable(logging.CRITICAL)
+    steps = build_steps(num_steps)
+
+    gc.collect()
+    tracemalloc.start()
+    dag = ExecutionGraph()
+    dag.add_node(SOURCE, None)
+    dag.add_steps_from(steps)
+    dag.add_edges_from((SOURCE, name) for name, _, _, _ in steps)
+    staged = tracemalloc.get_traced_memory()[0]
+
+    for name, step, workspace, _ in steps:
+        run_record(dag.values[name], name, workspace)
+    gc.collect()
+    finished = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    dag.set_adapter({"type": "local"})
+    size, dump_time, load_time = time_pickle(dag)
+
+    print("Steps:                   {}".format(num_steps))
+    print("Graph memory (staged):   {:.1f} MB".format(staged / 1e6))
+    print("Graph memory (finished): {:.1f} MB".format(finished / 1e6))
+    print("Pickle size:             {:.1f} MB".format(size / 1e6))
+    print("Pickle dump / load:      {:.2f}s / {:.2f}s"
+          .format(dump_time, load_time))
+    del dag
+
+    print("")
+    print("{:<22} {:>10} {:>12} {:>8} {:>8}".format(
+        "Records", "Memory", "Pickle size", "Dump", "Load"))
+    dict_records, dict_memory = measure_records(steps, DictRecord)
+    slot_records, slot_memory = measure_records(
+        steps, lambda step, workspace: _StepRecord(
+            step=step, workspace=workspace, restart_limit=1))
+    for label, memory, obj in (
+            ("dict (baseline)", dict_memory, dict_records),
+            ("__slots__", slot_memory, slot_records),
+            ("RecordTable", None, RecordTable(slot_records))):
+        size, dump_time, load_time = time_pickle(obj)
+        memory = "--" if memory is None else \
+            "{:.1f} MB".format(memory / 1e6)
+        print("{:<22} {:>10} {:>9.1f} MB {:>7.2f}s {:>7.2f}s".format(
+            label, memory, size / 1e6, dump_time, load_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare ExecutionGraph snapshots with pickles.
+
+A graph with two steps per parameter combination (the second depending on
+the first) is built from two template steps, as a study expands them when it
+is staged, and every step is taken through a complete run. The
+graph is then written as a pickle, an uncompressed snapshot and a zlib
+compressed snapshot, and the size and dump and load times of each are
+reported.
+
+Usage: python benchmarks/snapshot_load.py [number of combinations]
+"""
+
+import logging
+import pickle
+import sys
+import time
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import ExecutionGraph, StudyStep
+from maestrowf.datastructures.core import snapshot
+from maestrowf.datastructures.core.study import ExpandedStep
+
+SOURCE = "_source"
+
+
+def build_graph(num_combos):
+    """Build a finished graph of two steps per combination."""
+    templates = {}
+    for name in ("run", "post"):
+        template = StudyStep()
+        template.name = name
+        template.description = "A parameterized step."
+        template.run["cmd"] = "./simulate --x $(X) > out.txt"
+        template.run["walltime"] = "00:10:00"
+        template.run["nodes"] = 1
+        templates[name] = template
+
+    steps = []
+    edges = []
+    for i in range(num_combos):
+        workspace = "/study/X.{}".format(i)
+        for name, parent in (("run", SOURCE), ("post", "run")):
+            # Expand the step the way Study does when it is staged.
+            step = ExpandedStep(templates[name],
+                                "{}_X.{}".format(name, i))
+            run = step.run
+            run["cmd"] = "./simulate --x {} > out.txt".format(i)
+            if parent != SOURCE:
+                parent = "{}_X.{}".format(parent, i)
+                run["depends"] = [parent]
+            step.run = run
+            steps.append((step.name, step, workspace, 1))
+            edges.append((parent, step.name))
+
+    dag = ExecutionGraph()
+    dag.add_node(SOURCE, None)
+    dag.add_steps_from(steps)
+    dag.add_edges_from(edges)
+    for name, step, workspace, _ in steps:
+        record = dag.values[name]
+        record.script = "{}/{}.sh".format(workspace, name)
+        record.mark_submitted()
+        record.mark_running()
+        record.jobid += (name,)
+        record.mark_end(State.FINISHED)
+        dag.completed_steps.add(name)
+    dag.set_adapter({"type": "local"})
+    return dag
+
+
+def measure(label, dumps, loads):
+    """Time one dump and one load and print the results."""
+    start = time.time()
+    data = dumps()
+    dump_time = time.time() - start
+    start = time.time()
+    loads(data)
+    load_time = time.time() - start
+    print("{:<22} {:>8.1f} MB {:>8.2f}s {:>8.2f}s"
+          .format(label, len(data) / 1e6, dump_time, load_time))
+
+
+def main():
+    num_combos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    logging.disable(logging.CRITICAL)
+    dag = build_graph(num_combos)
+
+    print("Steps: {}".format(2 * num_combos))
+    print("{:<22} {:>11} {:>9} {:>9}".format(
+        "Format", "Size", "Dump", "Load"))
+    measure("pickle",
+            lambda: pickle.dumps(dag, pickle.HIGHEST_PROTOCOL),
+            pickle.loads)
+    measure("snapshot",
+            lambda: snapshot.dumps(dag),
+            snapshot.loads)
+    measure("snapshot (zlib)",
+            lambda: snapshot.dumps(dag, compress=True),
+            snapshot.loads)
+
+
+if __name__ == "__main__":
+    main()
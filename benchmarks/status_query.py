@@ -0,0 +1,130 @@
+"""
+Compare 'maestro -s' queries on status.csv and status.bin.
+
+A graph with two steps per parameter combination is built and a few of its
+steps are marked as failed. Its status files are written, and the time to
+answer a full listing, a query for failed steps, a query for the steps of
+one name prefix and a state summary is reported for each file. The status
+files are read fresh for every query, as 'maestro -s' does.
+
+Usage: python benchmarks/status_query.py [number of combinations]
+"""
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import ExecutionGraph, StatusFile, \
+    StudyStep
+from maestrowf.utils import csvtable_to_dict
+
+SOURCE = "_source"
+
+
+def build_graph(num_combos):
+    """Build a graph of two steps per combination, with some failed."""
+    steps = []
+    edges = []
+    for i in range(num_combos):
+        workspace = "/study/X.{}".format(i)
+        for name, parent in (("sim", SOURCE), ("post", "sim")):
+            step = StudyStep()
+            step.name = "{}_X.{}".format(name, i)
+            if parent != SOURCE:
+                parent = "{}_X.{}".format(parent, i)
+            steps.append((step.name, step, workspace, 0))
+            edges.append((parent, step.name))
+
+    dag = ExecutionGraph()
+    dag.add_node(SOURCE, None)
+    dag.add_steps_from(steps)
+    dag.add_edges_from(edges)
+    for name, _, _, _ in steps[::1000]:
+        record = dag.values[name]
+        record.mark_submitted()
+        record.mark_running()
+        record.mark_end(State.FAILED)
+    return dag
+
+
+def measure(label, query):
+    """Time a query and print the results."""
+    start = time.time()
+    rows = query()
+    print("{:<34} {:>8} rows {:>8.3f}s"
+          .format(label, rows, time.time() - start))
+
+
+def csv_query(path, state=None, prefix=None):
+    """Answer a query the way 'maestro -s' does for status.csv."""
+    with open(path, "r") as stat_file:
+        table = csvtable_to_dict(stat_file)
+    rows = range(len(table["Step Name"]))
+    if state:
+        rows = [row for row in rows if table["State"][row] == state]
+    if prefix:
+        rows = [row for row in rows
+                if table["Step Name"][row].startswith(prefix)]
+    return len(rows)
+
+
+def csv_summary(path):
+    """Count steps by state in status.csv."""
+    with open(path, "r") as stat_file:
+        table = csvtable_to_dict(stat_file)
+    counts = {}
+    for state in table["State"]:
+        counts[state] = counts.get(state, 0) + 1
+    return len(counts)
+
+
+def bin_query(path, states=None, patterns=None):
+    """Answer a query from status.bin."""
+    status = StatusFile(path)
+    table = status.status_table(states, patterns)
+    status.close()
+    return len(table["Step Name"])
+
+
+def bin_summary(path):
+    """Count steps by state in status.bin."""
+    status = StatusFile(path)
+    counts = status.count_by_state()
+    status.close()
+    return len(counts)
+
+
+def main():
+    num_combos = int(sys.argv[1]) if len(sys.argv) > 1 else 150000
+    logging.disable(logging.CRITICAL)
+    dag = build_graph(num_combos)
+    path = tempfile.mkdtemp()
+    try:
+        dag.write_status(path)
+        stat_csv = os.path.join(path, "status.csv")
+        stat_bin = os.path.join(path, "status.bin")
+        failed = str(State.FAILED)
+
+        print("Steps: {}".format(2 * num_combos))
+        measure("csv: all steps", lambda: csv_query(stat_csv))
+        measure("csv: --state FAILED",
+                lambda: csv_query(stat_csv, state=failed))
+        measure("csv: --step sim_X.1234*",
+                lambda: csv_query(stat_csv, prefix="sim_X.1234"))
+        measure("csv: --summary", lambda: csv_summary(stat_csv))
+        measure("bin: all steps", lambda: bin_query(stat_bin))
+        measure("bin: --state FAILED",
+                lambda: bin_query(stat_bin, states=[State.FAILED]))
+        measure("bin: --step sim_X.1234*",
+                lambda: bin_query(stat_bin, patterns=["sim_X.1234*"]))
+        measure("bin: --summary", lambda: bin_summary(stat_bin))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
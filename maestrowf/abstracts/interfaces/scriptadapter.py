@@ -32,6 +32,7 @@ from abc import ABCMeta, abstractmethod
 import logging
 import os
 import six
+from six.moves import shlex_quote
 import stat
 
 LOGGER = logging.getLogger(__name__)
@@ -83,18 +84,30 @@ class ScriptAdapter(object):
         """
         pass
 
-    def write_script(self, ws_path, step):
+    def write_script(self, ws_path, step, sentinel=None):
         """
         Generate the script for the specified StudyStep.
 
+        If a sentinel is specified and the step is to be scheduled, the
+        scripts write their exit code to the sentinel file when they exit so
+        that a conductor learns that the step ended without having to ask the
+        scheduler.
+
         :param ws_path: Workspace path for the step.
         :param step: An instance of a StudyStep class.
+        :param sentinel: Path of the file scheduled scripts write their exit
+        code to (None to not write one).
         :returns: A tuple containing a boolean set to True if step should be
         scheduled (False otherwise), path to the generate script, and path
         to the generated restart script (None if step cannot be restarted).
         """
         to_be_scheduled, script_path, restart_path = \
             self._write_script(ws_path, step)
+        if to_be_scheduled and sentinel:
+            self._add_sentinel(script_path, sentinel)
+            if restart_path:
+                self._add_sentinel(restart_path, sentinel)
+
         st = os.stat(script_path)
         os.chmod(script_path, st.st_mode | stat.S_IXUSR)
 
@@ -104,6 +117,39 @@ class ScriptAdapter(object):
 
         return to_be_scheduled, script_path, restart_path
 
+    @staticmethod
+    def _add_sentinel(script_path, sentinel):
+        """
+        Make a script write its exit code to a sentinel file when it exits.
+
+        The exit code is written to a temporary file that is then renamed,
+        so a reader never sees a partially written sentinel. The trap is
+        placed after the leading comments of the script so that scheduler
+        directives in the header are still read.
+
+        :param script_path: Path to the script to modify.
+        :param sentinel: Path of the file to write the exit code to.
+        """
+        tmp_path = shlex_quote(sentinel + ".tmp")
+        trap = [
+            "maestro_sentinel() {{ echo \"$1\" > {0} && mv {0} {1}; }}"
+            .format(tmp_path, shlex_quote(sentinel)),
+            "trap 'maestro_sentinel $?' EXIT",
+        ]
+
+        with open(script_path, "r") as script:
+            lines = script.read().split("\n")
+
+        index = 0
+        while index < len(lines) and \
+                (not lines[index].strip() or
+                 lines[index].lstrip().startswith("#")):
+            index += 1
+        lines[index:index] = trap
+
+        with open(script_path, "w") as script:
+            script.write("\n".join(lines))
+
     @abstractmethod
     def submit(self, step, path, cwd, job_map=None, env=None):
         """
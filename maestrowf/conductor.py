@@ -29,15 +29,26 @@
 
 from argparse import ArgumentParser, RawTextHelpFormatter
 from datetime import datetime
+import errno
 import glob
 import inspect
 import logging
 import os
+import sqlite3
 import sys
-from time import sleep
+import tempfile
+from time import sleep, time
 
-from maestrowf.datastructures.core import ExecutionGraph
-from maestrowf.utils import create_parentdir
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 only has the polling conductor.
+    asyncio = None
+
+from maestrowf.datastructures.core import ExecutionGraph, ShardStore, \
+    StateStore, Throttle
+from maestrowf.utils import create_parentdir, find_store
 
 # Logger instantiation
 rootlogger = logging.getLogger(inspect.getmodule(__name__))
@@ -47,6 +58,9 @@ logger = logging.getLogger(__name__)
 LFORMAT = "%(asctime)s - %(name)s:%(funcName)s:%(lineno)s - " \
                "%(levelname)s - %(message)s"
 
+# Where a conductor daemon keeps its pid file, logs and registered studies.
+DAEMON_DIR = os.path.join(os.path.expanduser("~"), ".maestrowf", "conductor")
+
 
 def setup_argparser():
     """
@@ -58,9 +72,10 @@ def setup_argparser():
                             "study.",
                             formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument("directory", type=str, help="The directory where"
-                        "a study has been set up and where a pickle file"
-                        " of an ExecutionGraph is stored.")
+    parser.add_argument("directory", type=str, nargs="?",
+                        help="The directory where a study has been set up "
+                        "and where a pickle file of an ExecutionGraph is "
+                        "stored. Optional with --daemon.")
     parser.add_argument("-s", "--status", action="store_true",
                         help="Check the status of the ExecutionGraph "
                         "located as specified by the 'directory' "
@@ -79,15 +94,58 @@ def setup_argparser():
     parser.add_argument("-t", "--sleeptime", type=int, default=60,
                         help="Amount of time (in seconds) for the manager to "
                         "wait between job status checks.")
+    parser.add_argument("-r", "--recover", action="store_true",
+                        help="Reconcile the state of every submitted step "
+                        "with the scheduler before resuming (use when "
+                        "restarting a conductor that stopped).")
+    parser.add_argument("-p", "--poll", action="store_true",
+                        help="Use the polling loop, which submits steps "
+                        "only once every SLEEPTIME seconds, instead of the "
+                        "event driven conductor.")
+    parser.add_argument("-D", "--daemon", action="store_true",
+                        help="Conduct every study registered with the "
+                        "conductor daemon from this process, checking the "
+                        "scheduler once per SLEEPTIME for all of them. The "
+                        "study in 'directory', if given, is registered "
+                        "first.")
+    parser.add_argument("--daemon_dir", type=str, default=DAEMON_DIR,
+                        help="Directory of the conductor daemon [Default: "
+                        "{}].".format(DAEMON_DIR))
+    parser.add_argument("--max_in_flight", type=int,
+                        help="Most steps in progress at once. With --daemon, "
+                        "the limit is shared by the studies that use the "
+                        "same adapter settings.")
+    parser.add_argument("--max_submissions", type=int,
+                        help="Most steps submitted between two job status "
+                        "checks. Shared like --max_in_flight.")
+    parser.add_argument("--submit_rate", type=float,
+                        help="Most steps submitted per second, on average. "
+                        "Shared like --max_in_flight.")
+    parser.add_argument("--submit_burst", type=int,
+                        help="Most steps submitted at once under "
+                        "--submit_rate [Default: the rate rounded up].")
+    parser.add_argument("-a", "--adaptive", action="store_true",
+                        help="Adapt the time between job status checks, "
+                        "starting from SLEEPTIME. Checks are made sooner "
+                        "when steps are expected to finish or are finishing, "
+                        "and back off while only long running or queued "
+                        "steps remain.")
+    parser.add_argument("--min_sleeptime", type=int, default=5,
+                        help="Shortest time (in seconds) between adaptive job "
+                        "status checks [Default: 5].")
+    parser.add_argument("--max_sleeptime", type=int, default=900,
+                        help="Longest time (in seconds) between adaptive job "
+                        "status checks [Default: 900].")
 
     return parser
 
 
-def setup_logging(args, name):
+def setup_logging(args, path, name):
     """
     Method for setting up logging in the Main class.
 
     :param args: A Namespace object created by a parsed ArgumentParser.
+    :param path: The directory whose 'logs' subdirectory holds the log.
     :param name: The name of the log file.
     """
     # Check if the user has specified a custom log path.
@@ -96,7 +154,7 @@ def setup_logging(args, name):
                     args.logpath)
         log_path = args.logpath
     else:
-        log_path = os.path.join(args.directory, "logs")
+        log_path = os.path.join(path, "logs")
 
     loglevel = args.debug_lvl * 10
 
@@ -124,45 +182,815 @@ def setup_logging(args, name):
     logger.debug("DEBUG Logging Level -- Enabled")
 
 
+class AdaptivePoll(object):
+    """
+    Chooses the time between scheduler status checks.
+
+    The interval halves (or more) for every poll in which steps finish and
+    doubles for every poll in which none do, within a floor and a ceiling.
+    It is also cut short so that the next check happens when an in progress
+    step is next expected to finish.
+    """
+
+    def __init__(self, interval, floor, ceiling):
+        """
+        Initialize an AdaptivePoll.
+
+        :param interval: The initial number of seconds between checks.
+        :param floor: The fewest number of seconds between checks.
+        :param ceiling: The most number of seconds between checks.
+        """
+        if floor > ceiling:
+            msg = "The minimum poll interval ({}) is larger than the " \
+                  "maximum ({}).".format(floor, ceiling)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.floor = floor
+        self.ceiling = ceiling
+        self.interval = min(max(interval, floor), ceiling)
+
+    def next_interval(self, finished, eta):
+        """
+        Compute the time until the next status check.
+
+        :param finished: The number of steps that finished since the last
+        check.
+        :param eta: Estimated seconds until an in progress step finishes, or
+        None if there is no estimate.
+        :returns: The number of seconds to wait.
+        """
+        if finished:
+            # Steps are finishing, and more are likely to follow.
+            interval = self.interval / (1.0 + finished)
+        else:
+            # Only long running or queued steps remain, so back off.
+            interval = self.interval * 2.0
+        self.interval = min(max(interval, self.floor), self.ceiling)
+        return self.until(eta)
+
+    def until(self, eta):
+        """
+        Limit the current interval to an expected finish.
+
+        :param eta: Estimated seconds until an in progress step finishes, or
+        None if there is no estimate.
+        :returns: The number of seconds to wait.
+        """
+        if eta is None:
+            return self.interval
+        return min(self.interval, max(eta, self.floor))
+
+
+class EventConductor(object):
+    """
+    An event driven conductor for an ExecutionGraph.
+
+    Scheduler polls, step submission, persistence of the graph and status
+    writes are separate tasks on an asyncio event loop. A poll or a
+    submission that releases steps triggers a submission right away, so a
+    step whose dependencies finished is submitted without waiting for the
+    next poll. The scheduler is still queried once every 'sleeptime'
+    seconds (or as chosen by an AdaptivePoll), and persistence and status
+    writes are batched to at most one per 'flush_interval' seconds.
+
+    If the study's scripts write sentinels (see
+    ExecutionGraph.set_sentinel_dir), the sentinel directory is watched
+    every 'sentinel_interval' seconds. Steps that exited successfully
+    release their children right away, and a step that exited with an
+    error triggers a status check.
+
+    Every operation on the graph runs, one at a time, on a single worker
+    thread so that the event loop stays responsive while steps execute.
+    """
+
+    def __init__(self, dag, persist, write_status, sleeptime,
+                 flush_interval=1.0, adaptive=None, sentinel_interval=1.0):
+        """
+        Initialize an EventConductor.
+
+        :param dag: The ExecutionGraph to conduct.
+        :param persist: A callable that persists the graph. It is passed True
+        once the study is complete.
+        :param write_status: A callable that writes the status of the study,
+        called with True once the study is complete.
+        :param sleeptime: Seconds between scheduler status checks.
+        :param flush_interval: Minimum seconds between persisting the graph
+        and writing its status.
+        :param adaptive: An AdaptivePoll that chooses the time between
+        status checks instead of 'sleeptime'.
+        :param sentinel_interval: Seconds between checks for sentinels.
+        """
+        self.dag = dag
+        self._persist = persist
+        self._write_status = write_status
+        self.sleeptime = sleeptime
+        self.flush_interval = flush_interval
+        self.adaptive = adaptive
+        self.sentinel_interval = sentinel_interval
+
+        self._loop = None
+        self._executor = None
+        self._error = None
+        self._poll_timer = None
+        self._poll_due = None
+        self._polling = False
+        self._submitting = False
+        self._resubmit = False
+        self._flush_timer = None
+        self._watch_timer = None
+        self._submit_timer = None
+        self._complete = False
+
+    def run(self):
+        """Conduct the study until it completes."""
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            self._loop.call_soon(self._poll)
+            if self.dag.sentinel_dir:
+                self._loop.call_soon(self._watch)
+            self._loop.run_forever()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._loop.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def _run(self, func, callback, *args):
+        """
+        Run a graph operation on the worker thread.
+
+        :param func: The callable to run.
+        :param callback: Called on the event loop with the result of func.
+        :param args: Arguments for func.
+        """
+        def done(future):
+            try:
+                callback(future.result())
+            except Exception as error:
+                logger.exception("Conductor task failed -- Aborting.")
+                self._error = error
+                self._loop.stop()
+
+        future = self._loop.run_in_executor(self._executor, func, *args)
+        future.add_done_callback(done)
+
+    def _poll(self):
+        """Check the status of the in progress steps."""
+        if self._polling or self._complete:
+            return
+
+        if self._poll_timer is not None:
+            self._poll_timer.cancel()
+            self._poll_timer = None
+
+        logger.info("Checking DAG status at %s", str(datetime.now()))
+        self._polling = True
+        self._run(self._poll_steps, self._polled)
+
+    def _poll_steps(self):
+        finished = self.dag.poll_steps()
+        eta = self.dag.time_to_next_finish() if self.adaptive else None
+        return finished, eta
+
+    def _polled(self, result):
+        self._polling = False
+        if self.adaptive:
+            finished, eta = result
+            self._schedule_poll(self.adaptive.next_interval(finished, eta))
+        else:
+            self._schedule_poll(self.sleeptime)
+        self._submit()
+
+    def _schedule_poll(self, delay):
+        """Check the status of the study in 'delay' seconds."""
+        if self._poll_timer is not None:
+            self._poll_timer.cancel()
+        logger.debug("Next status check in %.1f seconds.", delay)
+        self._poll_due = self._loop.time() + delay
+        self._poll_timer = self._loop.call_later(delay, self._poll)
+
+    def _submit(self):
+        """Submit the steps that are ready to run."""
+        if self._complete:
+            return
+        if self._submitting:
+            # Submit again once the running submission is done.
+            self._resubmit = True
+            return
+
+        self._submitting = True
+        self._resubmit = False
+        self._run(self._submit_ready_steps, self._submitted)
+
+    def _submit_ready_steps(self):
+        count = self.dag.submit_ready_steps()
+        eta = None
+        if count and self.adaptive:
+            eta = self.dag.time_to_next_finish()
+        return count, self.dag.has_ready_steps(), self.dag.is_complete(), \
+            eta, self.dag.submit_delay()
+
+    def _submitted(self, result):
+        count, ready, complete, eta, delay = result
+        self._submitting = False
+        if complete:
+            self._finish()
+            return
+
+        if delay is not None and self._submit_timer is None:
+            # Steps are held by the submission rate, so submit them as soon
+            # as it allows rather than at the next status check.
+            self._submit_timer = \
+                self._loop.call_later(delay, self._submit_held)
+
+        if eta is not None and self._poll_timer is not None:
+            # A step that was just submitted may finish before the next
+            # status check.
+            delay = self.adaptive.until(eta)
+            if self._loop.time() + delay < self._poll_due:
+                self._schedule_poll(delay)
+
+        self._request_flush()
+        if self._resubmit or (count and ready):
+            # Steps that ran locally have released their children.
+            self._loop.call_soon(self._submit)
+
+    def _submit_held(self):
+        self._submit_timer = None
+        self._submit()
+
+    def _watch(self):
+        """Check for steps that reported that they exited."""
+        self._watch_timer = None
+        if self._complete:
+            return
+
+        if self.dag.has_sentinels():
+            self._run(self.dag.check_sentinels, self._sentinels_checked)
+        else:
+            self._watch_timer = \
+                self._loop.call_later(self.sentinel_interval, self._watch)
+
+    def _sentinels_checked(self, result):
+        finished, errors = result
+        if errors:
+            # Let the scheduler report how the steps ended.
+            self._poll()
+        elif finished:
+            self._submit()
+        self._watch_timer = \
+            self._loop.call_later(self.sentinel_interval, self._watch)
+
+    def _request_flush(self):
+        """Persist the graph and write its status once the interval ends."""
+        if self._flush_timer is None:
+            self._flush_timer = \
+                self._loop.call_later(self.flush_interval, self._flush)
+
+    def _flush(self):
+        self._run(self._persist_and_write, self._flushed, False)
+
+    def _flushed(self, result):
+        self._flush_timer = None
+
+    def _persist_and_write(self, complete):
+        self._persist(complete)
+        self._write_status(complete)
+
+    def _finish(self):
+        """Persist the completed study and stop the event loop."""
+        logger.info("'%s' is complete.", self.dag.name)
+        self._complete = True
+        if self._poll_timer is not None:
+            self._poll_timer.cancel()
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        if self._watch_timer is not None:
+            self._watch_timer.cancel()
+        if self._submit_timer is not None:
+            self._submit_timer.cancel()
+        self._run(self._persist_and_write, lambda result: self._loop.stop(),
+                  True)
+
+
+class ConductedStudy(object):
+    """
+    A study directory and the ExecutionGraph conducted from it.
+
+    The graph is loaded from the study's state store if it has one (as
+    recorded by maestrowf.utils.mark_store), otherwise it is unpickled.
+    """
+
+    def __init__(self, directory):
+        """
+        Load the ExecutionGraph of a study.
+
+        :param directory: The directory where the study has been set up.
+        """
+        self.directory = os.path.abspath(directory)
+        self.store = None
+        study_store = find_store(self.directory)
+        study_pkl = glob.glob(os.path.join(self.directory, "*.pkl"))
+        if study_store is not None:
+            if not os.path.exists(study_store):
+                msg = "State store '{}' not found. Aborting." \
+                      .format(study_store)
+                raise IOError(msg)
+            self.study_file = study_store
+            if study_store.endswith(".shards"):
+                self.store = ShardStore(self.study_file)
+            else:
+                self.store = StateStore(self.study_file)
+            self.dag = self.store.load()
+        # We expect only a single pickle file.
+        elif len(study_pkl) == 1:
+            self.study_file = study_pkl[0]
+            self.dag = ExecutionGraph.unpickle(self.study_file)
+        elif study_pkl:
+            msg = "More than one pickle found. Expected only one. Aborting."
+            raise ValueError(msg)
+        else:
+            msg = "No pickle or state store found. Aborting."
+            raise IOError(msg)
+
+    def persist(self, study_complete):
+        """
+        Persist the state of the study.
+
+        :param study_complete: True if the study has completed.
+        """
+        if self.store:
+            # The state store holds the status, so only the rows (or shards)
+            # of steps that changed need to be written.
+            self.store.commit(self.dag)
+        elif study_complete:
+            # Re-pickle the ExecutionGraph once the study is done.
+            self.dag.pickle(self.study_file)
+        else:
+            # Journal the steps that changed.
+            self.dag.checkpoint(self.study_file)
+
+    def write_status(self, study_complete=False):
+        """
+        Write the status of a study that is not kept in a state store.
+
+        status.csv and status.bin are kept up to date as the study runs.
+
+        :param study_complete: True if the study has completed.
+        """
+        if not self.store:
+            self.dag.write_status(os.path.split(self.study_file)[0])
+
+    def close(self):
+        """Close the state store of the study, if it has one."""
+        if self.store:
+            self.store.close()
+
+
+def daemon_running(daemon_dir=DAEMON_DIR):
+    """
+    Check whether a conductor daemon is running.
+
+    :param daemon_dir: The directory of the daemon.
+    :returns: True if the process in the daemon's pid file is alive.
+    """
+    try:
+        with open(os.path.join(daemon_dir, "conductor.pid")) as pid_file:
+            pid = int(pid_file.read())
+    except (IOError, OSError, ValueError):
+        return False
+
+    try:
+        os.kill(pid, 0)
+    except OSError as exception:
+        # The process exists but belongs to someone else.
+        return exception.errno == errno.EPERM
+    return True
+
+
+def register_study(directory, daemon_dir=DAEMON_DIR):
+    """
+    Register a study to be conducted by the conductor daemon.
+
+    The registration is kept until the daemon finishes conducting the study,
+    so a daemon that is restarted picks the study back up.
+
+    :param directory: The directory where the study has been set up.
+    :param daemon_dir: The directory of the daemon.
+    :returns: True if a running daemon will pick the study up, False if a
+    daemon needs to be started.
+    """
+    study_dir = os.path.join(daemon_dir, "studies")
+    create_parentdir(study_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=study_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as registration:
+        registration.write(os.path.abspath(directory))
+    os.rename(tmp_path, tmp_path[:-len(".tmp")] + ".study")
+
+    # Register before checking for a daemon. A daemon only exits after it
+    # releases its pid file and finds no new registrations.
+    return daemon_running(daemon_dir)
+
+
+def _adapter_key(dag):
+    """Get a key that is equal for graphs with equal adapter settings."""
+    return repr(sorted(dag.adapter.items()))
+
+
+def _unrecoverable(error):
+    """
+    Check if an error means that a study can not be conducted any further.
+
+    :param error: An exception raised while conducting a study.
+    :returns: True if the study's state store is damaged, False if the
+    error may go away (for example, a scheduler or file system that is not
+    responding, or a database that is locked or full).
+    """
+    return isinstance(error, sqlite3.DatabaseError) and \
+        not isinstance(error, sqlite3.OperationalError)
+
+
+class ConductorDaemon(object):
+    """
+    Conducts every study registered with it from a single process.
+
+    The daemon checks the scheduler once per tick for all of its studies
+    (once per adapter configuration, see ExecutionGraph.query_scheduler),
+    and fans the job states out to each study's ExecutionGraph. Studies are
+    registered by dropping a file with the study directory in the daemon's
+    'studies' directory (see register_study). The daemon exits once it has
+    no studies left.
+
+    Between ticks, the sentinel directories of the studies are checked every
+    'sentinel_interval' seconds. A step that reported that it exited wakes
+    the daemon, which releases the children of steps that finished without
+    a scheduler query, and queries the scheduler early only if a step
+    exited with an error.
+
+    Submission limits given to the daemon apply to each adapter
+    configuration, shared by every study that uses it, on top of the limits
+    of each study.
+
+    A study that raises an error is retried at the next tick, and is only
+    dropped if its state store is damaged.
+    """
+
+    def __init__(self, daemon_dir, sleeptime, adaptive=None,
+                 sentinel_interval=1.0, limits=None):
+        """
+        Initialize a ConductorDaemon.
+
+        :param daemon_dir: The directory of the daemon.
+        :param sleeptime: Seconds between scheduler status checks.
+        :param adaptive: An AdaptivePoll that chooses the time between
+        status checks instead of 'sleeptime'.
+        :param sentinel_interval: Seconds between checks for sentinels.
+        :param limits: A dictionary of Throttle settings for each adapter
+        configuration.
+        """
+        self.daemon_dir = daemon_dir
+        self.sleeptime = sleeptime
+        self.adaptive = adaptive
+        self.sentinel_interval = sentinel_interval
+        self.limits = limits or {}
+        # Adapter configurations to the Throttle shared by their studies.
+        self._throttles = {}
+        # When steps held by a submission rate can next be submitted.
+        self._resume = None
+        self._pid_path = os.path.join(daemon_dir, "conductor.pid")
+        self._study_dir = os.path.join(daemon_dir, "studies")
+        # Registration file paths to the ConductedStudy they registered.
+        self._studies = {}
+        # Registration file paths to the number of ticks in a row in which
+        # their study raised an error.
+        self._failures = {}
+
+    def acquire(self):
+        """
+        Take ownership of the daemon directory.
+
+        :returns: True if this process is now the daemon, False if another
+        daemon is already running.
+        """
+        create_parentdir(self._study_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=self.daemon_dir, suffix=".pid")
+        with os.fdopen(fd, "w") as pid_file:
+            pid_file.write(str(os.getpid()))
+
+        try:
+            while True:
+                try:
+                    # Linking fails if the pid file exists, so only one
+                    # daemon can hold it.
+                    os.link(tmp_path, self._pid_path)
+                    return True
+                except OSError as exception:
+                    if exception.errno != errno.EEXIST:
+                        raise
+                if daemon_running(self.daemon_dir):
+                    return False
+                logger.info("Removing stale pid file %s", self._pid_path)
+                try:
+                    os.remove(self._pid_path)
+                except OSError:
+                    pass
+        finally:
+            os.remove(tmp_path)
+
+    def run(self):
+        """Conduct registered studies until none are left."""
+        next_poll = 0.0
+        while True:
+            self._register()
+            if not self._studies:
+                # Release the pid file before the final check for new
+                # registrations, so register_study either sees no daemon or
+                # its study is found here.
+                os.remove(self._pid_path)
+                pending = glob.glob(os.path.join(self._study_dir, "*.study"))
+                if not pending or not self.acquire():
+                    logger.info("No studies left to conduct. Exiting.")
+                    return
+                continue
+
+            sleeptime = self._tick(time() >= next_poll)
+            if sleeptime is not None:
+                logger.debug("Next status check in %.1f seconds.", sleeptime)
+                next_poll = time() + sleeptime
+            if self._resume is not None and self._resume < next_poll:
+                self._wait(self._resume)
+            else:
+                self._wait(next_poll)
+
+    def _wait(self, until):
+        """
+        Sleep until a time, waking early if a step reported that it exited
+        or a study was registered.
+
+        :param until: The time (in seconds since the epoch) to wake up at.
+        """
+        while self._studies:
+            remaining = until - time()
+            if remaining <= 0:
+                return
+            sleep(min(remaining, self.sentinel_interval))
+
+            for study in self._studies.values():
+                if study.dag.has_sentinels():
+                    return
+            registered = glob.glob(os.path.join(self._study_dir, "*.study"))
+            if len(registered) != len(self._studies):
+                return
+
+    def _register(self):
+        """Load the studies registered since the last check."""
+        directories = set(study.directory for study in self._studies.values())
+        for path in sorted(glob.glob(os.path.join(self._study_dir,
+                                                  "*.study"))):
+            if path in self._studies:
+                continue
+
+            try:
+                with open(path) as registration:
+                    directory = registration.read().strip()
+                if directory in directories:
+                    logger.warning("'%s' is already being conducted.",
+                                   directory)
+                    os.remove(path)
+                    continue
+                study = ConductedStudy(directory)
+            except Exception:
+                logger.exception("Unable to load the study registered in "
+                                 "%s. Dropping it.", path)
+                os.remove(path)
+                continue
+
+            logger.info("Conducting study '%s' located in %s.",
+                        study.dag.name, directory)
+            self._studies[path] = study
+            directories.add(directory)
+
+    def _throttle(self, dag):
+        """
+        Get the Throttle shared by the studies using the adapter of a graph.
+
+        :param dag: An ExecutionGraph.
+        :returns: A tuple of the adapter key and its Throttle, or None if
+        the daemon has no limits.
+        """
+        if not self.limits:
+            return None
+        key = _adapter_key(dag)
+        if key not in self._throttles:
+            self._throttles[key] = Throttle(**self.limits)
+        return key, self._throttles[key]
+
+    def _submit(self, dag):
+        """Submit the ready steps of a graph within the adapter's limits."""
+        shared = self._throttle(dag)
+        while True:
+            limit = None
+            if shared:
+                key, throttle = shared
+                in_flight = sum(len(study.dag.in_progress)
+                                for study in self._studies.values()
+                                if _adapter_key(study.dag) == key)
+                limit = throttle.allowance(in_flight)
+
+            count = dag.submit_ready_steps(limit)
+            if shared:
+                throttle.consume(count)
+            # Steps that run locally release their children as they are
+            # submitted, so keep submitting while steps are ready.
+            if not count or not dag.has_ready_steps():
+                return
+
+    def _hold(self, dag):
+        """Note when steps held by a submission rate can be submitted."""
+        delays = [dag.submit_delay()]
+        shared = self._throttle(dag)
+        if shared and dag.has_ready_steps():
+            delays.append(shared[1].delay())
+        delays = [delay for delay in delays if delay is not None]
+        if delays:
+            resume = time() + min(delays)
+            if self._resume is None or resume < self._resume:
+                self._resume = resume
+
+    def _tick(self, poll):
+        """
+        Advance every study, checking the scheduler at most once.
+
+        :param poll: True if the scheduler status check is due. The
+        scheduler is also checked if a step exited with an error.
+        :returns: The number of seconds until the next status check, or None
+        if the scheduler was not checked.
+        """
+        paths = sorted(self._studies)
+        dags = [self._studies[path].dag for path in paths]
+        finished = 0
+        for dag in dags:
+            study_finished, errors = dag.check_sentinels()
+            finished += study_finished
+            poll = poll or errors
+
+        results = [None] * len(paths)
+        sleeptime = None
+        if poll:
+            for throttle in self._throttles.values():
+                throttle.tick()
+            logger.info("Checking %d studies at %s", len(self._studies),
+                        str(datetime.now()))
+            try:
+                results = ExecutionGraph.query_scheduler(dags)
+            except Exception:
+                logger.exception("Scheduler status query failed.")
+                poll = False
+                sleeptime = self.sleeptime
+
+        eta = None
+        self._resume = None
+        for path, jobs in zip(paths, results):
+            study = self._studies[path]
+            dag = study.dag
+            try:
+                if jobs is not None:
+                    finished += dag.poll_steps(jobs)
+                self._submit(dag)
+                study_complete = dag.is_complete()
+                study.persist(study_complete)
+                study.write_status(study_complete)
+            except Exception as error:
+                if not _unrecoverable(error):
+                    failures = self._failures.get(path, 0) + 1
+                    self._failures[path] = failures
+                    logger.exception("Error conducting study '%s' (%d "
+                                     "tick(s) in a row) -- Retrying at the "
+                                     "next tick.", dag.name, failures)
+                    continue
+                logger.exception("The state store of study '%s' is damaged "
+                                 "-- Aborting it.", dag.name)
+                study_complete = True
+            self._failures.pop(path, None)
+
+            if study_complete:
+                logger.info("'%s' is complete.", dag.name)
+                study.close()
+                del self._studies[path]
+                os.remove(path)
+            else:
+                self._hold(dag)
+                if self.adaptive:
+                    study_eta = dag.time_to_next_finish()
+                    if study_eta is not None and \
+                            (eta is None or study_eta < eta):
+                        eta = study_eta
+
+        if not poll:
+            return sleeptime
+        if self.adaptive:
+            return self.adaptive.next_interval(finished, eta)
+        return self.sleeptime
+
+
 def main():
     # Set up and parse the ArgumentParser
     parser = setup_argparser()
     args = parser.parse_args()
+    if args.adaptive and args.min_sleeptime > args.max_sleeptime:
+        parser.error("--min_sleeptime must not be larger than "
+                     "--max_sleeptime.")
+    if not args.directory and not args.daemon:
+        parser.error("A study directory is required unless running as a "
+                     "daemon.")
 
-    # Unpickle the ExecutionGraph
-    study_pkl = glob.glob(os.path.join(args.directory, "*.pkl"))
-    # We expect only a single pickle file.
-    if len(study_pkl) == 1:
-        dag = ExecutionGraph.unpickle(study_pkl[0])
-    else:
-        if len(study_pkl) > 1:
-            msg = "More than one pickle found. Expected only one. Aborting."
-            status = 2
-        else:
-            msg = "No pickle found. Aborting."
-            status = 1
+    adaptive = None
+    if args.adaptive:
+        adaptive = AdaptivePoll(args.sleeptime, args.min_sleeptime,
+                                args.max_sleeptime)
 
-        sys.stderr.write(msg)
-        sys.exit(status)
+    limits = dict((key, getattr(args, key)) for key in Throttle.SETTINGS
+                  if getattr(args, key) is not None)
+    try:
+        # Check the limits before starting.
+        Throttle(**limits)
+    except ValueError as exception:
+        parser.error(str(exception))
+
+    if args.daemon:
+        if args.directory:
+            register_study(args.directory, args.daemon_dir)
+        daemon = ConductorDaemon(args.daemon_dir, args.sleeptime, adaptive,
+                                 limits=limits)
+        if not daemon.acquire():
+            sys.stderr.write("A conductor daemon is already running.")
+            sys.exit(0)
+
+        setup_logging(args, args.daemon_dir, "conductor")
+        logger.info("Conductor daemon started in %s.", args.daemon_dir)
+        daemon.run()
+        sys.exit(0)
+
+    # Load the ExecutionGraph from a state store if the study has one,
+    # otherwise unpickle it.
+    try:
+        study = ConductedStudy(args.directory)
+    except ValueError as exception:
+        sys.stderr.write(str(exception))
+        sys.exit(2)
+    except IOError as exception:
+        sys.stderr.write(str(exception))
+        sys.exit(1)
+    dag = study.dag
 
     # Set up logging
-    setup_logging(args, dag.name)
+    setup_logging(args, args.directory, dag.name)
     # Use ExecutionGraph API to determine next jobs to be launched.
     logger.info("Checking the ExecutionGraph for study '%s' located in "
-                "%s...", dag.name, study_pkl[0])
+                "%s...", dag.name, study.study_file)
     logger.info("Study Description: %s", dag.description)
 
-    study_complete = False
-    while not study_complete:
-        logger.info("Checking DAG status at %s", str(datetime.now()))
-        # Execute steps that are ready
-        study_complete = dag.execute_ready_steps()
-        # Re-pickle the ExecutionGraph.
-        dag.pickle(study_pkl[0])
-        # Write out the state
-        dag.write_status(os.path.split(study_pkl[0])[0])
-        # Sleep for SLEEPTIME in args
-        sleep(args.sleeptime)
+    if limits:
+        dag.set_limits(**limits)
+    logger.info("Submission limits -- %s", dag.throttle)
+
+    if args.recover:
+        # Bring the graph up to date with the scheduler in one query, and
+        # persist the result before scheduling resumes.
+        dag.recover()
+        study.persist(False)
+        study.write_status()
+
+    if asyncio is not None and not args.poll:
+        conductor = EventConductor(dag, study.persist, study.write_status,
+                                   args.sleeptime, adaptive=adaptive)
+        conductor.run()
+    else:
+        study_complete = False
+        while not study_complete:
+            logger.info("Checking DAG status at %s", str(datetime.now()))
+            num_resolved = len(dag.completed_steps) + len(dag.failed_steps)
+            # Execute steps that are ready
+            study_complete = dag.execute_ready_steps()
+            study.persist(study_complete)
+            # Write out the state
+            study.write_status(study_complete)
+            if study_complete:
+                break
+
+            if adaptive:
+                finished = len(dag.completed_steps) + \
+                    len(dag.failed_steps) - num_resolved
+                sleeptime = adaptive.next_interval(
+                    finished, dag.time_to_next_finish())
+                logger.debug("Next status check in %.1f seconds.", sleeptime)
+            else:
+                sleeptime = args.sleeptime
+            # Sleep for SLEEPTIME in args
+            sleep(sleeptime)
 
     # Explicitly return a 0 status.
     sys.exit(0)
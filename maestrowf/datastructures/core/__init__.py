@@ -47,8 +47,13 @@ These moving parts include but are not limited to:
 from maestrowf.datastructures.core.executiongraph import ExecutionGraph
 from maestrowf.datastructures.core.parameters import Combination, \
     ParameterGenerator
+from maestrowf.datastructures.core.shardstore import ShardStore
+from maestrowf.datastructures.core.statestore import StateStore
+from maestrowf.datastructures.core.statusfile import StatusFile
 from maestrowf.datastructures.core.study import Study, StudyStep
+from maestrowf.datastructures.core.throttle import Throttle
 from maestrowf.datastructures.core.studyenvironment import StudyEnvironment
 
-__all__ = ("Combination", "ExecutionGraph", "ParameterGenerator", "Study",
-           "StudyEnvironment", "StudyStep")
+__all__ = ("Combination", "ExecutionGraph", "ParameterGenerator",
+           "ShardStore", "StateStore", "StatusFile", "Study",
+           "StudyEnvironment", "StudyStep", "Throttle")
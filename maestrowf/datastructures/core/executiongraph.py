@@ -1,13 +1,20 @@
-from datetime import datetime
-from filelock import FileLock, Timeout
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
 import getpass
 import logging
 import os
 import pickle
+import time
 
 from maestrowf.abstracts.enums import JobStatusCode, State, SubmissionCode
+from maestrowf.datastructures.core.statusfile import update_status_file, \
+    write_status_file
 from maestrowf.datastructures.dag import DAG
 from maestrowf.interfaces import ScriptAdapterFactory
+from maestrowf.datastructures.core.throttle import Throttle
+from maestrowf.utils import STATUS_COLUMNS, create_parentdir, status_row, \
+    walltime_to_seconds
 
 logger = logging.getLogger(__name__)
 SOURCE = "_source"
@@ -21,8 +28,16 @@ class _StepRecord(object):
     and settings for execution of the record. The StepRecord is a utility
     class to the ExecutionGraph and maintains all information for any given
     step in the DAG.
+
+    Records use __slots__ instead of a per-instance dictionary, and keep
+    times as seconds since the epoch, since a study can hold hundreds of
+    thousands of them.
     """
 
+    __slots__ = ("workspace", "jobid", "script", "restart_script",
+                 "to_be_scheduled", "step", "restart_limit", "status",
+                 "_num_restarts", "_submit_time", "_start_time", "_end_time")
+
     def __init__(self, **kwargs):
         """
         Initialize a new instance of a StepRecord.
@@ -30,7 +45,7 @@ class _StepRecord(object):
         Used kwargs:
         workspace: The working directory of the record.
         status: The record's current execution state.
-        jobid: A scheduler assigned job identifier.
+        jobid: A tuple of the scheduler assigned job identifiers.
         script: The main script used for executing the record.
         restart_script: Script to resume record execution (if applicable).
         to_be_scheduled: True if the record needs scheduling. False otherwise.
@@ -39,7 +54,7 @@ class _StepRecord(object):
         """
         self.workspace = kwargs.pop("workspace", "")
 
-        self.jobid = kwargs.pop("jobid", [])
+        self.jobid = tuple(kwargs.pop("jobid", ()))
         self.script = kwargs.pop("script", "")
         self.restart_script = kwargs.pop("restart", "")
         self.to_be_scheduled = False
@@ -53,6 +68,33 @@ class _StepRecord(object):
         self._end_time = None
         self.status = kwargs.pop("status", State.INITIALIZED)
 
+    def __getstate__(self):
+        """
+        Get the state of the record for pickling.
+
+        :returns: A tuple of the values of the record's slots.
+        """
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        """
+        Restore the state of a record from its pickled state.
+
+        :param state: A tuple produced by __getstate__, or the dictionary of
+        a record pickled before records used __slots__.
+        """
+        if isinstance(state, dict):
+            state = dict(state)
+            state["jobid"] = tuple(state.get("jobid", ()))
+            for key in ("_submit_time", "_start_time", "_end_time"):
+                if state[key] is not None:
+                    state[key] = time.mktime(state[key].timetuple()) + \
+                        state[key].microsecond / 1e6
+            state = tuple(state.get(slot) for slot in self.__slots__)
+
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
     def mark_submitted(self):
         """Mark the submission time of the record."""
         logger.debug(
@@ -61,7 +103,7 @@ class _StepRecord(object):
             self.status)
         self.status = State.PENDING
         if not self._submit_time:
-            self._submit_time = datetime.now()
+            self._submit_time = time.time()
         else:
             logger.warning(
                 "Cannot set the submission time of '%s' because it has"
@@ -76,7 +118,7 @@ class _StepRecord(object):
             self.status)
         self.status = State.RUNNING
         if not self._start_time:
-            self._start_time = datetime.now()
+            self._start_time = time.time()
 
     def mark_end(self, state):
         """
@@ -91,7 +133,7 @@ class _StepRecord(object):
             self.status)
         self.status = state
         if not self._end_time:
-            self._end_time = datetime.now()
+            self._end_time = time.time()
 
     def mark_restart(self):
         """Mark the end time of the record."""
@@ -111,10 +153,10 @@ class _StepRecord(object):
         """Compute the elapsed time of the record (includes queue wait)."""
         if self._submit_time and self._end_time:
             # Return the total elapsed time.
-            return str(self._end_time - self._submit_time)
+            return str(timedelta(seconds=self._end_time - self._submit_time))
         elif self._submit_time and self.status == State.RUNNING:
             # Return the current elapsed time.
-            return str(datetime.now() - self._submit_time)
+            return str(timedelta(seconds=time.time() - self._submit_time))
         else:
             return "--:--:--"
 
@@ -127,10 +169,10 @@ class _StepRecord(object):
         """
         if self._start_time and self._end_time:
             # If start and end time is set -- calculate run time.
-            return str(self._end_time - self._start_time)
+            return str(timedelta(seconds=self._end_time - self._start_time))
         elif self._start_time and not self.status == State.RUNNING:
             # If start time but no end time, calculate current duration.
-            return str(datetime.now() - self._start_time)
+            return str(timedelta(seconds=time.time() - self._start_time))
         else:
             # Otherwise, return an uncalculated marker.
             return "--:--:--"
@@ -161,7 +203,7 @@ class _StepRecord(object):
         :returns: A formatted string of the date and time the step started.
         """
         if self._submit_time:
-            return str(self._submit_time)
+            return str(datetime.fromtimestamp(self._submit_time))
         else:
             return "--"
 
@@ -173,7 +215,7 @@ class _StepRecord(object):
         :returns: A formatted string of the date and time the step started.
         """
         if self._start_time:
-            return str(self._start_time)
+            return str(datetime.fromtimestamp(self._start_time))
         else:
             return "--"
 
@@ -185,7 +227,7 @@ class _StepRecord(object):
         :returns: A formatted string of the date and time the step ended.
         """
         if self._end_time:
-            return str(self._end_time)
+            return str(datetime.fromtimestamp(self._end_time))
         else:
             return "--"
 
@@ -198,6 +240,115 @@ class _StepRecord(object):
         """
         return self._num_restarts
 
+    def get_execution_state(self):
+        """
+        Get the parts of the record that change as the step executes.
+
+        :returns: A tuple of the status, job identifiers, number of restarts,
+        and submission, start and end times of the record (in seconds since
+        the epoch, or None if not set).
+        """
+        return (self.status, self.jobid, self._num_restarts,
+                self._submit_time, self._start_time, self._end_time)
+
+    def set_execution_state(self, state):
+        """
+        Restore the execution state of the record.
+
+        :param state: A tuple produced by get_execution_state.
+        """
+        self.status, jobid, self._num_restarts, self._submit_time, \
+            self._start_time, self._end_time = state
+        self.jobid = tuple(jobid)
+
+
+class RecordTable(object):
+    """
+    A struct-of-arrays table of StepRecords indexed by node id.
+
+    The state, restart count and times of the records are held in flat
+    arrays instead of in one object per record. The remaining fields of each
+    record (the step, workspace, scripts and job identifiers) are kept as a
+    tuple per record. An ExecutionGraph is pickled with its records packed
+    into a RecordTable. Live records stay objects, so the table only shrinks
+    the pickle: at 100k steps, benchmarks/record_memory.py measures 17.3 MB
+    for the table against 18.1 MB for pickled slotted records and 23.7 MB
+    for the dict-backed records they replaced.
+    """
+
+    # The slots of a _StepRecord that are not stored in the arrays.
+    FIELDS = ("workspace", "jobid", "script", "restart_script",
+              "to_be_scheduled", "step", "restart_limit")
+    # Marker for a time that has not been set.
+    UNSET = -1.0
+
+    def __init__(self, records=()):
+        """
+        Initialize a table from a sequence of records.
+
+        :param records: A sequence of _StepRecords (or None for nodes that
+        do not have a record) in node id order.
+        """
+        self.status = array("b")
+        self.restarts = array("i")
+        self.submit_time = array("d")
+        self.start_time = array("d")
+        self.end_time = array("d")
+        self.fields = []
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def append(self, record):
+        """
+        Add a record to the end of the table.
+
+        :param record: A _StepRecord, or None for a node without a record.
+        """
+        if record is None:
+            self.fields.append(None)
+            self.status.append(0)
+            self.restarts.append(0)
+            for times in (self.submit_time, self.start_time, self.end_time):
+                times.append(self.UNSET)
+            return
+
+        self.fields.append(
+            tuple(getattr(record, field) for field in self.FIELDS))
+        self.status.append(record.status.value)
+        self.restarts.append(record._num_restarts)
+        for times, value in ((self.submit_time, record._submit_time),
+                             (self.start_time, record._start_time),
+                             (self.end_time, record._end_time)):
+            times.append(self.UNSET if value is None else value)
+
+    def to_records(self):
+        """
+        Unpack the table into records.
+
+        :returns: A list of _StepRecords (or None) in node id order.
+        """
+        records = []
+        for index, fields in enumerate(self.fields):
+            if fields is None:
+                records.append(None)
+                continue
+
+            record = _StepRecord.__new__(_StepRecord)
+            for field, value in zip(self.FIELDS, fields):
+                setattr(record, field, value)
+            record.status = State(self.status[index])
+            record._num_restarts = self.restarts[index]
+            record._submit_time, record._start_time, record._end_time = (
+                None if times[index] == self.UNSET else times[index]
+                for times in (self.submit_time, self.start_time,
+                              self.end_time))
+            records.append(record)
+
+        return records
+
 
 class ExecutionGraph(DAG):
     """
@@ -225,12 +376,43 @@ class ExecutionGraph(DAG):
         # Member variables for execution.
         self._adapter = None
         self._description = {}
+        # Directory scheduled step scripts write their exit codes to.
+        self._sentinel_dir = None
+        # Limits on how fast steps are submitted.
+        self._throttle = Throttle()
 
         # Sets to track progress.
         self.completed_steps = set([SOURCE])
         self.in_progress = set()
         self.failed_steps = set()
 
+        # The number of unfinished parents of each node (by node index) and
+        # the queue of nodes whose parents have all finished. Both are built
+        # on the first call to execute_ready_steps and kept up to date as
+        # steps finish.
+        self._waiting = None
+        self._ready = deque()
+        # Names of in progress steps to submit again after a hardware failure.
+        self._resubmit = set()
+        # The total observed run time and number of finished steps for each
+        # step template, built when first needed.
+        self._runtimes = None
+        # The earliest finish time and slack of each node (by node index)
+        # estimated from step walltimes, and the makespan of the study.
+        self._schedule = None
+
+        # Names of steps that changed since the last checkpoint, and the
+        # number of entries in the journal since the last full pickle. Each
+        # pickle is stamped with a generation, and its journal starts with
+        # the same generation.
+        self._dirty = set()
+        self._journaled = 0
+        self._generation = 0
+        # Names of steps that changed since the status was last written, and
+        # the row of each step in status.bin.
+        self._unwritten = set()
+        self._status_rows = None
+
         # Values for management of the DAG. Things like submission attempts,
         # throttling, etc. should be listed here.
         self._submission_attempts = submission_attempts
@@ -253,10 +435,251 @@ class ExecutionGraph(DAG):
         record = _StepRecord(**data)
         super(ExecutionGraph, self).add_node(name, record)
 
+    def add_steps_from(self, steps):
+        """
+        Add a collection of StepRecords to the ExecutionGraph.
+
+        :param steps: An iterable of (name, step, workspace, restart_limit)
+        tuples, with the same meaning as the parameters of add_step.
+        """
+        super(ExecutionGraph, self).add_nodes_from(
+            (name, _StepRecord(step=step, state=State.INITIALIZED,
+                               workspace=workspace,
+                               restart_limit=restart_limit))
+            for name, step, workspace, restart_limit in steps)
+
+    def transitive_reduction(self):
+        """
+        Remove dependencies that are implied by other dependencies.
+
+        Along with the redundant edges, the parent is also removed from the
+        'depends' list of the recorded step.
+
+        :returns: A list of the (parent, step) name pairs that were removed.
+        """
+        removed = super(ExecutionGraph, self).transitive_reduction()
+        for parent, name in removed:
+            step = self.values[name].step
+            run = step.run
+            if parent in run["depends"]:
+                run["depends"].remove(parent)
+                step.run = run
+
+        return removed
+
+    def _invalidate(self):
+        """Clear cached orderings and the ready queue on structural changes."""
+        super(ExecutionGraph, self)._invalidate()
+        self._waiting = None
+        self._ready = deque()
+        self._schedule = None
+        self._status_rows = None
+
+    def _compute_schedule(self):
+        """
+        Estimate when each step can finish using the step walltimes.
+
+        The earliest finish of a step is its walltime plus the latest earliest
+        finish of its parents, and the makespan is the latest finish of any
+        step. The slack of a step is how long it can be delayed without
+        delaying the makespan; steps on the critical path have no slack.
+        Steps without a walltime are treated as taking no time.
+
+        :returns: A tuple of the earliest finish and the slack of each node
+        (as arrays of seconds by node index) and the makespan in seconds.
+        """
+        if self._schedule is not None:
+            return self._schedule
+
+        num_nodes = len(self._names)
+        duration = array("d", [0.0]) * num_nodes
+        for node, record in enumerate(self._objs):
+            if record is None:
+                continue
+            try:
+                duration[node] = walltime_to_seconds(record.walltime)
+            except ValueError:
+                logger.warning("Unable to estimate the duration of '%s'. "
+                               "Assuming it takes no time.",
+                               self._names[node])
+
+        order = [self._ids[name] for name in self.topological_order()]
+        finish = array("d", [0.0]) * num_nodes
+        for node in order:
+            start = 0.0
+            for parent in self._parents(node):
+                if finish[parent] > start:
+                    start = finish[parent]
+            finish[node] = start + duration[node]
+
+        makespan = max(finish) if num_nodes else 0.0
+        # Walk backwards to find the latest each node can finish.
+        latest = array("d", [makespan]) * num_nodes
+        for node in reversed(order):
+            for child in self._children(node):
+                if latest[child] - duration[child] < latest[node]:
+                    latest[node] = latest[child] - duration[child]
+
+        slack = array("d", (latest[node] - finish[node]
+                            for node in range(num_nodes)))
+        self._schedule = (finish, slack, makespan)
+        return self._schedule
+
+    def critical_path(self):
+        """
+        Find the longest chain of dependent steps by step walltime.
+
+        :returns: A tuple of a list of the names of the steps on the critical
+        path (in execution order) and the estimated makespan of the study in
+        seconds.
+        """
+        finish, _, makespan = self._compute_schedule()
+        path = []
+        if not self._names:
+            return path, makespan
+
+        node = max(range(len(finish)), key=finish.__getitem__)
+        while True:
+            if self._objs[node] is not None:
+                path.append(self._names[node])
+            parents = list(self._parents(node))
+            if not parents:
+                break
+            # The parent that finishes last is the one that gates the start.
+            node = max(parents, key=finish.__getitem__)
+        path.reverse()
+
+        return path, makespan
+
+    def _build_ready_queue(self):
+        """
+        Count the unfinished parents of each node and queue ready nodes.
+
+        This is a full pass over the graph and is only needed once, after
+        which the counts are maintained incrementally by _mark_completed.
+        """
+        completed = self.completed_steps
+        names = self._names
+        self._waiting = array("i", [0]) * len(names)
+        self._ready = deque()
+        for node, name in enumerate(names):
+            if name in completed:
+                continue
+
+            count = 0
+            for parent in self._parents(node):
+                if names[parent] not in completed:
+                    count += 1
+            self._waiting[node] = count
+
+            if not count and self._objs[node].status == State.INITIALIZED:
+                self._ready.append(node)
+
+    def _mark_completed(self, name):
+        """
+        Add a step to the completed set and release its children.
+
+        Each child's count of unfinished parents is decremented, and children
+        that reach zero are added to the ready queue.
+
+        :param name: Name of the step that completed.
+        """
+        self.completed_steps.add(name)
+        if self._runtimes is not None:
+            self._add_runtime(self.values[name])
+        if self._waiting is None:
+            return
+
+        for node in self._children(self._ids[name]):
+            self._waiting[node] -= 1
+            if not self._waiting[node]:
+                self._ready.append(node)
+
+    @staticmethod
+    def _runtime_key(record):
+        """
+        Get the name of the step a record's step was expanded from.
+
+        Parameterized expansions of a step share a key, so the run time
+        observed for one of them estimates the run time of the others.
+        """
+        return getattr(record.step, "template", record.step).name
+
+    def _add_runtime(self, record):
+        """Add the observed run time of a finished step to its template."""
+        if record is None or not record._end_time:
+            return
+
+        begin = record._start_time or record._submit_time
+        if not begin:
+            return
+
+        key = self._runtime_key(record)
+        total, count = self._runtimes.get(key, (0.0, 0))
+        self._runtimes[key] = (total + record._end_time - begin, count + 1)
+
+    def _expected_runtime(self, record):
+        """
+        Estimate how long a step takes to run.
+
+        The mean observed run time of finished steps expanded from the same
+        step is used when there is one, otherwise the step's walltime.
+
+        :param record: The _StepRecord of the step.
+        :returns: The expected run time in seconds, or None if unknown.
+        """
+        if self._runtimes is None:
+            self._runtimes = {}
+            for name in self.completed_steps:
+                self._add_runtime(self.values[name])
+
+        observed = self._runtimes.get(self._runtime_key(record))
+        if observed:
+            return observed[0] / observed[1]
+
+        try:
+            walltime = walltime_to_seconds(record.walltime)
+        except ValueError:
+            return None
+        return walltime or None
+
+    def time_to_next_finish(self):
+        """
+        Estimate how long until the next in progress step finishes.
+
+        A running step is expected to finish its expected run time after it
+        started, and a queued step no sooner than that after it was
+        submitted. Steps that have run past their expected run time, or
+        whose run time is unknown, are not counted.
+
+        :returns: The estimated number of seconds until an in progress step
+        finishes, or None if there is no estimate.
+        """
+        now = time.time()
+        soonest = None
+        for name in self.in_progress:
+            record = self.values[name]
+            begin = record._start_time or record._submit_time
+            if not begin:
+                continue
+
+            expected = self._expected_runtime(record)
+            if expected is None:
+                continue
+
+            remaining = begin + expected - now
+            if remaining >= 0 and (soonest is None or remaining < soonest):
+                soonest = remaining
+
+        return soonest
+
     def set_adapter(self, adapter):
         """
         Set the adapter used to interface for scheduling tasks.
 
+        Submission limits in the settings (see set_limits) are applied to the
+        graph and removed from the adapter settings.
+
         :param adapter: Adapter name to be used when launching the graph.
         """
         if not adapter:
@@ -276,8 +699,81 @@ class ExecutionGraph(DAG):
             logger.error(msg)
             raise TypeError(msg)
 
+        adapter = dict(adapter)
+        limits = dict((key, adapter.pop(key)) for key in Throttle.SETTINGS
+                      if key in adapter)
+        if limits:
+            self.set_limits(**limits)
         self._adapter = adapter
 
+    @property
+    def adapter(self):
+        """
+        Get the settings of the adapter used to schedule steps.
+
+        :returns: A dictionary of adapter settings, or None if not set.
+        """
+        return self._adapter
+
+    @property
+    def throttle(self):
+        """
+        Get the limits on how fast steps of the graph are submitted.
+
+        :returns: The Throttle of the graph.
+        """
+        return self._throttle
+
+    def set_limits(self, **limits):
+        """
+        Limit how fast steps are submitted.
+
+        Ready steps beyond the limits are held in the ready queue, most
+        critical first, until capacity frees up. Limits that are not given
+        keep their current setting.
+
+        :param limits: Any of the Throttle settings (max_in_flight,
+        max_submissions, submit_rate and submit_burst). A value of None
+        leaves that setting as it is.
+        """
+        settings = self._throttle.settings()
+        for key, value in limits.items():
+            if key not in Throttle.SETTINGS:
+                msg = "'{}' is not a submission limit. Expected one of {}." \
+                      .format(key, ", ".join(Throttle.SETTINGS))
+                logger.error(msg)
+                raise ValueError(msg)
+            if value is not None:
+                settings[key] = value
+        self._throttle = Throttle(**settings)
+
+    @property
+    def sentinel_dir(self):
+        """
+        Get the directory scheduled step scripts write their exit codes to.
+
+        :returns: The path to the directory, or None if scripts don't write
+        their exit codes.
+        """
+        return self._sentinel_dir
+
+    def set_sentinel_dir(self, path):
+        """
+        Have scheduled step scripts write their exit codes to a directory.
+
+        Each script writes its exit code to '<step name>.exit' when it exits,
+        which lets a conductor learn that a step ended without waiting for
+        the next scheduler status check (see check_sentinels). This must be
+        set before the scripts are generated, which create the directory if
+        any step is scheduled.
+
+        :param path: The directory to write exit codes to (None to not write
+        them).
+        """
+        if path:
+            path = os.path.abspath(path)
+        self._sentinel_dir = path
+
     def add_description(self, name, description):
         """
         Add a study description to the ExecutionGraph instance.
@@ -288,6 +784,45 @@ class ExecutionGraph(DAG):
         self._description["name"] = name
         self._description["description"] = description
 
+    def _check_adapter(self):
+        """Raise an exception if no script adapter has been set."""
+        if not self._adapter:
+            msg = "A script adapter must be set before an ExecutionGraph is " \
+                  "pickled. Use the 'set_adapter' method to set a specific" \
+                  " script interface."
+            logger.error(msg)
+            raise Exception(msg)
+
+    def dump(self, path, compress=False):
+        """
+        Write a snapshot of the graph instance.
+
+        Snapshots hold the same information as a pickle in a versioned binary
+        format (see maestrowf.datastructures.core.snapshot) that is smaller
+        and faster to load.
+
+        :param path: The path to write the snapshot to.
+        :param compress: If True, compress the snapshot with zlib.
+        """
+        # The snapshot module builds StudySteps, and study imports this
+        # module, so it is imported here rather than at the top.
+        from maestrowf.datastructures.core import snapshot
+
+        self._check_adapter()
+        snapshot.dump(self, path, compress)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an ExecutionGraph instance from a snapshot file.
+
+        :param path: Path to an ExecutionGraph snapshot written by dump.
+        :returns: The ExecutionGraph stored in the snapshot.
+        """
+        from maestrowf.datastructures.core import snapshot
+
+        return snapshot.load(path, cls)
+
     @classmethod
     def unpickle(cls, path):
         """
@@ -305,23 +840,266 @@ class ExecutionGraph(DAG):
             logger.error(msg)
             raise TypeError(msg)
 
+        journal = cls._journal_path(path)
+        if os.path.exists(journal):
+            dag._replay(journal)
+
         return dag
 
+    @staticmethod
+    def _journal_path(path):
+        """
+        Get the path of the journal that accompanies a pickle.
+
+        :param path: The path of an ExecutionGraph pickle.
+        :returns: The path of the journal for that pickle.
+        """
+        return "{}.journal".format(path)
+
+    def _replay(self, path):
+        """
+        Apply the entries of a journal to the ExecutionGraph.
+
+        Each entry holds the full execution state of a step, so replaying an
+        entry that is already reflected in the graph has no effect. A partial
+        entry at the end of the journal (from an interrupted write) is
+        ignored. A journal from another generation than the graph (left
+        behind if the graph was pickled again before the journal could be
+        removed) is ignored entirely.
+
+        :param path: The path of the journal to replay.
+        """
+        count = 0
+        with open(path, 'rb') as journal:
+            try:
+                generation = pickle.load(journal)
+            except (EOFError, pickle.UnpicklingError):
+                generation = None
+            if generation != self._generation:
+                logger.warning("Journal '%s' does not belong to the pickle "
+                               "it accompanies. Ignoring it.", path)
+                return
+
+            while True:
+                try:
+                    entries = pickle.load(journal)
+                except EOFError:
+                    break
+                except pickle.UnpicklingError:
+                    logger.warning("Journal '%s' ends with a partial entry. "
+                                   "Ignoring it.", path)
+                    break
+
+                self.apply_changes(entries)
+                count += len(entries)
+
+        logger.debug("Replayed %d journal entries from '%s'.", count, path)
+        self._journaled = count
+
+    def __getstate__(self):
+        """
+        Get the state of the ExecutionGraph for pickling.
+
+        The ready queue is not pickled; it is rebuilt from the state of each
+        record when execution resumes. The records are packed into a
+        RecordTable.
+
+        :returns: A dictionary representing the state of the instance.
+        """
+        state = super(ExecutionGraph, self).__getstate__()
+        state["_waiting"] = None
+        state["_ready"] = deque()
+        state["_resubmit"] = set()
+        state["_runtimes"] = None
+        state["_schedule"] = None
+        state["_dirty"] = set()
+        state["_journaled"] = 0
+        state["_unwritten"] = set()
+        state["_status_rows"] = None
+        state["_objs"] = RecordTable(self._objs)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the state of an ExecutionGraph from its pickled state.
+
+        :param state: A dictionary produced by __getstate__.
+        """
+        legacy = "_csr" not in state
+        super(ExecutionGraph, self).__setstate__(state)
+        if legacy:
+            # Graphs pickled by earlier versions of Maestro have no
+            # sentinels, throttle or journal.
+            self._sentinel_dir = None
+            self._throttle = Throttle()
+            self._generation = 0
+        # The ready queue, caches and change tracking are not pickled, so
+        # they start out empty. Hardware failures are reported again by the
+        # next status check.
+        self._waiting = None
+        self._ready = deque()
+        self._resubmit = set()
+        self._runtimes = None
+        self._schedule = None
+        self._dirty = set()
+        self._journaled = 0
+        self._unwritten = set()
+        self._status_rows = None
+        if isinstance(self._objs, RecordTable):
+            self._objs = self._objs.to_records()
+
     def pickle(self, path):
         """
         Generate a pickle file of the graph instance.
 
         :param path: The path to write the pickle to.
         """
-        if not self._adapter:
-            msg = "A script adapter must be set before an ExecutionGraph is " \
-                  "pickled. Use the 'set_adapter' method to set a specific" \
-                  " script interface."
-            logger.error(msg)
-            raise Exception(msg)
+        self._check_adapter()
+
+        # Write to a temporary file first so that an interrupted write never
+        # leaves a partial pickle in place of the last good one. The new
+        # generation tells a load to ignore the old journal if it is still
+        # around.
+        temp = "{}.tmp".format(path)
+        self._generation += 1
+        try:
+            with open(temp, 'wb') as pkl:
+                pickle.dump(self, pkl)
+        except Exception:
+            self._generation -= 1
+            raise
+        os.rename(temp, path)
+
+        # The pickle now holds everything that was in the journal.
+        journal = self._journal_path(path)
+        if os.path.exists(journal):
+            os.remove(journal)
+        self._dirty = set()
+        self._journaled = 0
+
+    def checkpoint(self, path):
+        """
+        Persist the changes made to the graph since the last checkpoint.
 
-        with open(path, 'wb') as pkl:
-            pickle.dump(self, pkl)
+        The execution state of each step that changed is appended to a
+        journal next to the pickle at 'path' in a single write, instead of
+        pickling the whole graph. Once the journal holds as many entries as
+        there are steps, it is compacted by writing a new pickle.
+
+        :param path: The path of the ExecutionGraph pickle.
+        """
+        if not self._dirty:
+            return
+
+        if self._journaled + len(self._dirty) >= len(self._names):
+            logger.debug("Compacting the journal for '%s'.", path)
+            self.pickle(path)
+            return
+
+        entries = self.pop_changes()
+        try:
+            if self._journaled:
+                with open(self._journal_path(path), 'ab') as journal:
+                    journal.write(
+                        pickle.dumps(entries, pickle.HIGHEST_PROTOCOL))
+            else:
+                # Start a new journal, replacing any journal that was
+                # ignored.
+                with open(self._journal_path(path), 'wb') as journal:
+                    journal.write(
+                        pickle.dumps(self._generation,
+                                     pickle.HIGHEST_PROTOCOL) +
+                        pickle.dumps(entries, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # The journal may end with part of an entry, which would hide
+            # the entries appended after it, so the next checkpoint writes a
+            # full pickle instead.
+            self.keep_changes(entries)
+            self._journaled = len(self._names)
+            raise
+        self._journaled += len(entries)
+
+    def pop_changes(self, all_steps=False):
+        """
+        Get the execution state of the steps that changed since the last call.
+
+        Steps are only reported once; the next call reports steps that have
+        changed since this one.
+
+        :param all_steps: If True, report every step whether it changed or
+        not.
+        :returns: A list of (name, state, membership) tuples, where state is
+        the execution state of the step's record and membership is a tuple of
+        booleans for whether the step is in the completed, in progress and
+        failed sets.
+        """
+        if all_steps:
+            names = [name for name, record in zip(self._names, self._objs)
+                     if record is not None]
+        else:
+            names = self._dirty
+        entries = [self._get_change(name) for name in names]
+        self._dirty = set()
+        return entries
+
+    def keep_changes(self, entries):
+        """
+        Report steps again at the next call to pop_changes.
+
+        This is for changes returned by pop_changes that could not be
+        written.
+
+        :param entries: A list of (name, state, membership) tuples returned
+        by pop_changes.
+        """
+        self._dirty.update(name for name, _, _ in entries)
+
+    def get_changes(self, names):
+        """
+        Get the execution state of steps without clearing their changes.
+
+        :param names: An iterable of the names of steps.
+        :returns: A list of (name, state, membership) tuples in the form
+        returned by pop_changes.
+        """
+        return [self._get_change(name) for name in names]
+
+    def _get_change(self, name):
+        """
+        Get the execution state of a step as reported by pop_changes.
+
+        :param name: Name of the step.
+        :returns: A (name, state, membership) tuple for the step.
+        """
+        groups = (self.completed_steps, self.in_progress, self.failed_steps)
+        record = self._objs[self._ids[name]]
+        return (name, record.get_execution_state(),
+                tuple(name in group for group in groups))
+
+    def apply_changes(self, entries):
+        """
+        Restore the execution state of steps from entries of pop_changes.
+
+        :param entries: An iterable of (name, state, membership) tuples.
+        """
+        groups = (self.completed_steps, self.in_progress, self.failed_steps)
+        for name, state, membership in entries:
+            self._objs[self._ids[name]].set_execution_state(state)
+            for group, member in zip(groups, membership):
+                if member:
+                    group.add(name)
+                else:
+                    group.discard(name)
+            self._unwritten.add(name)
+
+    def _mark_changed(self, names):
+        """
+        Note that the execution state of steps has changed.
+
+        :param names: An iterable of the names of the steps that changed.
+        """
+        self._dirty.update(names)
+        self._unwritten.update(names)
 
     @property
     def name(self):
@@ -375,21 +1153,32 @@ class ExecutionGraph(DAG):
             logger.error(msg)
             raise ValueError(msg)
 
-        for key, record in self.values.items():
+        for key in self.topological_order():
             if key == SOURCE:
                 continue
 
+            record = self.values[key]
             logger.info("Generating scripts...")
             adapter = ScriptAdapterFactory.get_adapter(self._adapter["type"])
             adapter = adapter(**self._adapter)
+            # Expanded steps only hold what differs from their template, so
+            # build the complete step once for the adapter.
+            step = record.step.materialize()
+            sentinel = None
+            if self._sentinel_dir:
+                sentinel = os.path.join(self._sentinel_dir,
+                                        "{}.exit".format(key))
             to_be_scheduled, cmd_script, restart_script = \
-                adapter.write_script(record.workspace, record.step)
+                adapter.write_script(record.workspace, step, sentinel)
             logger.info("Step -- %s\nScript: %s\nRestart: %s\nScheduled?: %s",
-                        record.step.name, cmd_script, restart_script,
+                        step.name, cmd_script, restart_script,
                         to_be_scheduled)
             record.to_be_scheduled = to_be_scheduled
             record.script = cmd_script
             record.restart_script = restart_script
+            if sentinel and to_be_scheduled:
+                # Only scheduled steps write sentinels.
+                create_parentdir(self._sentinel_dir)
 
     def _execute_record(self, name, record, restart=False):
         """
@@ -401,6 +1190,7 @@ class ExecutionGraph(DAG):
         """
         num_restarts = 0    # Times this step has temporally restarted.
         retcode = None      # Execution return code.
+        self._mark_changed((name,))
 
         # If we want to schedule the execution of the record, grab the
         # scheduler adapter from the ScriptAdapterFactory.
@@ -414,6 +1204,7 @@ class ExecutionGraph(DAG):
 
         # Pass the adapter the settings we've stored.
         adapter = adapter(**self._adapter)
+        step = record.step.materialize()
         # While our submission needs to be submitted, keep trying:
         # 1. If the JobStatus is not OK.
         # 2. num_restarts is less than self._submission_attempts
@@ -445,7 +1236,7 @@ class ExecutionGraph(DAG):
                     record.mark_running()
 
                 retcode, jobid = adapter.submit(
-                    record.step,
+                    step,
                     record.script,
                     record.workspace)
             # Otherwise, it's a restart.
@@ -453,7 +1244,7 @@ class ExecutionGraph(DAG):
                 # If the restart is specified, use the record restart script.
                 record.mark_running()
                 retcode, jobid = adapter.submit(
-                    record.step,
+                    step,
                     record.restart_script,
                     record.workspace)
 
@@ -462,73 +1253,218 @@ class ExecutionGraph(DAG):
 
         if retcode == SubmissionCode.OK:
             logger.info("'%s' submitted with identifier '%s'", name, jobid)
-            record.jobid.append(jobid)
+            record.jobid += (jobid,)
             self.in_progress.add(name)
 
             # Executed locally, so if we executed OK -- Finished.
             if record.to_be_scheduled is False:
                 record.mark_end(State.FINISHED)
-                self.completed_steps.add(name)
+                self._mark_completed(name)
                 self.in_progress.remove(name)
         else:
             # Find the subtree, because anything dependent on this step now
             # failed.
             logger.warning("'%s' failed to properly submit properly. "
                            "Step failed.", name)
-            path, parent = self.bfs_subtree(name)
-            for node in path:
-                self.failed_steps.add(node)
-                self.values[node].mark_end(State.FAILED)
+            self._fail_steps((name,))
 
     def write_status(self, path):
-        header = "Step Name,Workspace,State,Run Time,Elapsed Time,Start Time" \
-                 ",Submit Time,End Time,Number Restarts"
-        status = [header]
-        keys = set(self.values.keys()) - set(["_source"])
-        for key in keys:
-            value = self.values[key]
-            _ = [
-                    value.name, os.path.split(value.workspace)[1],
-                    str(value.status), value.run_time, value.elapsed_time,
-                    value.time_start, value.time_submitted, value.time_end,
-                    str(value.restarts)
-                ]
-            _ = ",".join(_)
-            status.append(_)
+        """
+        Write the status of each step to 'status.csv' and 'status.bin'.
 
+        Nothing is written if no step changed since the last call.
+
+        'status.csv' is rewritten in full. It is written to a temporary file
+        and renamed into place, so readers always see a complete table
+        without needing to take a lock.
+
+        'status.bin' is an indexed binary file (see
+        maestrowf.datastructures.core.statusfile) that 'maestro -s' can query
+        without reading all of it. It is written in full the first time and
+        whenever steps are added. After that, only the slots of the steps
+        that changed since the last call are updated in place.
+
+        :param path: The directory to write the status files to.
+        :returns: True if the files were written, False if nothing changed.
+        """
+        stat_bin = os.path.join(path, "status.bin")
         stat_path = os.path.join(path, "status.csv")
-        lock_path = os.path.join(path, ".status.lock")
-        lock = FileLock(lock_path)
-        try:
-            with lock.acquire(timeout=10):
-                with open(stat_path, "w+") as stat_file:
-                    stat_file.write("\n".join(status))
-        except Timeout:
-            pass
+        if self._status_rows is not None and not self._unwritten and \
+                os.path.exists(stat_bin) and os.path.exists(stat_path):
+            return False
 
-    def execute_ready_steps(self):
+        if self._status_rows is not None and os.path.exists(stat_bin):
+            changed = []
+            for key in self._unwritten:
+                status, _, restarts, submit, start, end = \
+                    self.values[key].get_execution_state()
+                changed.append((self._status_rows[key], status, restarts,
+                                submit, start, end))
+            try:
+                update_status_file(stat_bin, len(self._status_rows), changed)
+            except ValueError:
+                # The file was replaced or damaged, so write it again.
+                self._status_rows = None
+        else:
+            self._status_rows = None
+
+        order = [key for key in self.topological_order() if key != SOURCE]
+        if self._status_rows is None:
+            rows = []
+            for key in order:
+                record = self.values[key]
+                rows.append((record.name, record.workspace, record.status,
+                             record._num_restarts, record._submit_time,
+                             record._start_time, record._end_time))
+            write_status_file(stat_bin, rows)
+            self._status_rows = dict((key, row)
+                                     for row, key in enumerate(order))
+
+        status = [",".join(STATUS_COLUMNS)]
+        for key in order:
+            record = self.values[key]
+            status.append(",".join(status_row(
+                record.name, record.workspace,
+                record.get_execution_state())))
+
+        temp = "{}.tmp".format(stat_path)
+        with open(temp, "w") as stat_file:
+            stat_file.write("\n".join(status))
+        os.rename(temp, stat_path)
+        self._unwritten = set()
+        return True
+
+    def _fail_steps(self, names):
         """
-        Execute any steps whose dependencies are satisfied.
+        Mark steps and everything that depends on them as failed.
 
-        The 'execute_ready_steps' method is the core of how the ExecutionGraph
-        manages execution. This method does the following:
-            - Checks the status of existing jobs that are executing.
-                - Updates the state if changed.
-            - Finds steps that are initialized and determines what can be run:
-                - Scans a steps dependencies and stages if all are me.
-                - Executes any steps whose dependencies are met.
+        All of the steps are handled with a single traversal, which does not
+        enter steps that have already failed since their descendants have
+        failed with them.
 
-        :returns: True if the study has completed, False otherwise.
+        :param names: An iterable of the names of the steps that failed.
         """
-        resolved_set = self.completed_steps | self.failed_steps
-        if not set(self.values.keys()) - resolved_set:
-            # Just return for now, but we'll need a way to signal that there
-            # are no more things to run.
-            logging.info("'%s' is complete. Returning.", self.name)
-            return True
+        failed = []
+        steps = self.descendants(names, skip=self.failed_steps)
+        for node, record in steps.items():
+            self.failed_steps.add(node)
+            record.mark_end(State.FAILED)
+            failed.append(node)
+        self._mark_changed(failed)
+
+    def _apply_job_status(self, job_status):
+        """
+        Update the records of in progress steps from scheduler job states.
 
+        :param job_status: A dictionary mapping the names of in progress
+        steps to the State reported by the scheduler for their latest job.
+        :returns: A dictionary of the steps (name to record) that need to be
+        submitted again because of a hardware failure.
+        """
         ready_steps = {}
-        retcode, job_status = self.check_study_status()
+        # For the status of each currently in progress job, check its
+        # state.
+        # TODO: We need to mark a record as running if it is detected
+        # to be.
+        failed = []  # Steps that are in progress showing failed.
+        for name, status in job_status.items():
+            logger.debug("Checking job '%s' with status %s.",
+                         name, status)
+            record = self.values[name]
+            previous = record.status
+            if status == State.FINISHED:
+                # Mark the step complete and notate its end time.
+                record.mark_end(State.FINISHED)
+                logger.info("Step '%s' marked as finished. Adding to "
+                            "complete set.", name)
+                self._mark_completed(name)
+                self.in_progress.remove(name)
+
+            elif status == State.RUNNING:
+                # When detect that a step is running, mark it.
+                if previous != State.RUNNING:
+                    logger.info("Step '%s' found to be running.", name)
+                    record.mark_running()
+
+            elif status == State.TIMEDOUT:
+                # Execute the restart script.
+                # If a restart script doesn't exist, re-run the command.
+                # If we're under the restart limit, attempt a restart.
+                if record.mark_restart():
+                    logger.info(
+                        "Step '%s' timed out. Restarting (%s of %s).",
+                        name, record.restarts, record.restart_limit
+                    )
+                    self._execute_record(name, record, restart=True)
+                else:
+                    logger.info("'%s' has been restarted %s of %s times. "
+                                "Marking step and all descendents as "
+                                "failed.",
+                                name,
+                                record.restarts,
+                                record.restart_limit)
+                    self.in_progress.remove(name)
+                    failed.append(name)
+
+            elif status == State.HWFAILURE:
+                # TODO: Need to make sure that we do this a finite number
+                # of times.
+                # Resubmit the cmd.
+                logger.warning("Hardware failure detected. Attempting to "
+                               "resubmit step '%s'.", name)
+                # The caller submits it again with the other ready steps.
+                ready_steps[name] = self.values[name]
+
+            elif status == State.FAILED:
+                logger.warning(
+                    "Job failure reported. Aborting %s -- flagging all "
+                    "dependent jobs as failed.",
+                    name
+                )
+                self.in_progress.remove(name)
+                failed.append(name)
+
+            # Scheduler states that do not map to a change of the record
+            # (queued, finishing, unknown or missing jobs) are transient and
+            # leave the step as it is. Steps that fail or are submitted again
+            # are marked as changed when that happens.
+            if record.status != previous:
+                self._mark_changed((name,))
+
+        # Let's handle all the failed steps in one go.
+        self._fail_steps(failed)
+
+        return ready_steps
+
+    def is_complete(self):
+        """
+        Check whether every step of the study has finished or failed.
+
+        :returns: True if the study has completed, False otherwise.
+        """
+        num_resolved = len(self.completed_steps) + \
+            len(self.failed_steps.difference(self.completed_steps))
+        return num_resolved >= len(self._names)
+
+    def poll_steps(self, jobs=None):
+        """
+        Update the in progress steps with their state from the scheduler.
+
+        Steps that finished release their children into the ready queue, and
+        steps that hit a hardware failure are queued to be submitted again.
+        Nothing is submitted; see submit_ready_steps.
+
+        :param jobs: The return code and dictionary of job identifiers to
+        State of a status query shared with other graphs (see
+        query_scheduler). If None, the scheduler is queried.
+        :returns: The number of in progress steps that finished or failed.
+        """
+        self._throttle.tick()
+        num_in_progress = len(self.in_progress)
+        if jobs is None:
+            retcode, job_status = self.check_study_status()
+        else:
+            retcode, job_status = self._map_job_status(*jobs)
         logger.debug("Checked status (retcode %s)-- %s", retcode, job_status)
 
         # For now, if we can't check the status something is wrong.
@@ -538,110 +1474,169 @@ class ExecutionGraph(DAG):
             logger.error(msg)
             raise RuntimeError(msg)
         elif retcode == JobStatusCode.OK:
-            # For the status of each currently in progress job, check its
-            # state.
-            # TODO: We need to mark a record as running if it is detected
-            # to be.
-            cleanup_steps = set()  # Steps that are in progress showing failed.
-            for name, status in job_status.items():
-                logger.debug("Checking job '%s' with status %s.",
-                             name, status)
-                record = self.values[name]
-                if status == State.FINISHED:
-                    # Mark the step complete and notate its end time.
-                    record.mark_end()
-                    logger.info("Step '%s' marked as finished. Adding to "
-                                "complete set.", name)
-                    self.completed_steps.add(name)
-                    record.state = State.FINISHED
-                    self.in_progress.remove(name)
+            self._resubmit.update(self._apply_job_status(job_status))
 
-                elif status == State.RUNNING:
-                    # When detect that a step is running, mark it.
-                    logger.info("Step '%s' found to be running.")
-                    record.mark_running()
+        return num_in_progress - len(self.in_progress)
 
-                elif status == State.TIMEDOUT:
-                    # Execute the restart script.
-                    # If a restart script doesn't exist, re-run the command.
-                    # If we're under the restart limit, attempt a restart.
-                    if record.mark_restart():
-                        logger.info(
-                            "Step '%s' timed out. Restarting (%s of %s).",
-                            name, record.restarts, record.restart_limit
-                        )
-                        self._submit_record(name, record, restart=True)
-                    else:
-                        logger.info("'%s' has been restarted %s of %s times. "
-                                    "Marking step and all descendents as "
-                                    "failed.",
-                                    name,
-                                    record.restarts,
-                                    record.restart_limit)
-                        self.in_progress.remove(name)
-                        cleanup_steps.update(self.bfs_subtree(name)[0])
-
-                elif status == State.HWFAILURE:
-                    # TODO: Need to make sure that we do this a finite number
-                    # of times.
-                    # Resubmit the cmd.
-                    logger.warning("Hardware failure detected. Attempting to "
-                                   "resubmit step '%s'.", name)
-                    # We can just let the logic below handle submission with
-                    # everything else.
-                    ready_steps[name] = self.values[name]
-
-                elif status == State.FAILED:
-                    logger.warning(
-                        "Job failure reported. Aborting %s -- flagging all "
-                        "dependent jobs as failed.",
-                        name
-                    )
-                    self.in_progress.remove(name)
-                    record.mark_end(State.FAILED)
-                    cleanup_steps.update(self.bfs_subtree(name)[0])
-
-            # Let's handle all the failed steps in one go.
-            for node in cleanup_steps:
-                self.failed_steps.add(node)
-                self.values[node].mark_end(State.FAILED)
-
-        # Now that we've checked the statuses of existing jobs we need to make
-        # sure dependencies haven't been met.
-        for key in self.values.keys():
-            # We MUST dereference from the key. If we use values.items(), a
-            # generator gets produced which will give us a COPY of a record and
-            # not the actual record.
-            record = self.values[key]
+    def check_sentinels(self):
+        """
+        Read the exit codes step scripts left in the sentinel directory.
+
+        Steps that exited successfully are marked as finished, releasing
+        their children, without a scheduler status check. Steps that exited
+        with an error are left for the scheduler to report on, since a step
+        that timed out or hit a hardware failure is handled differently than
+        one that failed. Sentinels are removed as they are read, and those
+        that can't be read are renamed to '<step name>.exit.bad' so that they
+        aren't found again.
+
+        :returns: The number of steps marked as finished, and the number of
+        steps that exited with an error.
+        """
+        if not self._sentinel_dir:
+            return 0, 0
 
-            # A completed step by definition has had its dependencies met.
-            # Skip it.
-            if key in self.completed_steps:
-                logger.debug("'%s' in completed set, skipping.", key)
+        try:
+            entries = os.listdir(self._sentinel_dir)
+        except OSError:
+            return 0, 0
+
+        finished = {}
+        errors = 0
+        for entry in entries:
+            if not entry.endswith(".exit"):
                 continue
 
-            logger.debug("Checking %s -- %s", key, record.jobid)
-            # If the record is only INITIALIZED, we have encountered a step
-            # that needs consideration.
-            if record.status == State.INITIALIZED:
-                logger.debug("'%s' found to be initialized. Checking "
-                             "dependencies...", key)
-                # Count the number of its dependencies have finised.
-                num_finished = 0
-                for dependency in record.step.run["depends"]:
-                    logger.debug("Checking '%s'...", dependency)
-                    if dependency in self.completed_steps:
-                        logger.debug("Found in completed steps.")
-                        num_finished += 1
-                # If the total number of dependencies finished is the same
-                # as the number of dependencies the step has, it's ready to
-                # be executed. Add it to the map.
-                if num_finished == len(record.step.run["depends"]):
-                    logger.debug("All dependencies completed. Staging.")
-                    ready_steps[key] = record
-
-        # We now have a collection of ready steps. Execute.
-        for key, record in ready_steps.items():
+            path = os.path.join(self._sentinel_dir, entry)
+            name = entry[:-len(".exit")]
+            try:
+                with open(path, "r") as sentinel:
+                    code = sentinel.read().strip()
+                int(code)
+                os.remove(path)
+            except (IOError, OSError, ValueError):
+                if not os.path.exists(path):
+                    continue
+                logger.warning("Unable to read the sentinel of '%s'. Moving "
+                               "it to %s.bad.", name, path)
+                try:
+                    os.rename(path, path + ".bad")
+                except OSError:
+                    logger.exception("Unable to move the sentinel of '%s'.",
+                                     name)
+                if name in self.in_progress:
+                    # Let the scheduler report how the step ended.
+                    errors += 1
+                continue
+
+            if name not in self.in_progress:
+                logger.debug("Ignoring sentinel of '%s', which is not in "
+                             "progress.", name)
+            elif code == "0":
+                logger.debug("'%s' reported that it finished.", name)
+                finished[name] = State.FINISHED
+            else:
+                logger.info("'%s' exited with code %s.", name, code)
+                errors += 1
+
+        if finished:
+            self._apply_job_status(finished)
+        return len(finished), errors
+
+    def has_sentinels(self):
+        """
+        Check whether the sentinel directory holds exit codes to be read.
+
+        :returns: True if check_sentinels has sentinels to read, False
+        otherwise.
+        """
+        if not self._sentinel_dir:
+            return False
+
+        try:
+            entries = os.listdir(self._sentinel_dir)
+        except OSError:
+            return False
+        return any(entry.endswith(".exit") for entry in entries)
+
+    def has_ready_steps(self):
+        """
+        Check whether there may be steps waiting to be submitted.
+
+        :returns: True if submit_ready_steps may submit a step.
+        """
+        return self._waiting is None or bool(self._ready or self._resubmit)
+
+    def submit_delay(self):
+        """
+        Get how long until the submission rate lets a held step go.
+
+        :returns: The number of seconds until another step can be submitted,
+        or None if no step is being held by the submission rate.
+        """
+        if not (self._ready or self._resubmit):
+            return None
+        return self._throttle.delay()
+
+    def submit_ready_steps(self, limit=None):
+        """
+        Submit the steps whose dependencies have all finished.
+
+        Steps are submitted in order of least slack so that steps on the
+        critical path go first. Steps that run locally finish as they are
+        submitted, and their children are queued for the next call. Steps
+        beyond the limits of the graph's throttle (and 'limit') are held
+        until a later call.
+
+        :param limit: The most steps to submit, for limits shared with other
+        graphs (None for no limit beyond the graph's own).
+        :returns: The number of steps that were submitted.
+        """
+        # Any step whose dependencies have all been met is waiting in the
+        # ready queue.
+        if self._waiting is None:
+            self._build_ready_queue()
+
+        allowed = self._throttle.allowance(len(self.in_progress))
+        if limit is not None:
+            allowed = limit if allowed is None else min(allowed, limit)
+
+        resubmit = self._resubmit
+        ready_steps = dict((name, self.values[name]) for name in resubmit)
+        self._resubmit = set()
+        while self._ready:
+            node = self._ready.popleft()
+            key = self._names[node]
+            record = self._objs[node]
+            # Steps can be queued and then fail as part of a failed subtree
+            # before they get a chance to run. Skip anything not INITIALIZED.
+            if record.status != State.INITIALIZED:
+                logger.debug("'%s' is %s, skipping.", key, record.status)
+                continue
+
+            logger.debug("All dependencies of '%s' completed. Staging.", key)
+            ready_steps[key] = record
+
+        # We now have a collection of ready steps. Execute them in order of
+        # least slack so that steps on the critical path go first.
+        ready_steps = list(ready_steps.items())
+        if len(ready_steps) > 1:
+            slack = self._compute_schedule()[1]
+            ready_steps.sort(key=lambda item: slack[self._ids[item[0]]])
+
+        if allowed is not None and len(ready_steps) > allowed:
+            # Hold the least critical steps until capacity frees up.
+            for key, record in ready_steps[allowed:]:
+                if key in resubmit:
+                    self._resubmit.add(key)
+                else:
+                    self._ready.append(self._ids[key])
+            logger.info("Holding %d ready steps until submission capacity "
+                        "frees up.", len(ready_steps) - allowed)
+            ready_steps = ready_steps[:allowed]
+
+        self._throttle.consume(len(ready_steps))
+        for key, record in ready_steps:
             logger.info("Executing -- '%s'\nScript path = %s", key,
                         record.script)
             logger.debug(
@@ -654,8 +1649,107 @@ class ExecutionGraph(DAG):
                 record.name, record.status
             )
 
+        return len(ready_steps)
+
+    def execute_ready_steps(self):
+        """
+        Execute any steps whose dependencies are satisfied.
+
+        The 'execute_ready_steps' method is the core of how the ExecutionGraph
+        manages execution. This method does the following:
+            - Checks the status of existing jobs that are executing.
+                - Updates the state if changed.
+                - Releases the children of steps that finished.
+            - Executes the steps in the ready queue (steps that are
+            initialized and whose dependencies have all finished), with
+            steps on the critical path first.
+
+        The cost of a call scales with the number of in progress steps and
+        state changes rather than with the size of the graph.
+
+        :returns: True if the study has completed, False otherwise.
+        """
+        if self.is_complete():
+            # Just return for now, but we'll need a way to signal that there
+            # are no more things to run.
+            logger.info("'%s' is complete. Returning.", self.name)
+            return True
+
+        self.poll_steps()
+        self.submit_ready_steps()
         return False
 
+    def recover(self):
+        """
+        Reconcile the graph with the scheduler after the conductor restarts.
+
+        The state that was last persisted can lag behind the scheduler. Every
+        unfinished step that has a job identifier is treated as in progress,
+        and the state of its latest job is looked up with a single scheduler
+        query. All of the results are applied in one pass, the same way a
+        conductor tick applies them, and steps that need to be submitted
+        again because of a hardware failure are submitted.
+
+        Steps that were marked as submitted but never received a job
+        identifier (the conductor stopped between the two) are reset so that
+        they are submitted again. The ready queue is rebuilt from the
+        reconciled states, so the next call to execute_ready_steps resumes
+        scheduling immediately.
+
+        :returns: The number of steps whose state changed.
+        """
+        resolved = self.completed_steps | self.failed_steps
+        unchanged = set(self._dirty)
+        pending = self.subgraph(
+            lambda name, record: record is not None and name not in resolved)
+        for name, record in pending.items():
+            if record.jobid:
+                self.in_progress.add(name)
+            elif record.status != State.INITIALIZED:
+                logger.info("'%s' is %s without a job identifier. Resetting "
+                            "it to be submitted again.", name, record.status)
+                record.status = State.INITIALIZED
+                record._submit_time = None
+                record._start_time = None
+                self.in_progress.discard(name)
+                self._mark_changed((name,))
+
+        ready_steps = {}
+        if self.in_progress:
+            logger.info("Recovering %d in progress step(s) with a single "
+                        "status query.", len(self.in_progress))
+            retcode, job_status = self.check_study_status()
+            if retcode == JobStatusCode.ERROR:
+                msg = "Job status check failed -- Unable to recover."
+                logger.error(msg)
+                raise RuntimeError(msg)
+
+            missing = [name for name, status in job_status.items()
+                       if status is None]
+            if missing:
+                logger.warning("The scheduler has no record of %d in "
+                               "progress step(s); they are left in "
+                               "progress -- %s", len(missing),
+                               ", ".join(sorted(missing)))
+            ready_steps = self._apply_job_status(job_status)
+
+        self._build_ready_queue()
+        for key, record in ready_steps.items():
+            self._execute_record(key, record)
+
+        changed = len(self._dirty - unchanged)
+        logger.info("Recovery updated the state of %d step(s).", changed)
+        return changed
+
+    def in_progress_jobs(self):
+        """
+        Get the latest job identifier of each in progress step.
+
+        :returns: A dictionary mapping job identifiers to step names.
+        """
+        return dict((self.values[step].jobid[-1], step)
+                    for step in self.in_progress)
+
     def check_study_status(self):
         """
         Check the status of currently executing steps in the graph.
@@ -664,22 +1758,28 @@ class ExecutionGraph(DAG):
         steps in the ExecutionGraph. Each ExecutionGraph stores the adapter
         used to generate and execute its scripts.
         """
-        # Set up the job list and the map to get back to step names.
-        joblist = []
-        jobmap = {}
-        for step in self.in_progress:
-            jobid = self.values[step].jobid[-1]
-            joblist.append(jobid)
-            jobmap[jobid] = step
-
         # Grab the adapter from the ScriptAdapterFactory.
         adapter = ScriptAdapterFactory.get_adapter(self._adapter["type"])
         adapter = adapter(**self._adapter)
         # Use the adapter to grab the job statuses.
-        retcode, job_status = adapter.check_jobs(joblist)
-        # Map the job identifiers back to step names.
+        return self._map_job_status(
+            *adapter.check_jobs(list(self.in_progress_jobs())))
+
+    def _map_job_status(self, retcode, job_status):
+        """
+        Map the job states reported by a scheduler back to step names.
+
+        Jobs that do not belong to an in progress step of this graph are
+        ignored, so a status query may be shared with other graphs.
+
+        :param retcode: The JobStatusCode of the status query.
+        :param job_status: A dictionary of job identifiers to their State.
+        :returns: The return code and a dictionary of step names to State.
+        """
+        jobmap = self.in_progress_jobs()
         step_status = {jobmap[jobid]: status
-                       for jobid, status in job_status.items()}
+                       for jobid, status in job_status.items()
+                       if jobid in jobmap}
 
         # Based on return code, log something different.
         if retcode == JobStatusCode.OK:
@@ -689,6 +1789,43 @@ class ExecutionGraph(DAG):
             logger.info("No jobs found.")
             return retcode, step_status
         else:
-            msg = "Unknown Error (Code = {retcode})".format(retcode)
+            msg = "Unknown Error (Code = {})".format(retcode)
             logger.error(msg)
             return retcode, step_status
+
+    @staticmethod
+    def query_scheduler(graphs):
+        """
+        Check the in progress steps of several graphs at once.
+
+        Graphs that use the same adapter settings share a single status query,
+        so a scheduler is queried once no matter how many studies it runs
+        steps for. Graphs with no steps in progress are not queried.
+
+        :param graphs: A list of ExecutionGraphs.
+        :returns: A list with the return code and dictionary of job
+        identifiers to State of each graph's query (see poll_steps).
+        """
+        groups = {}
+        for index, graph in enumerate(graphs):
+            if not graph.in_progress:
+                continue
+            key = repr(sorted(graph.adapter.items()))
+            groups.setdefault(key, []).append(index)
+
+        results = [(JobStatusCode.NOJOBS, {})] * len(graphs)
+        for indices in groups.values():
+            settings = graphs[indices[0]]._adapter
+            joblist = []
+            for index in indices:
+                joblist.extend(graphs[index].in_progress_jobs())
+
+            adapter = ScriptAdapterFactory.get_adapter(settings["type"])
+            adapter = adapter(**settings)
+            logger.debug("Checking %d jobs of %d studies with one query.",
+                         len(joblist), len(indices))
+            result = adapter.check_jobs(joblist)
+            for index in indices:
+                results[index] = result
+
+        return results
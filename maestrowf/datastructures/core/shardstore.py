@@ -0,0 +1,295 @@
+###############################################################################
+# Copyright (c) 2017, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory
+# Written by Francesco Di Natale, dinatale3@llnl.gov.
+#
+# LLNL-CODE-734340
+# All rights reserved.
+# This file is part of MaestroWF, Version: 1.0.0.
+#
+# For details, see https://github.com/LLNL/maestrowf.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+
+"""A store that splits the state of an ExecutionGraph into shards."""
+
+from collections import OrderedDict
+import fnmatch
+import glob
+import logging
+import os
+import pickle
+
+from six.moves.urllib.parse import quote
+
+from maestrowf.datastructures.core import snapshot
+from maestrowf.utils import STATUS_COLUMNS, create_parentdir, status_row
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SHARD = "_global"
+_GRAPH = "graph.snap"
+_SHARD_EXT = ".shard"
+
+
+def _write(path, obj):
+    """Pickle an object to a temporary file and rename it into place."""
+    temp = "{}.tmp".format(path)
+    with open(temp, "wb") as shard:
+        pickle.dump(obj, shard, pickle.HIGHEST_PROTOCOL)
+    os.rename(temp, path)
+
+
+def _read(path):
+    """Load a pickled object from a file."""
+    with open(path, "rb") as shard:
+        return pickle.load(shard)
+
+
+class ShardStore(object):
+    """
+    A directory holding an ExecutionGraph and its step states in shards.
+
+    The graph itself (steps, scripts and dependencies) is written once as a
+    snapshot (see maestrowf.datastructures.core.snapshot) when the store is
+    saved. The execution state of the steps is split into one
+    shard per workspace: one for the steps that run in the study's global
+    workspace and one for each combination of parameters. Each shard is its
+    own file, so a commit only rewrites the shards that hold a step that
+    changed, and the status of some combinations can be read without
+    loading the graph or the other shards.
+
+    Shards hold lists of the (name, state, membership) entries produced by
+    ExecutionGraph.pop_changes, in topological order, along with the
+    workspace of each step.
+    """
+
+    def __init__(self, path):
+        """
+        Open (or create) a shard store.
+
+        :param path: Path to the directory of the store. The workspaces of
+        the steps are assigned to shards relative to the directory that
+        contains it, which should be the study's global workspace.
+        """
+        self._path = path
+        self._root = os.path.dirname(os.path.abspath(path))
+        # The shard of each step and the steps of each shard, in order.
+        self._shard_of = {}
+        self._shards = OrderedDict()
+        create_parentdir(path)
+
+    @property
+    def path(self):
+        """
+        Get the path of the directory of the store.
+
+        :returns: A string of the path to the directory.
+        """
+        return self._path
+
+    def close(self):
+        """Close the store (shards are only open while being accessed)."""
+
+    def shard_name(self, workspace):
+        """
+        Get the name of the shard that holds steps in a workspace.
+
+        The name is the path of the workspace relative to the study's global
+        workspace (or its absolute path, if it is outside of it) with path
+        separators and '%' percent-encoded, so that every workspace has a
+        shard of its own. A leading '_' is encoded as well so that no
+        workspace is named like the global shard.
+
+        :param workspace: The path to the workspace of a step.
+        :returns: The name of the shard for the workspace.
+        """
+        path = os.path.abspath(workspace)
+        relpath = os.path.relpath(path, self._root)
+        if relpath == os.curdir:
+            return GLOBAL_SHARD
+        if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+            relpath = path
+        name = quote(relpath, safe="")
+        if name.startswith("_"):
+            name = "%5F" + name[1:]
+        return name
+
+    def shards(self):
+        """
+        Get the names of the shards in the store.
+
+        :returns: A sorted list of shard names.
+        """
+        return sorted(
+            os.path.basename(path)[:-len(_SHARD_EXT)] for path in
+            glob.glob(os.path.join(self._path, "*" + _SHARD_EXT)))
+
+    def _shard_path(self, shard):
+        """Get the path of the file of a shard."""
+        return os.path.join(self._path, shard + _SHARD_EXT)
+
+    def _assign(self, dag):
+        """
+        Assign every step of an ExecutionGraph to its shard.
+
+        :param dag: The ExecutionGraph the store holds.
+        """
+        self._shard_of = {}
+        self._shards = OrderedDict()
+        for name in dag.topological_order():
+            record = dag.values[name]
+            if record is None:
+                continue
+            shard = self.shard_name(record.workspace)
+            self._shard_of[name] = shard
+            self._shards.setdefault(shard, []).append(name)
+
+    def _write_shard(self, dag, shard):
+        """
+        Write the current state of every step of a shard.
+
+        :param dag: The ExecutionGraph the store holds.
+        :param shard: The name of the shard to write.
+        """
+        names = self._shards[shard]
+        workspaces = [dag.values[name].workspace for name in names]
+        _write(self._shard_path(shard),
+               list(zip(dag.get_changes(names), workspaces)))
+
+    def save(self, dag):
+        """
+        Write a complete ExecutionGraph to the store.
+
+        This replaces the stored graph and all of the shards, and should be
+        used once a graph is staged or when its structure changes.
+
+        :param dag: The ExecutionGraph to store.
+        """
+        self._assign(dag)
+        dag.pop_changes()
+        for stale in set(self.shards()) - set(self._shards):
+            os.remove(self._shard_path(stale))
+        snapshot.dump(dag, os.path.join(self._path, _GRAPH))
+        for shard in self._shards:
+            self._write_shard(dag, shard)
+
+    def commit(self, dag):
+        """
+        Rewrite the shards that hold a step that changed since the last
+        commit.
+
+        :param dag: The ExecutionGraph that was loaded from the store.
+        :returns: The number of shards that were written.
+        """
+        if not self._shards:
+            self._assign(dag)
+        entries = dag.pop_changes()
+        dirty = set(self._shard_of[name] for name, _, _ in entries)
+        try:
+            for shard in dirty:
+                self._write_shard(dag, shard)
+        except Exception:
+            # Rewrite the shards of the steps next time.
+            dag.keep_changes(entries)
+            raise
+        logger.debug("Committed %d changed shard(s) to '%s'.", len(dirty),
+                     self._path)
+        return len(dirty)
+
+    def load(self):
+        """
+        Load the ExecutionGraph from the store with the latest step states.
+
+        :returns: The stored ExecutionGraph.
+        """
+        graph_path = os.path.join(self._path, _GRAPH)
+        if not os.path.exists(graph_path):
+            msg = "Shard store '{}' does not contain an ExecutionGraph." \
+                  .format(self._path)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        dag = snapshot.load(graph_path)
+        for shard in self.shards():
+            dag.apply_changes(
+                entry for entry, _ in _read(self._shard_path(shard)))
+        self._assign(dag)
+
+        return dag
+
+    def _entries(self, shards=None):
+        """
+        Read the entries of shards.
+
+        :param shards: An optional iterable of shell-style patterns. If
+        specified, only the shards whose names match one of them are read.
+        :returns: A generator of ((name, state, membership), workspace)
+        tuples.
+        """
+        for shard in self.shards():
+            if shards and not any(fnmatch.fnmatchcase(shard, pattern)
+                                  for pattern in shards):
+                continue
+            for entry in _read(self._shard_path(shard)):
+                yield entry
+
+    def count_by_state(self, shards=None):
+        """
+        Count the steps in each state.
+
+        :param shards: An optional iterable of shell-style patterns. If
+        specified, only steps in matching shards are counted.
+        :returns: A dictionary mapping each State present to a step count.
+        """
+        counts = {}
+        for (_, state, _), _ in self._entries(shards):
+            counts[state[0]] = counts.get(state[0], 0) + 1
+        return counts
+
+    def status_table(self, states=None, patterns=None, shards=None):
+        """
+        Get the status of the steps in the store.
+
+        Only the shards that are asked for are read; the graph is not.
+
+        :param states: An optional iterable of State values. If specified,
+        only steps in those states are included.
+        :param patterns: An optional iterable of shell-style patterns. If
+        specified, only steps whose names match one of them are included.
+        :param shards: An optional iterable of shell-style patterns. If
+        specified, only steps in matching shards are included.
+        :returns: An OrderedDict mapping each column of the status table to
+        a list of its values, in the same layout as the status.csv written
+        by ExecutionGraph.write_status. Rows are grouped by shard.
+        """
+        states = set(states or [])
+        table = OrderedDict((column, []) for column in STATUS_COLUMNS)
+        columns = list(table.values())
+        for (name, state, _), workspace in self._entries(shards):
+            if states and state[0] not in states:
+                continue
+            if patterns and not any(fnmatch.fnmatchcase(name, pattern)
+                                    for pattern in patterns):
+                continue
+            for column, value in zip(columns,
+                                     status_row(name, workspace, state)):
+                column.append(value)
+
+        return table
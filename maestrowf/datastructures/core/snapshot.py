@@ -0,0 +1,602 @@
+###############################################################################
+# Copyright (c) 2017, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory
+# Written by Francesco Di Natale, dinatale3@llnl.gov.
+#
+# LLNL-CODE-734340
+# All rights reserved.
+# This file is part of MaestroWF, Version: 1.0.0.
+#
+# For details, see https://github.com/LLNL/maestrowf.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+
+"""
+A versioned binary snapshot format for ExecutionGraphs.
+
+A snapshot holds the same information as a pickled ExecutionGraph, but only
+uses plain data types, so it does not depend on where the classes of the
+package live and loads much faster. Every string in the graph (step names,
+workspaces, scripts, commands and other step settings) is stored once in a
+string table and referred to by its index, and the state of the records is
+stored as fixed-width arrays with one entry per node.
+
+A snapshot file is laid out as follows. All integers and floats are little
+endian.
+
+    header:   the magic bytes 'MWFSNAP\\0', the format version (uint16) and
+              flags (uint16). If bit 0 of the flags is set, the rest of the
+              file is compressed with zlib.
+    body:     a sequence of sections. Each array is written as its number of
+              items (uint32) followed by the items.
+        strings:    the number of strings (uint32), an array of their UTF-8
+                    encoded lengths (uint32), then the encoded strings.
+        metadata:   the index of a JSON object holding the adapter settings,
+                    the description and the submission attempts.
+        nodes:      the name of each node and its position in the topological
+                    order (int32 arrays, by node index).
+        edges:      the offset of each node's children (N + 1 int32) and the
+                    flat array of children (int32), as in CSR format.
+        steps:      the template steps, stored once each however many records
+                    refer to them: the name and description of each step
+                    (int32 string indices), then offsets (T + 1 int32), the
+                    key (int32 string index) and the value of each entry of
+                    each step's 'run' dictionary.
+        records:    for each node, a flag byte (1: has a record, 2: to be
+                    scheduled, 4: completed, 8: in progress, 16: failed, 32:
+                    the step is an expansion of its template), the state
+                    (int8), the number of restarts and the restart limit
+                    (int32), the submission, start and end times (float64
+                    seconds since the epoch, -1 if not set), the workspace,
+                    script and restart script (int32 string indices, -1 for
+                    None), and the index of the template step (int32, -1 for
+                    no step).
+        job ids:    offsets (N + 1 int32) and the job identifiers of each
+                    record as values.
+        expansions: for each node, the name of an expanded step and its
+                    description if it differs from the template's (int32
+                    string indices, -1 for None), then offsets (N + 1 int32),
+                    the key (int32 string index) and the value of each entry
+                    of the 'run' dictionary that differs from the template.
+
+A record whose step is not an expansion refers to its step directly as a
+template. An expanded step is rebuilt as an ExpandedStep of its template, so
+the expansions of a step share one template after loading, as they do when
+the study is staged.
+
+Values that are not always strings are stored as a tag array (int8) and an
+index array (int32). A tag of 0 means the index refers to a string, and a
+tag of 1 means it refers to the JSON encoding of the value.
+
+Readers reject snapshots with a newer version than they understand.
+"""
+
+from array import array
+import json
+import logging
+import os
+import six
+import struct
+import sys
+import zlib
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core.executiongraph import ExecutionGraph, \
+    _StepRecord
+from maestrowf.datastructures.core.study import ExpandedStep, StudyStep
+from maestrowf.datastructures.core.throttle import Throttle
+from maestrowf.datastructures.dag import DAG
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MWFSNAP\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHH")
+_COUNT = struct.Struct("<I")
+_COMPRESSED = 1
+
+_HAS_RECORD = 1
+_TO_BE_SCHEDULED = 2
+_COMPLETED = 4
+_IN_PROGRESS = 8
+_FAILED = 16
+_EXPANDED = 32
+
+_STRING = 0
+_JSON = 1
+_NONE = -1
+_UNSET = -1.0
+
+
+def _to_bytes(values):
+    """Get the little endian bytes of an array."""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    if hasattr(values, "tobytes"):
+        return values.tobytes()
+    return values.tostring()
+
+
+def _from_bytes(typecode, data):
+    """Build an array from little endian bytes."""
+    values = array(typecode)
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class _Writer(object):
+    """Accumulates the sections of a snapshot and its string table."""
+
+    def __init__(self):
+        """Initialize an empty snapshot body."""
+        self.parts = []
+        self.strings = []
+        self._index = {}
+
+    def string(self, value):
+        """
+        Get the index of a string in the string table, adding it if needed.
+
+        :param value: A string, or None.
+        :returns: The index of the string, or -1 for None.
+        """
+        if value is None:
+            return _NONE
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def value(self, value, tags, indices):
+        """
+        Append a value that may not be a string.
+
+        :param value: The value to add.
+        :param tags: The array of value tags to append to.
+        :param indices: The array of string indices to append to.
+        """
+        if isinstance(value, six.string_types):
+            tags.append(_STRING)
+            indices.append(self.string(value))
+        else:
+            tags.append(_JSON)
+            indices.append(self.string(json.dumps(value)))
+
+    def array(self, values):
+        """
+        Append an array section.
+
+        :param values: The array to append.
+        """
+        self.parts.append(_COUNT.pack(len(values)))
+        self.parts.append(_to_bytes(values))
+
+    def getvalue(self):
+        """
+        Get the bytes of the body, with the string table first.
+
+        :returns: The encoded body of the snapshot.
+        """
+        encoded = [value.encode("utf-8") for value in self.strings]
+        lengths = array("I", (len(value) for value in encoded))
+        head = [_COUNT.pack(len(encoded)), _COUNT.pack(len(lengths)),
+                _to_bytes(lengths)]
+        return b"".join(head + encoded + self.parts)
+
+
+class _Reader(object):
+    """Reads the sections of a snapshot body in order."""
+
+    def __init__(self, data):
+        """
+        Initialize a reader and decode the string table.
+
+        :param data: The uncompressed body of a snapshot.
+        """
+        self._data = data
+        self._offset = 0
+        count = self.count()
+        lengths = self.array("I")
+        if len(lengths) != count:
+            raise ValueError("The string table of the snapshot is corrupt.")
+        start = self._offset
+        end = start + sum(lengths)
+        if end > len(data):
+            raise ValueError("The snapshot is truncated.")
+        self._offset = end
+
+        # Decode the table in one call. If every character is one byte
+        # (as paths and commands nearly always are) the byte lengths are
+        # also character offsets; otherwise decode each string separately.
+        text = data[start:end].decode("utf-8")
+        if len(text) != end - start:
+            text = data[start:end]
+        self.strings = []
+        position = 0
+        for length in lengths:
+            value = text[position:position + length]
+            if not isinstance(value, six.text_type):
+                value = value.decode("utf-8")
+            self.strings.append(value)
+            position += length
+        # Index -1 (used for None) refers to this last entry, so string
+        # indices can be looked up without checking for None.
+        self.strings.append(None)
+
+    def count(self):
+        """Read an item count."""
+        end = self._offset + _COUNT.size
+        if end > len(self._data):
+            raise ValueError("The snapshot is truncated.")
+        value, = _COUNT.unpack(self._data[self._offset:end])
+        self._offset = end
+        return value
+
+    def array(self, typecode):
+        """Read an array section of the given type."""
+        count = self.count()
+        end = self._offset + count * array(typecode).itemsize
+        if end > len(self._data):
+            raise ValueError("The snapshot is truncated.")
+        values = _from_bytes(typecode, self._data[self._offset:end])
+        self._offset = end
+        return values
+
+    def string_array(self):
+        """Read an array of string indices as the strings (None for -1)."""
+        return list(map(self.strings.__getitem__, self.array("i")))
+
+    def values(self, tags, indices):
+        """Decode a sequence of tagged values."""
+        strings = self.strings
+        # Scalars such as node counts repeat across most steps, so each is
+        # only decoded once. Lists and dicts are decoded for every use so
+        # that steps never share a mutable value.
+        scalars = {}
+        values = []
+        for tag, index in zip(tags, indices):
+            if tag == _STRING:
+                values.append(strings[index])
+            elif index in scalars:
+                values.append(scalars[index])
+            else:
+                value = json.loads(strings[index])
+                if not isinstance(value, (list, dict)):
+                    scalars[index] = value
+                values.append(value)
+        return values
+
+
+def _add_run(out, run, offsets, keys, tags, values):
+    """
+    Append the entries of a 'run' dictionary.
+
+    :param out: The _Writer of the snapshot.
+    :param run: The dictionary to append.
+    :param offsets: The array of entry offsets to append to.
+    :param keys: The array of key string indices to append to.
+    :param tags: The array of value tags to append to.
+    :param values: The array of value indices to append to.
+    """
+    for key, value in run.items():
+        keys.append(out.string(key))
+        out.value(value, tags, values)
+    offsets.append(len(keys))
+
+
+def dumps(graph, compress=False):
+    """
+    Encode an ExecutionGraph as a snapshot.
+
+    :param graph: The ExecutionGraph to encode.
+    :param compress: If True, compress the snapshot with zlib.
+    :returns: The bytes of the snapshot.
+    """
+    # The DAG state holds the edges in CSR form and leaves the records as
+    # they are, instead of packing them into a RecordTable.
+    state = DAG.__getstate__(graph)
+    names = state["_names"]
+    offsets, targets = state["_csr"]
+    groups = ((state["completed_steps"], _COMPLETED),
+              (state["in_progress"], _IN_PROGRESS),
+              (state["failed_steps"], _FAILED))
+    out = _Writer()
+
+    meta = {
+        "adapter": state["_adapter"],
+        "description": state["_description"],
+        "submission_attempts": state["_submission_attempts"],
+        "sentinel_dir": state["_sentinel_dir"],
+        "limits": state["_throttle"].settings(),
+    }
+    out.array(array("i", [out.string(json.dumps(meta))]))
+    out.array(array("i", (out.string(name) for name in names)))
+    out.array(array("i", state["_ord"]))
+    out.array(array("i", offsets))
+    out.array(array("i", targets))
+
+    # Template steps, by the identity of the step object.
+    templates = {}
+    steps = []
+
+    def template(step):
+        index = templates.get(id(step))
+        if index is None:
+            index = templates[id(step)] = len(steps)
+            steps.append(step)
+        return index
+
+    flags = array("B")
+    status, restarts, limits = array("b"), array("i"), array("i")
+    times = (array("d"), array("d"), array("d"))
+    strings = (array("i"), array("i"), array("i"))
+    step_index = array("i")
+    job_offsets = array("i", [0])
+    job_tags, job_ids = array("b"), array("i")
+    step_names, descriptions = array("i"), array("i")
+    run = (array("i", [0]), array("i"), array("b"), array("i"))
+    for name, record in zip(names, graph._objs):
+        flag = 0
+        for group, bit in groups:
+            if name in group:
+                flag |= bit
+        step = None if record is None else record.step
+        if record is None:
+            status.append(0)
+            restarts.append(0)
+            limits.append(0)
+            for column in times:
+                column.append(_UNSET)
+            for column in strings:
+                column.append(_NONE)
+        else:
+            flag |= _HAS_RECORD
+            if record.to_be_scheduled:
+                flag |= _TO_BE_SCHEDULED
+            status.append(record.status.value)
+            restarts.append(record._num_restarts)
+            limits.append(record.restart_limit)
+            for column, value in zip(times, (record._submit_time,
+                                             record._start_time,
+                                             record._end_time)):
+                column.append(_UNSET if value is None else value)
+            for column, value in zip(strings, (record.workspace,
+                                               record.script,
+                                               record.restart_script)):
+                column.append(out.string(value))
+            for jobid in record.jobid:
+                out.value(jobid, job_tags, job_ids)
+        job_offsets.append(len(job_ids))
+
+        if step is None:
+            step_index.append(_NONE)
+        elif isinstance(step, ExpandedStep):
+            flag |= _EXPANDED
+            step_index.append(template(step.template))
+        else:
+            step_index.append(template(step))
+        flags.append(flag)
+
+        if flag & _EXPANDED:
+            step_names.append(out.string(step.name))
+            descriptions.append(out.string(step._description))
+            _add_run(out, step._run, *run)
+        else:
+            step_names.append(_NONE)
+            descriptions.append(_NONE)
+            run[0].append(len(run[1]))
+
+    template_run = (array("i", [0]), array("i"), array("b"), array("i"))
+    for step in steps:
+        _add_run(out, step.run, *template_run)
+    out.array(array("i", (out.string(step.name) for step in steps)))
+    out.array(array("i", (out.string(step.description) for step in steps)))
+    for values in template_run:
+        out.array(values)
+
+    out.array(flags)
+    out.array(status)
+    out.array(restarts)
+    out.array(limits)
+    for values in times + strings:
+        out.array(values)
+    out.array(step_index)
+    for values in (job_offsets, job_tags, job_ids, step_names, descriptions):
+        out.array(values)
+    for values in run:
+        out.array(values)
+
+    body = out.getvalue()
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= _COMPRESSED
+    return _HEADER.pack(MAGIC, VERSION, flags) + body
+
+
+def _read_runs(reader):
+    """
+    Read the entries of a sequence of 'run' dictionaries.
+
+    :param reader: The _Reader of the snapshot.
+    :returns: A list of the dictionaries.
+    """
+    offsets = reader.array("i")
+    keys = reader.string_array()
+    values = reader.values(reader.array("b"), reader.array("i"))
+    return [dict(zip(keys[first:last], values[first:last]))
+            for first, last in zip(offsets, offsets[1:])]
+
+
+def loads(data, cls=ExecutionGraph):
+    """
+    Decode an ExecutionGraph from a snapshot.
+
+    :param data: The bytes of a snapshot.
+    :param cls: The ExecutionGraph class (or subclass) to create.
+    :returns: An instance of cls.
+    """
+    if len(data) < _HEADER.size:
+        msg = "The data is too short to be an ExecutionGraph snapshot."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    magic, version, flags = _HEADER.unpack(data[:_HEADER.size])
+    if magic != MAGIC:
+        msg = "The data is not an ExecutionGraph snapshot."
+        logger.error(msg)
+        raise ValueError(msg)
+    if version > VERSION:
+        msg = "Snapshot version {} is newer than the supported version " \
+              "{}.".format(version, VERSION)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    body = data[_HEADER.size:]
+    if flags & _COMPRESSED:
+        body = zlib.decompress(body)
+    reader = _Reader(body)
+
+    meta = json.loads(reader.strings[reader.array("i")[0]])
+    names = reader.string_array()
+    order = reader.array("i")
+    offsets = reader.array("i")
+    targets = reader.array("i")
+
+    steps = []
+    for name, description, run in zip(reader.string_array(),
+                                      reader.string_array(),
+                                      _read_runs(reader)):
+        step = StudyStep.__new__(StudyStep)
+        step.__dict__ = {"name": name, "description": description,
+                         "run": run}
+        steps.append(step)
+
+    flags = reader.array("B")
+    status = reader.array("b")
+    restarts = reader.array("i")
+    limits = reader.array("i")
+    submit_times, start_times, end_times = (
+        [None if value == _UNSET else value for value in reader.array("d")]
+        for _ in range(3))
+    workspaces, scripts, restart_scripts = (
+        reader.string_array() for _ in range(3))
+    step_index = reader.array("i")
+    job_offsets = reader.array("i")
+    job_ids = reader.values(reader.array("b"), reader.array("i"))
+    step_names = reader.string_array()
+    descriptions = reader.string_array()
+    runs = _read_runs(reader)
+
+    completed, in_progress, failed = set(), set(), set()
+    records = []
+    for index, name in enumerate(names):
+        flag = flags[index]
+        if flag & _COMPLETED:
+            completed.add(name)
+        if flag & _IN_PROGRESS:
+            in_progress.add(name)
+        if flag & _FAILED:
+            failed.add(name)
+        if not flag & _HAS_RECORD:
+            records.append(None)
+            continue
+
+        step = None if step_index[index] == _NONE \
+            else steps[step_index[index]]
+        if flag & _EXPANDED:
+            template = step
+            step = ExpandedStep.__new__(ExpandedStep)
+            step.template = template
+            step.name = step_names[index]
+            step._description = descriptions[index]
+            step._run = runs[index]
+
+        record = _StepRecord.__new__(_StepRecord)
+        record.workspace = workspaces[index]
+        record.jobid = tuple(job_ids[job_offsets[index]:
+                                     job_offsets[index + 1]])
+        record.script = scripts[index]
+        record.restart_script = restart_scripts[index]
+        record.to_be_scheduled = bool(flag & _TO_BE_SCHEDULED)
+        record.step = step
+        record.restart_limit = limits[index]
+        record.status = State(status[index])
+        record._num_restarts = restarts[index]
+        record._submit_time = submit_times[index]
+        record._start_time = start_times[index]
+        record._end_time = end_times[index]
+        records.append(record)
+
+    graph = cls.__new__(cls)
+    state = cls().__getstate__()
+    state.update({
+        "_adapter": meta["adapter"],
+        "_description": meta["description"],
+        "_submission_attempts": meta["submission_attempts"],
+        "_sentinel_dir": meta.get("sentinel_dir"),
+        "_throttle": Throttle(**meta.get("limits", {})),
+        "_names": names,
+        "_ord": order,
+        "_csr": (offsets, targets),
+        "_objs": records,
+        "completed_steps": completed,
+        "in_progress": in_progress,
+        "failed_steps": failed,
+    })
+    graph.__setstate__(state)
+    return graph
+
+
+def dump(graph, path, compress=False):
+    """
+    Write a snapshot of an ExecutionGraph to a file.
+
+    The snapshot is written to a temporary file and renamed into place, so
+    an interrupted write never replaces the last good snapshot.
+
+    :param graph: The ExecutionGraph to write.
+    :param path: The path to write the snapshot to.
+    :param compress: If True, compress the snapshot with zlib.
+    """
+    data = dumps(graph, compress)
+    temp = "{}.tmp".format(path)
+    with open(temp, "wb") as snapshot:
+        snapshot.write(data)
+    os.rename(temp, path)
+
+
+def load(path, cls=ExecutionGraph):
+    """
+    Read an ExecutionGraph from a snapshot file.
+
+    :param path: The path of the snapshot.
+    :param cls: The ExecutionGraph class (or subclass) to create.
+    :returns: An instance of cls.
+    """
+    with open(path, "rb") as snapshot:
+        return loads(snapshot.read(), cls)
@@ -0,0 +1,283 @@
+###############################################################################
+# Copyright (c) 2017, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory
+# Written by Francesco Di Natale, dinatale3@llnl.gov.
+#
+# LLNL-CODE-734340
+# All rights reserved.
+# This file is part of MaestroWF, Version: 1.0.0.
+#
+# For details, see https://github.com/LLNL/maestrowf.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+
+"""A SQLite backed store for the execution state of an ExecutionGraph."""
+
+from collections import OrderedDict
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from six.moves.urllib.request import pathname2url
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import snapshot
+from maestrowf.utils import STATUS_COLUMNS, status_row
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS graph ("
+    " id INTEGER PRIMARY KEY CHECK (id = 0),"
+    " data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS steps ("
+    " name TEXT PRIMARY KEY,"
+    " workspace TEXT NOT NULL,"
+    " state TEXT NOT NULL,"
+    " jobid TEXT NOT NULL,"
+    " restarts INTEGER NOT NULL,"
+    " submit_time REAL,"
+    " start_time REAL,"
+    " end_time REAL,"
+    " completed INTEGER NOT NULL,"
+    " in_progress INTEGER NOT NULL,"
+    " failed INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS steps_state ON steps (state)",
+)
+
+
+class StateStore(object):
+    """
+    A SQLite database holding an ExecutionGraph and the state of its steps.
+
+    The graph itself (steps, scripts and dependencies) is stored once as a
+    snapshot (see maestrowf.datastructures.core.snapshot) when the store is
+    saved. The execution state of each step is kept
+    in its own row, indexed by name and by state, so that only the rows of
+    steps that changed need to be written as a study runs and so that the
+    status of a study can be queried without loading the graph.
+
+    The database uses write-ahead logging so that readers never block the
+    conductor. Write-ahead logging needs shared memory between processes,
+    so the database should be on a local file system.
+
+    A store may be used from a thread other than the one that opened it (the
+    EventConductor persists from a worker thread), and access to its
+    connection is serialized.
+    """
+
+    def __init__(self, path, read_only=False):
+        """
+        Open (or create) a state store.
+
+        :param path: Path to the SQLite database file.
+        :param read_only: If True, open an existing store for queries only.
+        The database is not created, changed or converted to write-ahead
+        logging.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        if read_only:
+            if not os.path.exists(path):
+                msg = "State store '{}' does not exist.".format(path)
+                logger.error(msg)
+                raise IOError(msg)
+            uri = "file:{}?mode=ro".format(
+                pathname2url(os.path.abspath(path)))
+            try:
+                self._conn = sqlite3.connect(uri, uri=True,
+                                             check_same_thread=False)
+            except TypeError:
+                # Python 2 can't open a URI, but nothing is written to a
+                # store that is only queried.
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+            return
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    @property
+    def path(self):
+        """
+        Get the path of the database file of the store.
+
+        :returns: A string of the path to the database.
+        """
+        return self._path
+
+    def close(self):
+        """Close the connection to the database."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_row(entry):
+        """
+        Convert an entry of ExecutionGraph.pop_changes to column values.
+
+        :param entry: A (name, state, membership) tuple.
+        :returns: A tuple of the state, jobid, restarts, submit_time,
+        start_time, end_time, completed, in_progress, failed and name columns.
+        """
+        name, state, membership = entry
+        status, jobid, restarts, submit, start, end = state
+        return (status.name, json.dumps(jobid), restarts, submit, start,
+                end) + tuple(int(member) for member in membership) + (name,)
+
+    def save(self, dag):
+        """
+        Write a complete ExecutionGraph to the store.
+
+        This replaces the stored graph and the rows of all of its steps, and
+        should be used once a graph is staged or when its structure changes.
+        Rows are written in topological order.
+
+        :param dag: The ExecutionGraph to store.
+        """
+        data = snapshot.dumps(dag)
+        entries = dict((entry[0], entry)
+                       for entry in dag.pop_changes(all_steps=True))
+        rows = [self._to_row(entries[name]) + (dag.values[name].workspace,)
+                for name in dag.topological_order() if name in entries]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM steps")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO graph VALUES (0, ?)",
+                (sqlite3.Binary(data),))
+            self._conn.executemany(
+                "INSERT INTO steps (state, jobid, restarts, submit_time, "
+                "start_time, end_time, completed, in_progress, failed, name, "
+                "workspace) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def commit(self, dag):
+        """
+        Write the state of the steps that changed since the last commit.
+
+        All of the changed rows are updated in a single transaction.
+
+        :param dag: The ExecutionGraph that was loaded from the store.
+        :returns: The number of rows that were written.
+        """
+        entries = dag.pop_changes()
+        rows = [self._to_row(entry) for entry in entries]
+        if rows:
+            try:
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        "UPDATE steps SET state = ?, jobid = ?, "
+                        "restarts = ?, submit_time = ?, start_time = ?, "
+                        "end_time = ?, completed = ?, in_progress = ?, "
+                        "failed = ? WHERE name = ?", rows)
+            except Exception:
+                # The transaction was rolled back, so commit them next time.
+                dag.keep_changes(entries)
+                raise
+        logger.debug("Committed %d changed step(s) to '%s'.", len(rows),
+                     self._path)
+        return len(rows)
+
+    def load(self):
+        """
+        Load the ExecutionGraph from the store with the latest step states.
+
+        :returns: The stored ExecutionGraph.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM graph").fetchone()
+            rows = self._conn.execute(
+                "SELECT name, state, jobid, restarts, submit_time, "
+                "start_time, end_time, completed, in_progress, failed "
+                "FROM steps").fetchall()
+        if row is None:
+            msg = "State store '{}' does not contain an ExecutionGraph." \
+                  .format(self._path)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        dag = snapshot.loads(bytes(row[0]))
+
+        entries = []
+        for name, state, jobid, restarts, submit, start, end, completed, \
+                in_progress, failed in rows:
+            entries.append((
+                name,
+                (State[state], json.loads(jobid), restarts, submit, start,
+                 end),
+                (bool(completed), bool(in_progress), bool(failed))))
+        dag.apply_changes(entries)
+
+        return dag
+
+    def count_by_state(self):
+        """
+        Count the steps in each state.
+
+        :returns: A dictionary mapping each State present to a step count.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM steps GROUP BY state").fetchall()
+        return {State[state]: count for state, count in rows}
+
+    def status_table(self, states=None, patterns=None):
+        """
+        Get the status of the steps in the store.
+
+        :param states: An optional iterable of State values. If specified,
+        only steps in those states are included.
+        :param patterns: An optional iterable of shell-style patterns. If
+        specified, only steps whose names match one of them are included.
+        :returns: An OrderedDict mapping each column of the status table to
+        a list of its values (in the order of the rows), in the same layout
+        as the status.csv written by ExecutionGraph.write_status.
+        """
+        query = "SELECT name, workspace, state, restarts, submit_time, " \
+                "start_time, end_time FROM steps"
+        args = []
+        clauses = []
+        if states:
+            names = [state.name for state in states]
+            clauses.append("state IN ({})".format(
+                ", ".join("?" for _ in names)))
+            args.extend(names)
+        if patterns:
+            clauses.append("({})".format(
+                " OR ".join("name GLOB ?" for _ in patterns)))
+            args.extend(patterns)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY rowid"
+
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+
+        table = OrderedDict((column, []) for column in STATUS_COLUMNS)
+        columns = list(table.values())
+        for name, workspace, state, restarts, submit, start, end in rows:
+            row = status_row(name, workspace, (State[state], None, restarts,
+                                               submit, start, end))
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        return table
@@ -0,0 +1,426 @@
+###############################################################################
+# Copyright (c) 2017, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory
+# Written by Francesco Di Natale, dinatale3@llnl.gov.
+#
+# LLNL-CODE-734340
+# All rights reserved.
+# This file is part of MaestroWF, Version: 1.0.0.
+#
+# For details, see https://github.com/LLNL/maestrowf.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+
+"""
+An indexed binary status file that can be queried without reading it all.
+
+The status file holds the same information as status.csv. Every column is
+a fixed-width array, so it can be memory-mapped and a query only touches
+the pages of the columns (and rows) it needs. For example, counting steps
+by state only reads the state column, and looking up steps by name uses a
+sorted index instead of scanning every name.
+
+The file is laid out as follows. All integers and floats are little endian
+and every column has one entry per step, in topological order.
+
+    header:     the magic bytes 'MWFSTAT\\0', the format version (uint16),
+                reserved (uint16), the number of steps (uint32), and the
+                widths in bytes of the name and workspace columns (uint32).
+    state:      the State value of each step (int8).
+    restarts:   the number of restarts of each step (int32).
+    times:      the submission, start and end times of each step, as three
+                columns (float64 seconds since the epoch, -1 if not set).
+    names:      the UTF-8 encoded name of each step, padded with NUL bytes
+                to the width of the column.
+    workspaces: the name of the workspace directory of each step, padded
+                in the same way.
+    index:      the row numbers (uint32) of the steps sorted by name.
+
+Every step has a fixed-width slot in each column, so the state, restarts
+and times of steps that changed are updated in place (see
+update_status_file) instead of rewriting the file.
+"""
+
+import fnmatch
+import logging
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from maestrowf.abstracts.enums import State
+from maestrowf.utils import STATUS_COLUMNS, status_row
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MWFSTAT\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHHIII")
+_UNSET = -1.0
+
+
+def _pad(values, width):
+    """Join encoded strings into a column padded to a fixed width."""
+    return b"".join(value.ljust(width, b"\0") for value in values)
+
+
+def _layout(count, name_width, ws_width):
+    """
+    Find the offsets of the columns of a status file.
+
+    :param count: The number of steps in the file.
+    :param name_width: The width in bytes of the name column.
+    :param ws_width: The width in bytes of the workspace column.
+    :returns: A tuple of the offsets of the state, restarts, names,
+    workspaces and index columns, a list of the offsets of the three time
+    columns, and the size of the file.
+    """
+    state = _HEADER.size
+    restarts = state + count
+    times = [restarts + 4 * count + 8 * count * column
+             for column in range(3)]
+    names = restarts + 28 * count
+    workspaces = names + name_width * count
+    index = workspaces + ws_width * count
+    return state, restarts, names, workspaces, index, times, \
+        index + 4 * count
+
+
+def _read_header(data, path):
+    """
+    Read and check the header of a status file.
+
+    :param data: A buffer holding the status file.
+    :param path: The path of the status file, for error messages.
+    :returns: A tuple of the number of steps and the widths of the name and
+    workspace columns.
+    :raises ValueError: If the buffer does not hold a status file.
+    """
+    if len(data) < _HEADER.size:
+        msg = "'{}' is not a status file.".format(path)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    magic, version, _, count, name_width, ws_width = \
+        _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        msg = "'{}' is not a status file.".format(path)
+        logger.error(msg)
+        raise ValueError(msg)
+    if version > VERSION:
+        msg = "Status file version {} is newer than the supported " \
+              "version {}.".format(version, VERSION)
+        logger.error(msg)
+        raise ValueError(msg)
+    if len(data) < _layout(count, name_width, ws_width)[-1]:
+        msg = "Status file '{}' is truncated.".format(path)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    return count, name_width, ws_width
+
+
+def write_status_file(path, rows):
+    """
+    Write a binary status file.
+
+    The file is written to a temporary file and renamed into place, so
+    readers always see a complete file.
+
+    :param path: The path to write the status file to.
+    :param rows: A sequence of (name, workspace, state, restarts,
+    submit time, start time, end time) tuples in topological order. The
+    state is a State and the times are seconds since the epoch or None.
+    """
+    count = len(rows)
+    names = [row[0].encode("utf-8") for row in rows]
+    workspaces = [os.path.split(row[1])[1].encode("utf-8") for row in rows]
+    name_width = max([len(name) for name in names] or [0])
+    ws_width = max([len(workspace) for workspace in workspaces] or [0])
+    index = sorted(range(count), key=names.__getitem__)
+
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, 0, count, name_width, ws_width),
+        struct.pack("<{}b".format(count), *[row[2].value for row in rows]),
+        struct.pack("<{}i".format(count), *[row[3] for row in rows]),
+    ]
+    for column in (4, 5, 6):
+        parts.append(struct.pack(
+            "<{}d".format(count),
+            *[_UNSET if row[column] is None else row[column]
+              for row in rows]))
+    parts.append(_pad(names, name_width))
+    parts.append(_pad(workspaces, ws_width))
+    parts.append(struct.pack("<{}I".format(count), *index))
+
+    temp = "{}.tmp".format(path)
+    with open(temp, "wb") as status_file:
+        status_file.write(b"".join(parts))
+    os.rename(temp, path)
+
+
+def update_status_file(path, count, rows):
+    """
+    Update the state of steps in a binary status file in place.
+
+    Only the state, restart count and times of the given rows are written,
+    through a writable memory map, so the cost of an update depends on the
+    number of steps that changed rather than on the size of the study.
+    Readers always see a complete file, but may see a row part way through
+    being updated.
+
+    :param path: The path of a status file written by write_status_file.
+    :param count: The number of steps the file is expected to hold.
+    :param rows: An iterable of (row, state, restarts, submit time, start
+    time, end time) tuples, where row is the position of the step in the
+    rows the file was written with.
+    :raises ValueError: If the file is not a status file for count steps.
+    """
+    with open(path, "r+b") as status_file:
+        data = mmap.mmap(status_file.fileno(), 0, access=mmap.ACCESS_WRITE)
+        try:
+            found, name_width, ws_width = _read_header(data, path)
+            if found != count:
+                msg = "Status file '{}' does not hold {} steps." \
+                      .format(path, count)
+                logger.error(msg)
+                raise ValueError(msg)
+
+            state, restarts, _, _, _, times, _ = \
+                _layout(count, name_width, ws_width)
+            for row, status, num_restarts, submit, start, end in rows:
+                struct.pack_into("<b", data, state + row, status.value)
+                struct.pack_into("<i", data, restarts + 4 * row,
+                                 num_restarts)
+                for offset, value in zip(times, (submit, start, end)):
+                    struct.pack_into("<d", data, offset + 8 * row,
+                                     _UNSET if value is None else value)
+        finally:
+            data.close()
+
+
+class StatusFile(object):
+    """
+    A read-only, memory-mapped view of a binary status file.
+
+    Values are read from the mapped file on demand, so the cost of a query
+    depends on the columns and rows it touches rather than on the size of
+    the study.
+    """
+
+    def __init__(self, path):
+        """
+        Open a status file.
+
+        :param path: Path to a status file written by write_status_file.
+        """
+        self._path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self._file.close()
+            msg = "'{}' is not a status file.".format(path)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        try:
+            count, name_width, ws_width = _read_header(self._map, path)
+        except ValueError:
+            self.close()
+            raise
+
+        self._count = count
+        self._name_width = name_width
+        self._ws_width = ws_width
+        self._state, self._restarts, self._names, self._workspaces, \
+            self._index, self._times, _ = \
+            _layout(count, name_width, ws_width)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def path(self):
+        """
+        Get the path of the status file.
+
+        :returns: A string of the path to the status file.
+        """
+        return self._path
+
+    def close(self):
+        """Close the status file."""
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _states(self):
+        """Get the State value of every step, in row order."""
+        return bytearray(self._map[self._state:self._state + self._count])
+
+    def _name(self, row):
+        """Get the name of the step in a row."""
+        start = self._names + row * self._name_width
+        return self._map[start:start + self._name_width].rstrip(b"\0")
+
+    def _sorted_row(self, position):
+        """Get the row of the step at a position of the name index."""
+        return struct.unpack_from("<I", self._map,
+                                  self._index + 4 * position)[0]
+
+    def count_by_state(self):
+        """
+        Count the steps in each state.
+
+        :returns: A dictionary mapping each State present to a step count.
+        """
+        counts = {}
+        for value in self._states():
+            counts[value] = counts.get(value, 0) + 1
+        return {State(value): count for value, count in counts.items()}
+
+    def _match(self, pattern):
+        """
+        Find the rows of the steps whose names match a pattern.
+
+        The steps whose names start with the part of the pattern before its
+        first wildcard are found with a binary search of the name index, so
+        only those names are read.
+
+        :param pattern: A shell-style pattern (as used by fnmatch).
+        :returns: A set of row numbers.
+        """
+        encoded = pattern.encode("utf-8")
+        prefix = encoded
+        for wildcard in (b"*", b"?", b"["):
+            prefix = prefix.split(wildcard, 1)[0]
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(self._sorted_row(middle)) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+
+        rows = set()
+        for position in range(low, self._count):
+            row = self._sorted_row(position)
+            name = self._name(row)
+            if not name.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(name, encoded):
+                rows.add(row)
+        return rows
+
+    def find(self, states=None, patterns=None):
+        """
+        Find the steps that match a query.
+
+        :param states: An optional iterable of State values. If specified,
+        only steps in those states are included.
+        :param patterns: An optional iterable of shell-style patterns. If
+        specified, only steps whose names match one of them are included.
+        :returns: A list of row numbers in topological order.
+        """
+        rows = None
+        if patterns:
+            rows = set()
+            for pattern in patterns:
+                rows |= self._match(pattern)
+            rows = sorted(rows)
+
+        if states:
+            values = set(state.value for state in states)
+            if rows is None:
+                rows = [row for row, value in enumerate(self._states())
+                        if value in values]
+            else:
+                rows = [row for row in rows if struct.unpack_from(
+                    "<b", self._map, self._state + row)[0] in values]
+
+        if rows is None:
+            rows = range(self._count)
+        return list(rows)
+
+    def _numbers(self, offset, code, rows):
+        """
+        Read the values of a numeric column for a list of rows.
+
+        :param offset: The offset of the column in the file.
+        :param code: The struct format code of the column's values.
+        :param rows: A list of row numbers.
+        :returns: A sequence of the values in the rows.
+        """
+        if len(rows) == self._count:
+            return struct.unpack_from("<{}{}".format(self._count, code),
+                                      self._map, offset)
+        size = struct.calcsize("<" + code)
+        return [struct.unpack_from("<" + code, self._map,
+                                   offset + size * row)[0] for row in rows]
+
+    def _strings(self, offset, width, rows):
+        """
+        Read the values of a string column for a list of rows.
+
+        :param offset: The offset of the column in the file.
+        :param width: The width of the column's values.
+        :param rows: A list of row numbers.
+        :returns: A list of the strings in the rows.
+        """
+        data = self._map
+        return [data[offset + width * row:offset + width * (row + 1)]
+                .rstrip(b"\0").decode("utf-8") for row in rows]
+
+    def status_table(self, states=None, patterns=None):
+        """
+        Get the status of the steps that match a query.
+
+        :param states: An optional iterable of State values. If specified,
+        only steps in those states are included.
+        :param patterns: An optional iterable of shell-style patterns. If
+        specified, only steps whose names match one of them are included.
+        :returns: An OrderedDict mapping each column of the status table to
+        a list of its values (in the order of the rows), in the same layout
+        as the status.csv written by ExecutionGraph.write_status.
+        """
+        rows = self.find(states, patterns)
+        labels = dict((state.value, state) for state in State)
+        submit, start, end = (
+            [None if value == _UNSET else value
+             for value in self._numbers(offset, "d", rows)]
+            for offset in self._times)
+
+        table = OrderedDict((column, []) for column in STATUS_COLUMNS)
+        columns = list(table.values())
+        for name, workspace, state, restarts, times in zip(
+                self._strings(self._names, self._name_width, rows),
+                self._strings(self._workspaces, self._ws_width, rows),
+                self._numbers(self._state, "b", rows),
+                self._numbers(self._restarts, "i", rows),
+                zip(submit, start, end)):
+            row = status_row(name, workspace,
+                             (labels[state], None, restarts) + times)
+            for column, value in zip(columns, row):
+                column.append(value)
+        return table
@@ -88,6 +88,14 @@ class StudyStep(SimObject):
         # Return if the new step is modified and the step itself.
         return self.__ne__(tmp), tmp
 
+    def materialize(self):
+        """
+        Get a StudyStep with all of the step's settings.
+
+        :returns: The StudyStep itself, since it stores all of its settings.
+        """
+        return self
+
     def __eq__(self, other):
         """
         Equality operator for the StudyStep class.
@@ -114,6 +122,194 @@ class StudyStep(SimObject):
         return not self.__eq__(other)
 
 
+def _copy_value(value):
+    """Copy a run value if it is mutable."""
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
+
+
+class ExpandedStep(object):
+    """
+    A StudyStep expanded for a single combination of parameters.
+
+    Most settings of a step (description, pre, post, nodes, procs, walltime)
+    are the same for every combination, so an ExpandedStep refers to the
+    template StudyStep it was expanded from and only stores its own name,
+    and the description and run entries that differ from the template. The
+    template is shared by every expansion of a step and must not be modified
+    once expansion starts.
+
+    An ExpandedStep has the same name, description and run attributes as a
+    StudyStep. Reading 'run' builds a new dictionary, so changes to it are
+    only kept by assigning it back to 'run'.
+    """
+
+    __slots__ = ("template", "name", "_description", "_run")
+
+    def __init__(self, template, name=None):
+        """
+        Initialize an expansion of a StudyStep that has no changes.
+
+        :param template: The StudyStep being expanded.
+        :param name: The name of the expanded step (defaults to the name of
+        the template).
+        """
+        self.template = template
+        self.name = template.name if name is None else name
+        # None when the description is the template's.
+        self._description = None
+        self._run = {}
+
+    @property
+    def description(self):
+        """
+        Get the description of the step.
+
+        :returns: The description of the step.
+        """
+        if self._description is None:
+            return self.template.description
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        """
+        Set the description of the step.
+
+        :param value: The new description of the step.
+        """
+        if value == self.template.description:
+            value = None
+        self._description = value
+
+    @property
+    def run(self):
+        """
+        Get the run settings of the step.
+
+        :returns: A new dictionary of the template's run settings updated
+        with the settings changed in this step.
+        """
+        run = {key: _copy_value(value)
+               for key, value in self.template.run.items()}
+        for key, value in self._run.items():
+            run[key] = _copy_value(value)
+        return run
+
+    @run.setter
+    def run(self, run):
+        """
+        Set the run settings of the step.
+
+        Only the entries that differ from the template are stored.
+
+        :param run: A dictionary of the run settings of the step.
+        """
+        template = self.template.run
+        self._run = {key: value for key, value in run.items()
+                     if key not in template or template[key] != value}
+
+    def apply(self, func):
+        """
+        Apply a function to the name, description and run settings.
+
+        The function is applied to the current value of every field as by
+        maestrowf.utils.apply_function. Results equal to the template's value
+        are dropped so that they stay shared with the template.
+
+        :param func: A function that takes a string and returns a string.
+        :returns: True if the function changed any field, False otherwise.
+        """
+        modified = False
+        name = apply_function(self.name, func)
+        if name != self.name:
+            self.name = name
+            modified = True
+
+        description = apply_function(self.description, func)
+        if description != self.description:
+            self.description = description
+            modified = True
+
+        template = self.template.run
+        for key, value in template.items():
+            current = self._run.get(key, value)
+            result = apply_function(current, func)
+            if result == current:
+                continue
+
+            modified = True
+            if result == value:
+                del self._run[key]
+            else:
+                self._run[key] = result
+
+        return modified
+
+    def materialize(self):
+        """
+        Build a complete StudyStep for the expanded step.
+
+        :returns: A StudyStep that does not share any state with the
+        template.
+        """
+        step = StudyStep()
+        step.name = self.name
+        step.description = self.description
+        step.run = self.run
+        return step
+
+    def to_dict(self):
+        """Return a dictionary version of the expanded step."""
+        return self.materialize().to_dict()
+
+    def __getstate__(self):
+        """
+        Get the state of the expanded step for pickling.
+
+        :returns: A tuple of the values of the step's slots.
+        """
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        """
+        Restore the state of an expanded step from its pickled state.
+
+        :param state: A tuple produced by __getstate__.
+        """
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        """Return a representation of the expanded step and its changes."""
+        return "ExpandedStep(template={!r}, name={!r}, description={!r}, " \
+               "run={!r})".format(self.template.name, self.name,
+                                  self._description, self._run)
+
+    def __eq__(self, other):
+        """
+        Equality operator for the ExpandedStep class.
+
+        :param other: Object to compare self to.
+        : returns: True if other is a step with the same name, description
+        and run settings, False otherwise.
+        """
+        if isinstance(other, (StudyStep, ExpandedStep)):
+            return self.to_dict() == other.to_dict()
+
+        return False
+
+    def __ne__(self, other):
+        """
+        Non-equality operator for the ExpandedStep class.
+
+        :param other: Object to compare self to.
+        : returns: True if other is not equal to self, False otherwise.
+        """
+        return not self.__eq__(other)
+
+
 class Study(DAG):
     """
     Collection of high level objects to perform study construction.
@@ -251,18 +447,30 @@ class Study(DAG):
 
     def walk_study(self, src=SOURCE):
         """
-        Walk the study and create a spanning tree.
+        Walk the study in topological order.
+
+        A step is produced once for each of its dependencies, and only after
+        every step it depends on has been produced.
 
         :param src: Source node to start the walk.
         :returns: A generator of (parent, node name, node value) tuples.
         """
-        # Get a DFS spanning tree of the study. This method should always
-        # return a complete tree because _source is flagged as a dependency
-        # if a step is added without one.
-        # TODO: This method should be fixed to return both parents and nodes.
-        path, parents = self.dfs_subtree(src)
-        for node in path:
-            yield parents[node], node, self.values[node]
+        # The walk should always cover the whole study when starting from
+        # _source because _source is flagged as a dependency if a step is
+        # added without one.
+        reachable = None
+        if src != SOURCE:
+            reachable = set(node for _, node in self.bfs_iter(src))
+
+        yield None, src, self.values[src]
+        for node in self.topological_order():
+            if node == src or (reachable and node not in reachable):
+                continue
+
+            for parent in self.parents(node):
+                if reachable and parent not in reachable:
+                    continue
+                yield parent, node, self.values[node]
 
     def setup(self, submission_attempts=1, restart_limit=1):
         """
@@ -360,16 +568,21 @@ class Study(DAG):
             # union of the used parameters for this step and ALL parent steps.
             # If we keep including the step's parent parameters, we will simply
             # carry parent parameters recursively.
-            step_params = self.parameters.get_used_parameters(node)
+            if step not in used_params:
+                used_params[step] = self.parameters.get_used_parameters(node)
             if parent != SOURCE:
-                step_params |= used_params[parent]
-            used_params[step] = step_params
+                used_params[step] |= used_params[parent]
 
         logger.debug("Used Parameters - \n%s", used_params)
 
         # Secondly, we need to now iterate over all combinations for each step
         # and simply apply the combination. We can then add the name to the
         # expanded map using only the parameters that we discovered above.
+        # Steps and edges are collected and added to the ExecutionGraph in
+        # bulk once expansion is done.
+        expanded = {}
+        steps = []
+        edges = []
         for combo in self.parameters:
             # For each Combination in the parameters...
             logger.info("==================================================")
@@ -383,7 +596,6 @@ class Study(DAG):
                 # If we find the source node, we can just add it and continue.
                 if step == SOURCE:
                     logger.debug("Source node found.")
-                    dag.add_node(SOURCE, None)
                     continue
 
                 logger.debug("Processing step '%s'.", step)
@@ -394,8 +606,11 @@ class Study(DAG):
                 # and add.
                 if used_params[step]:
                     logger.debug("Used parameters %s", used_params[step])
-                    # Apply the used parameters to the step.
-                    modified, step_exp = node.apply_parameters(combo)
+                    # Apply the used parameters to the step. The expanded
+                    # step shares the settings that the combination does not
+                    # change with the study's step.
+                    step_exp = ExpandedStep(node)
+                    modified = step_exp.apply(combo.apply)
                     # Name the step based on the parameters used.
                     combo_str = combo.get_param_string(used_params[step])
                     step_name = "{}_{}".format(step_exp.name, combo_str)
@@ -412,7 +627,8 @@ class Study(DAG):
                     # Search for the use of workspaces in the command line so
                     # that we can go ahead and fill in the appropriate space
                     # for this combination.
-                    cmd = step_exp.run["cmd"]
+                    run = step_exp.run
+                    cmd = run["cmd"]
                     used_spaces = re.findall(WSREGEX, cmd)
                     for match in used_spaces:
                         logger.debug("Workspace found -- %s", match)
@@ -428,17 +644,36 @@ class Study(DAG):
                         workspace_var = "$({}.workspace)".format(match)
                         cmd = cmd.replace(workspace_var, workspaces[_])
                         logger.debug("New cmd -- %s", cmd)
-                    step_exp.run["cmd"] = cmd
+                    run["cmd"] = cmd
+                    step_exp.run = run
                 else:
                     # Otherwise, we know that this step is a joining node.
-                    step_exp = copy.deepcopy(node)
+                    step_exp = ExpandedStep(node)
                     modified = False
                     logger.debug("No parameters found. Resulting name %s",
                                  step_exp.name)
                     self.output.value = os.path.join(global_workspace)
 
-                # Add the workspace name to the map of workspaces.
-                workspaces[step_exp.name] = self.output.value
+                # A step with several dependencies is walked once for each of
+                # them. Only the first walk adds the step to the graph; every
+                # walk adds the edge from its dependency.
+                if step_exp.name not in expanded:
+                    # Add the workspace name to the map of workspaces.
+                    workspaces[step_exp.name] = self.output.value
+
+                    if step_exp.run["restart"]:
+                        rlimit = self._restart_limit
+                    else:
+                        rlimit = 0
+
+                    expanded[step_exp.name] = step_exp
+                    steps.append((step_exp.name, step_exp, self.output.value,
+                                  rlimit))
+
+                    # Go ahead and substitute in the output path and create
+                    # the workspace in the ExecutionGraph.
+                    create_parentdir(self.output.value)
+                    step_exp.apply(self.output.substitute)
 
                 # Now we need to make sure we handle the dependencies.
                 # We know the parent and the step name (whether it's modified
@@ -450,32 +685,28 @@ class Study(DAG):
                 #      then our next assumption is that it has a parameterized
                 #      version of the parent. We need to check and make sure.
                 #   3. Fall back third case... Abort. Something is not right.
-                if step_exp.run["restart"]:
-                    rlimit = self._restart_limit
-                else:
-                    rlimit = 0
-
                 if parent != SOURCE:
                     # With the rework, we now need to check the parent's used
                     # parmeters.
                     combo_str = combo.get_param_string(used_params[parent])
                     param_name = "{}_{}".format(parent, combo_str)
                     # If the parent node is not '_source', check.
-                    if parent in dag.values:
-                        # If the parent is in the dag, add the current step...
-                        dag.add_step(step_exp.name, step_exp,
-                                     self.output.value, rlimit)
-                        # And its associated edge.
-                        dag.add_edge(parent, step_exp.name)
-                    elif param_name in dag.values:
-                        # Find the index in the step for the dependency...
-                        i = step_exp.run['depends'].index(parent)
-                        # Sub it with parameterized dependency...
-                        step_exp.run['depends'][i] = param_name
-                        # Add the node and edge.
-                        dag.add_step(step_exp.name, step_exp,
-                                     self.output.value, rlimit)
-                        dag.add_edge(param_name, step_exp.name)
+                    if parent in expanded:
+                        # If the parent is in the dag, add the edge.
+                        edges.append((parent, step_exp.name))
+                    elif param_name in expanded:
+                        # Sub the dependency in the recorded step with the
+                        # parameterized dependency. A joining step collects
+                        # one parameterized dependency per combination.
+                        run = expanded[step_exp.name].run
+                        depends = run["depends"]
+                        if parent in depends:
+                            depends[depends.index(parent)] = param_name
+                        elif param_name not in depends:
+                            depends.append(param_name)
+                        expanded[step_exp.name].run = run
+                        # Add the edge.
+                        edges.append((param_name, step_exp.name))
                     else:
                         msg = "'{}' nor '{}' found in the ExecutionGraph. " \
                               "Unexpected error occurred." \
@@ -485,20 +716,12 @@ class Study(DAG):
                 else:
                     # If the parent is source, then we can just execute it from
                     # '_source'.
-                    dag.add_step(step_exp.name, step_exp, self.output.value,
-                                 rlimit)
-                    dag.add_edge(SOURCE, step_exp.name)
-
-                # Go ahead and substitute in the output path and create the
-                # workspace in the ExecutionGraph.
-                create_parentdir(self.output.value)
-                step_exp.__dict__ = apply_function(step_exp.__dict__,
-                                                   self.output.substitute)
+                    edges.append((SOURCE, step_exp.name))
 
                 # logging
                 logger.debug("---------------- Modified --------------")
                 logger.debug("Modified = %s", modified)
-                logger.debug("step_exp = %s", step_exp.__dict__)
+                logger.debug("step_exp = %s", step_exp)
                 logger.debug("----------------------------------------")
 
                 # Reset the output path to the global_workspace.
@@ -506,6 +729,10 @@ class Study(DAG):
                 logger.info(
                     "==================================================")
 
+        dag.add_node(SOURCE, None)
+        dag.add_steps_from(steps)
+        dag.add_edges_from(edges)
+
         return global_workspace, dag
 
     def _setup_linear(self):
@@ -524,23 +751,34 @@ class Study(DAG):
         logger.info("==================================================")
 
         # For each step in the Study
-        # Walk the study and add the steps to the ExecutionGraph.
+        # Walk the study and collect the steps and edges to add in bulk.
+        added = set()
+        steps = []
+        edges = []
         for parent, step, node in self.walk_study():
-            # If we find the source node, we can just add it and continue.
+            # The source node is added before the steps below.
             if step == SOURCE:
                 logger.debug("Source node found.")
-                dag.add_node(SOURCE, None)
                 continue
 
-            # If the step has a restart cmd, set the limit.
-            if node.run["restart"]:
-                rlimit = self._restart_limit
-            else:
-                rlimit = 0
+            # A step with several dependencies is walked once per dependency,
+            # so only add the step the first time it is seen.
+            if step not in added:
+                # If the step has a restart cmd, set the limit.
+                if node.run["restart"]:
+                    rlimit = self._restart_limit
+                else:
+                    rlimit = 0
+
+                # Add the step
+                added.add(step)
+                steps.append((step, node, self.output.value, rlimit))
+
+            edges.append((parent, step))
 
-            # Add the step
-            dag.add_step(step, node, self.output.value, rlimit)
-            dag.add_edge(parent, step)
+        dag.add_node(SOURCE, None)
+        dag.add_steps_from(steps)
+        dag.add_edges_from(edges)
 
         return self.output.value, dag
 
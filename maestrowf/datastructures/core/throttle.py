@@ -0,0 +1,176 @@
+###############################################################################
+# Copyright (c) 2017, Lawrence Livermore National Security, LLC.
+# Produced at the Lawrence Livermore National Laboratory
+# Written by Francesco Di Natale, dinatale3@llnl.gov.
+#
+# LLNL-CODE-734340
+# All rights reserved.
+# This file is part of MaestroWF, Version: 1.0.0.
+#
+# For details, see https://github.com/LLNL/maestrowf.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+
+"""Limits on how fast steps are submitted to a scheduler."""
+
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Throttle(object):
+    """
+    Limits on the number of steps submitted to a scheduler.
+
+    A Throttle can limit:
+        - max_in_flight: The number of submitted steps that have not
+        finished.
+        - max_submissions: The number of submissions per tick (between two
+        scheduler status checks).
+        - submit_rate: The sustained number of submissions per second, using
+        a token bucket that holds up to submit_burst submissions (by default
+        the rate rounded up, and at least one).
+
+    Each limit is optional, and a Throttle without any limits allows every
+    submission. The token bucket refills with the time that passes between
+    calls, so a Throttle does not need to be driven by a timer.
+    """
+
+    SETTINGS = ("max_in_flight", "max_submissions", "submit_rate",
+                "submit_burst")
+
+    def __init__(self, max_in_flight=None, max_submissions=None,
+                 submit_rate=None, submit_burst=None):
+        """
+        Initialize a Throttle.
+
+        :param max_in_flight: The most steps in progress at once.
+        :param max_submissions: The most submissions per tick.
+        :param submit_rate: The most submissions per second, on average.
+        :param submit_burst: The most submissions the token bucket allows
+        at once.
+        """
+        for name, value in (("max_in_flight", max_in_flight),
+                            ("max_submissions", max_submissions),
+                            ("submit_rate", submit_rate),
+                            ("submit_burst", submit_burst)):
+            if value is not None and value <= 0:
+                msg = "Throttle setting '{}' must be positive, got {}." \
+                      .format(name, value)
+                logger.error(msg)
+                raise ValueError(msg)
+
+        self.max_in_flight = max_in_flight
+        self.max_submissions = max_submissions
+        self.submit_rate = submit_rate
+        if submit_rate and not submit_burst:
+            submit_burst = max(1, int(math.ceil(submit_rate)))
+        self.submit_burst = submit_burst
+
+        self._submitted = 0
+        self._tokens = submit_burst or 0
+        self._stamp = time.time()
+
+    def __bool__(self):
+        return bool(self.max_in_flight or self.max_submissions or
+                    self.submit_rate)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "Throttle({})".format(", ".join(
+            "{}={}".format(key, value)
+            for key, value in sorted(self.settings().items())))
+
+    def settings(self):
+        """
+        Get the limits of the Throttle.
+
+        :returns: A dictionary of the limits that are set, which can be
+        passed to the Throttle constructor.
+        """
+        return dict((key, getattr(self, key)) for key in self.SETTINGS
+                    if getattr(self, key) is not None)
+
+    def tick(self):
+        """Start a new tick, resetting the count of submissions in it."""
+        self._submitted = 0
+
+    def _refill(self):
+        """Add the tokens earned since the last refill to the bucket."""
+        now = time.time()
+        if self.submit_rate:
+            self._tokens = min(self.submit_burst, self._tokens +
+                               (now - self._stamp) * self.submit_rate)
+        self._stamp = now
+
+    def allowance(self, in_flight):
+        """
+        Get the number of steps that can be submitted now.
+
+        :param in_flight: The number of steps currently in progress.
+        :returns: The number of submissions allowed, or None if there is no
+        limit.
+        """
+        self._refill()
+        limits = []
+        if self.max_in_flight:
+            limits.append(self.max_in_flight - in_flight)
+        if self.max_submissions:
+            limits.append(self.max_submissions - self._submitted)
+        if self.submit_rate:
+            limits.append(int(self._tokens))
+
+        if not limits:
+            return None
+        return max(0, min(limits))
+
+    def consume(self, count):
+        """
+        Record that steps were submitted.
+
+        :param count: The number of steps submitted.
+        """
+        self._submitted += count
+        if self.submit_rate:
+            self._refill()
+            self._tokens -= count
+
+    def delay(self):
+        """
+        Get how long until the submission rate allows another submission.
+
+        :returns: The number of seconds until a token is available, or None
+        if the rate is not what limits submission.
+        """
+        if not self.submit_rate:
+            return None
+
+        self._refill()
+        if self._tokens >= 1:
+            return None
+        return (1 - self._tokens) / float(self.submit_rate)
+
+    def __reduce__(self):
+        # Only the limits are kept; the count of submissions and the token
+        # bucket start over when a Throttle is unpickled.
+        return (self.__class__, tuple(getattr(self, key)
+                                      for key in self.SETTINGS))
@@ -29,26 +29,747 @@
 
 """Module that contains the implemenation of a Directed-Acyclic Graph."""
 
-from collections import deque, OrderedDict
+from array import array
+from collections import deque
 import logging
 
 from ..abstracts import Graph
 
+try:
+    from collections.abc import Mapping, MutableMapping, MutableSequence
+except ImportError:  # Python 2.7
+    from collections import Mapping, MutableMapping, MutableSequence
+
 logger = logging.getLogger(__name__)
+# Typecode for the integer arrays that index nodes and edges.
+_INDEX = "i"
+# Marker for the end of an edge chain (or an unset head/tail entry).
+_NONE = -1
+
+
+def _remove_node(name):
+    """
+    Reject the removal of a node from a DAG.
+
+    :param name: Name of the node to be removed.
+    """
+    msg = "Cannot remove node {}. Nodes can not be removed from a DAG." \
+          .format(name)
+    logger.error(msg)
+    raise ValueError(msg)
+
+
+class _NodeView(MutableMapping):
+    """
+    A mapping of node name to node value for a DAG.
+
+    Assigning to a node replaces its value, and assigning to a name that is
+    not in the DAG adds it as a node without edges.
+    """
+
+    def __init__(self, dag):
+        """
+        Initialize a view over the nodes of a DAG.
+
+        :param dag: The DAG instance to provide a view of.
+        """
+        self._dag = dag
+
+    def __getitem__(self, name):
+        return self._dag._objs[self._dag._ids[name]]
+
+    def __setitem__(self, name, obj):
+        dag = self._dag
+        if name in dag._ids:
+            dag._objs[dag._ids[name]] = obj
+        else:
+            dag.add_node(name, obj)
+
+    def __delitem__(self, name):
+        _remove_node(name)
+
+    def __contains__(self, name):
+        return name in self._dag._ids
+
+    def __iter__(self):
+        return iter(self._dag._names)
+
+    def __len__(self):
+        return len(self._dag._names)
+
+
+class _ChildList(MutableSequence):
+    """
+    A list of the names of the children of a node in a DAG.
+
+    Changes to the list add and remove the edges of the node, so they are
+    checked for cycles like any other edge.
+    """
+
+    def __init__(self, dag, name):
+        """
+        Initialize a view over the children of a node.
+
+        :param dag: The DAG instance the node belongs to.
+        :param name: Name of the node.
+        """
+        self._dag = dag
+        self._index = dag._ids[name]
+
+    def _list(self):
+        dag = self._dag
+        return [dag._names[i] for i in dag._children(self._index)]
+
+    def __getitem__(self, position):
+        return self._list()[position]
+
+    def __setitem__(self, position, child):
+        children = self._list()
+        children[position] = child
+        self._dag._set_children(self._index, children)
+
+    def __delitem__(self, position):
+        children = self._list()
+        del children[position]
+        self._dag._set_children(self._index, children)
+
+    def __len__(self):
+        return self._dag._outdegree[self._index]
+
+    def insert(self, position, child):
+        """
+        Add an edge from the node to a child at a position in the list.
+
+        :param position: The position of the child in the list.
+        :param child: Name of the child node.
+        """
+        children = self._list()
+        children.insert(position, child)
+        self._dag._set_children(self._index, children)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, _ChildList)):
+            return self._list() == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(self._list())
+
+
+class _AdjacencyView(MutableMapping):
+    """
+    A mapping of node name to the names of its children.
+
+    The lists of children are views that add and remove edges when they are
+    changed, and assigning a list to a node replaces its edges.
+    """
+
+    def __init__(self, dag):
+        """
+        Initialize a view over the adjacency of a DAG.
+
+        :param dag: The DAG instance to provide a view of.
+        """
+        self._dag = dag
+
+    def __getitem__(self, name):
+        return _ChildList(self._dag, name)
+
+    def __setitem__(self, name, children):
+        dag = self._dag
+        dag._set_children(dag._ids[name], list(children))
+
+    def __delitem__(self, name):
+        _remove_node(name)
+
+    def __contains__(self, name):
+        return name in self._dag._ids
+
+    def __iter__(self):
+        return iter(self._dag._names)
+
+    def __len__(self):
+        return len(self._dag._names)
+
+
+class _SubgraphView(Mapping):
+    """
+    A read-only mapping of node name to node value for part of a DAG.
+
+    Nothing is copied when a view is created. Membership is checked and
+    nodes are iterated against the DAG on demand, so a view reflects later
+    changes to the DAG.
+    """
+
+    def __init__(self, dag, predicate=None):
+        """
+        Initialize a view over the nodes of a DAG that pass a filter.
+
+        :param dag: The DAG instance to provide a view of.
+        :param predicate: A function of a node name and value that returns
+        True if the node is in the view. If None, all nodes are in the view.
+        """
+        self._dag = dag
+        self._predicate = predicate
+
+    def _has(self, index):
+        """
+        Check if a node is in the view.
+
+        :param index: Integer index of the node.
+        :returns: True if the node is in the view, False otherwise.
+        """
+        if self._predicate is None:
+            return True
+        return self._predicate(self._dag._names[index], self._dag._objs[index])
+
+    def _indices(self):
+        """
+        Iterate the indices of the nodes in the view.
+
+        :returns: A generator of node indices in the order they were added.
+        """
+        for index in range(len(self._dag._names)):
+            if self._has(index):
+                yield index
+
+    def __getitem__(self, name):
+        index = self._dag._ids[name]
+        if not self._has(index):
+            raise KeyError(name)
+        return self._dag._objs[index]
+
+    def __contains__(self, name):
+        index = self._dag._ids.get(name)
+        return index is not None and self._has(index)
+
+    def __iter__(self):
+        names = self._dag._names
+        return (names[index] for index in self._indices())
+
+    def __len__(self):
+        return sum(1 for _ in self._indices())
+
+    def items(self):
+        """
+        Iterate the nodes in the view with a single pass over the DAG.
+
+        :returns: A generator of (name, value) tuples.
+        """
+        names = self._dag._names
+        objs = self._dag._objs
+        return ((names[index], objs[index]) for index in self._indices())
+
+    def values(self):
+        """
+        Iterate the values of the nodes in the view.
+
+        :returns: A generator of node values.
+        """
+        objs = self._dag._objs
+        return (objs[index] for index in self._indices())
+
+    def edges(self):
+        """
+        Iterate the edges of the DAG that have both ends in the view.
+
+        :returns: A generator of (src, dest) node name tuples.
+        """
+        names = self._dag._names
+        for index in self._indices():
+            for child in self._dag._children(index):
+                if self._has(child):
+                    yield names[index], names[child]
+
+
+class _DescendantView(_SubgraphView):
+    """A read-only mapping of the nodes reachable from nodes of a DAG."""
+
+    def __init__(self, dag, sources, predicate=None, skip=()):
+        """
+        Initialize a view over the nodes reachable from nodes of a DAG.
+
+        :param dag: The DAG instance to provide a view of.
+        :param sources: An iterable of the names of the nodes the view
+        starts at, which are included.
+        :param predicate: A function of a node name and value that further
+        filters the nodes in the view. If None, nodes are not filtered.
+        :param skip: A collection of names of nodes that are not entered.
+        Nodes that can only be reached through them are left out.
+        """
+        super(_DescendantView, self).__init__(dag, predicate)
+        self._sources = [dag._ids[name] for name in sources]
+        self._skip = skip
+        # The indices reached from the sources, found with one forward
+        # search on the first lookup and kept until the DAG changes.
+        self._reached = None
+        self._version = None
+
+    def _has(self, index):
+        if self._version != self._dag._version:
+            self._reached = set(self._walk())
+            self._version = self._dag._version
+        return index in self._reached and \
+            super(_DescendantView, self)._has(index)
+
+    def _walk(self):
+        """
+        Search forward from the sources of the view.
+
+        :returns: A generator of reached node indices in BFS order.
+        """
+        dag = self._dag
+        queue = deque()
+        queued = set()
+        for node in self._sources:
+            if node not in queued:
+                queued.add(node)
+                queue.append(node)
+
+        visited = set(dag._ids[name] for name in self._skip
+                      if name in dag._ids)
+        visited.update(queued)
+        while queue:
+            root = queue.popleft()
+            yield root
+            for node in dag._children(root):
+                if node not in visited:
+                    visited.add(node)
+                    queue.append(node)
+
+    def _indices(self):
+        """
+        Iterate the indices of the nodes in the view.
+
+        :returns: A generator of node indices in BFS order from the sources.
+        """
+        filtered = super(_DescendantView, self)._has
+        return (index for index in self._walk() if filtered(index))
 
 
 class DAG(Graph):
     """
     A directed acyclic graph (DAG) data structure.
 
-    The implementation of this DAG uses an adjacency map with a map to
-    index the values (or objects) at each node.
+    The implementation of this DAG interns each node name to an integer
+    identifier and stores edges in flat integer arrays (a forward-star
+    layout) where each node's outgoing edges form a chain. The same edges are
+    also chained per destination node to index the predecessors of a node,
+    and the in and out degree of each node (along with the sets of roots and
+    leaves) is tracked as edges change. Node values are kept in a list
+    indexed by the same identifiers. When pickled, the edges are packed into
+    compressed sparse row (CSR) form.
+
+    A topological order of the nodes is maintained incrementally using the
+    Pearce-Kelly algorithm, so that edges that would create a cycle of any
+    length are rejected without a full search of the graph per edge.
+
+    The 'values' and 'adjacency_table' members are mappings keyed by node
+    name that are backed by the integer representation. Changes made
+    through them are written to the DAG, but nodes can not be removed.
     """
 
     def __init__(self):
         """Initialize the DAG data structure internals."""
-        self.adjacency_table = OrderedDict()
-        self.values = OrderedDict()
+        # Node storage -- names are interned to their index in these lists.
+        self._ids = {}
+        self._names = []
+        self._objs = []
+        # Edge storage -- the first and last outgoing edge of each node.
+        self._head = array(_INDEX)
+        self._tail = array(_INDEX)
+        # The first and last incoming edge of each node.
+        self._rhead = array(_INDEX)
+        self._rtail = array(_INDEX)
+        # For each edge, its endpoints and the next edge in both chains.
+        self._edge_src = array(_INDEX)
+        self._edge_dst = array(_INDEX)
+        self._edge_next = array(_INDEX)
+        self._edge_rnext = array(_INDEX)
+        self._num_removed = 0
+        # Degree counts of each node, and the nodes with no parents and with
+        # no children.
+        self._indegree = array(_INDEX)
+        self._outdegree = array(_INDEX)
+        self._roots = set()
+        self._leaves = set()
+        # The position of each node in a topological order and its inverse.
+        self._ord = array(_INDEX)
+        self._pos = array(_INDEX)
+        # Cached orderings, cleared whenever the graph changes.
+        self._topo_order = None
+        self._levels = None
+        # Incremented whenever the graph changes.
+        self._version = 0
+
+    @property
+    def values(self):
+        """
+        Get a mapping of node names to node values.
+
+        :returns: A mapping view of the nodes in the DAG.
+        """
+        return _NodeView(self)
+
+    @property
+    def adjacency_table(self):
+        """
+        Get a mapping of node names to the names of their children.
+
+        :returns: A mapping view of the adjacency of the DAG.
+        """
+        return _AdjacencyView(self)
+
+    @property
+    def num_edges(self):
+        """
+        Get the number of edges in the DAG.
+
+        :returns: An int representing the total edges in the DAG.
+        """
+        return len(self._edge_dst) - self._num_removed
+
+    def _children(self, index):
+        """
+        Iterate the indices of the children of a node.
+
+        :param index: Integer index of the node.
+        :returns: A generator of the integer indices of the node's children.
+        """
+        dst = self._edge_dst
+        nxt = self._edge_next
+        edge = self._head[index]
+        while edge != _NONE:
+            yield dst[edge]
+            edge = nxt[edge]
+
+    def _parents(self, index):
+        """
+        Iterate the indices of the parents of a node.
+
+        :param index: Integer index of the node.
+        :returns: A generator of the integer indices of the node's parents.
+        """
+        src = self._edge_src
+        nxt = self._edge_rnext
+        edge = self._rhead[index]
+        while edge != _NONE:
+            yield src[edge]
+            edge = nxt[edge]
+
+    def _has_edge(self, i, j):
+        """
+        Check if the edge (i, j) exists.
+
+        Only the shorter of the outgoing chain of i and the incoming chain of
+        j is searched.
+
+        :param i: Integer index of the source node.
+        :param j: Integer index of the destination node.
+        :returns: True if the edge exists, False otherwise.
+        """
+        if self._outdegree[i] <= self._indegree[j]:
+            return j in self._children(i)
+
+        return i in self._parents(j)
+
+    def children(self, name):
+        """
+        Get the children of a node.
+
+        :param name: Name of the node.
+        :returns: A list of the names of the node's children.
+        """
+        names = self._names
+        return [names[i] for i in self._children(self._ids[name])]
+
+    def parents(self, name):
+        """
+        Get the parents of a node.
+
+        :param name: Name of the node.
+        :returns: A list of the names of the node's parents.
+        """
+        names = self._names
+        return [names[i] for i in self._parents(self._ids[name])]
+
+    def in_degree(self, name):
+        """
+        Get the number of edges that end at a node.
+
+        :param name: Name of the node.
+        :returns: The number of parents of the node.
+        """
+        return self._indegree[self._ids[name]]
+
+    def out_degree(self, name):
+        """
+        Get the number of edges that start at a node.
+
+        :param name: Name of the node.
+        :returns: The number of children of the node.
+        """
+        return self._outdegree[self._ids[name]]
+
+    def is_root(self, name):
+        """
+        Check if a node has no parents.
+
+        :param name: Name of the node.
+        :returns: True if the node has no incoming edges, False otherwise.
+        """
+        return not self._indegree[self._ids[name]]
+
+    def is_leaf(self, name):
+        """
+        Check if a node has no children.
+
+        :param name: Name of the node.
+        :returns: True if the node has no outgoing edges, False otherwise.
+        """
+        return not self._outdegree[self._ids[name]]
+
+    def roots(self):
+        """
+        Get the nodes in the DAG that have no parents.
+
+        The roots are tracked as edges change, so only the roots themselves
+        are visited.
+
+        :returns: A list of node names in the order they were added.
+        """
+        names = self._names
+        return [names[i] for i in sorted(self._roots)]
+
+    def leaves(self):
+        """
+        Get the nodes in the DAG that have no children.
+
+        The leaves are tracked as edges change, so only the leaves themselves
+        are visited.
+
+        :returns: A list of node names in the order they were added.
+        """
+        names = self._names
+        return [names[i] for i in sorted(self._leaves)]
+
+    def _invalidate(self):
+        """Clear cached orderings when the structure of the DAG changes."""
+        self._topo_order = None
+        self._levels = None
+        self._version += 1
+
+    def _topological_sort(self):
+        """
+        Compute a topological ordering of the node indices (Kahn's algorithm).
+
+        :returns: An array of node indices in topological order.
+        """
+        indegree = array(_INDEX, self._indegree)
+        queue = deque(i for i, count in enumerate(indegree) if not count)
+        order = array(_INDEX)
+        while queue:
+            root = queue.popleft()
+            order.append(root)
+            for node in self._children(root):
+                indegree[node] -= 1
+                if not indegree[node]:
+                    queue.append(node)
+
+        if len(order) != len(self._names):
+            msg = "DAG contains a cycle. A topological order does not exist."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        return order
+
+    def _set_order(self, order):
+        """
+        Replace the maintained topological order.
+
+        :param order: An array of all node indices in topological order.
+        """
+        self._pos = array(_INDEX, order)
+        self._ord = array(_INDEX, [0]) * len(order)
+        for position, node in enumerate(order):
+            self._ord[node] = position
+        self._invalidate()
+
+    def _reorder(self, i, j):
+        """
+        Restore the topological order before adding the edge (i, j).
+
+        This is the Pearce-Kelly update for an edge whose destination j is
+        ordered before its source i. Only the nodes whose positions fall
+        between j and i are searched: the descendants of j and the ancestors
+        of i in that range are moved so that the ancestors come first,
+        reusing the positions they already occupy.
+
+        :param i: Integer index of the source node.
+        :param j: Integer index of the destination node.
+        :returns: False if the edge would create a cycle, True otherwise.
+        """
+        order = self._ord
+        upper = order[i]
+        lower = order[j]
+
+        # Descendants of j that are ordered before i. Reaching i is a cycle.
+        forward = []
+        visited = set([j])
+        stack = [j]
+        while stack:
+            root = stack.pop()
+            forward.append(root)
+            for node in self._children(root):
+                if node == i:
+                    return False
+                if node not in visited and order[node] < upper:
+                    visited.add(node)
+                    stack.append(node)
+
+        # Ancestors of i that are ordered after j.
+        backward = []
+        visited = set([i])
+        stack = [i]
+        while stack:
+            root = stack.pop()
+            backward.append(root)
+            for node in self._parents(root):
+                if node not in visited and order[node] > lower:
+                    visited.add(node)
+                    stack.append(node)
+
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        moved = backward + forward
+        positions = sorted(order[node] for node in moved)
+        for node, position in zip(moved, positions):
+            order[node] = position
+            self._pos[position] = node
+
+        return True
+
+    def topological_order(self):
+        """
+        Get the nodes of the DAG in topological order.
+
+        Every node appears after all of its parents. The ordering is the one
+        maintained as edges are added, and the tuple of names is built once
+        and reused until the DAG is modified.
+
+        :returns: A tuple of node names in topological order.
+        """
+        if self._topo_order is None:
+            names = self._names
+            self._topo_order = tuple(names[i] for i in self._pos)
+
+        return self._topo_order
+
+    def levels(self):
+        """
+        Get the wavefronts of the DAG.
+
+        The level of a node is the length of the longest path to it from a
+        root (for a study, the '_source' node). Nodes in the same level do not
+        depend on each other, so the size of a level bounds how many steps
+        can run at once. The levels are computed once and reused until the
+        DAG is modified.
+
+        :returns: A tuple of tuples, where entry i holds the names of nodes
+        in level i (in topological order).
+        """
+        if self._levels is None:
+            depth = array(_INDEX, [0]) * len(self._names)
+            order = [self._ids[name] for name in self.topological_order()]
+            for root in order:
+                level = depth[root] + 1
+                for node in self._children(root):
+                    if depth[node] < level:
+                        depth[node] = level
+
+            levels = []
+            for node in order:
+                while len(levels) <= depth[node]:
+                    levels.append([])
+                levels[depth[node]].append(self._names[node])
+            self._levels = tuple(tuple(level) for level in levels)
+
+        return self._levels
+
+    def transitive_reduction(self):
+        """
+        Remove the edges of the DAG that are implied by longer paths.
+
+        An edge (u, v) is redundant when v can also be reached from u through
+        another child of u. The children of each node are searched in
+        topological order, and the search stops at the position of the last
+        child since no node past it can lead back to a child. Removing the
+        redundant edges does not change which nodes can reach each other.
+
+        :returns: A list of the (src, dest) name pairs of the removed edges.
+        """
+        order = self._ord
+        redundant = []
+        for node in range(len(self._names)):
+            # A node needs at least two children for one to imply another.
+            if self._outdegree[node] < 2:
+                continue
+
+            children = sorted(self._children(node), key=order.__getitem__)
+            limit = order[children[-1]]
+            reached = set()
+            for child in children:
+                if child in reached:
+                    redundant.append((node, child))
+                    continue
+
+                stack = [child]
+                while stack:
+                    for desc in self._children(stack.pop()):
+                        if desc not in reached and order[desc] <= limit:
+                            reached.add(desc)
+                            stack.append(desc)
+
+        for i, j in redundant:
+            self._unlink_edge(i, j)
+
+        names = self._names
+        logger.debug("Transitive reduction removed %d edge(s).",
+                     len(redundant))
+        return [(names[i], names[j]) for i, j in redundant]
+
+    def subgraph(self, predicate):
+        """
+        Get a read-only view of the nodes of the DAG that pass a filter.
+
+        :param predicate: A function of a node name and value that returns
+        True if the node is in the view.
+        :returns: A mapping of node name to value for the nodes in the view.
+        """
+        return _SubgraphView(self, predicate)
+
+    def descendants(self, sources, predicate=None, skip=()):
+        """
+        Get a read-only view of the nodes that can be reached from nodes.
+
+        The view includes the sources and iterates in BFS order from them.
+        A single search is made from all of the sources at once, so every
+        node and edge is visited at most once no matter how many sources
+        reach it. Membership checks search once and reuse the result until
+        the DAG changes.
+
+        :param sources: An iterable of names of the nodes to start from.
+        :param predicate: A function of a node name and value that further
+        filters the nodes in the view. If None, nodes are not filtered.
+        :param skip: A collection of names of nodes that are not entered.
+        Nodes that can only be reached through them are left out.
+        :returns: A mapping of node name to value for the nodes in the view.
+        """
+        return _DescendantView(self, sources, predicate, skip)
 
     def add_node(self, name, obj):
         """
@@ -57,15 +778,71 @@ class DAG(Graph):
         :param name: String identifier of the node.
         :param obj: An object representing the value of the node.
         """
-        logging.debug("Adding %s...", name)
-        if name in self.values:
+        logger.debug("Adding %s...", name)
+        if name in self._ids:
             logger.warning("Node %s already exists. Returning.",
                            name)
             return
 
         logger.debug("Node %s added. Value is of type %s.", name, type(obj))
-        self.values[name] = obj
-        self.adjacency_table[name] = []
+        self._ids[name] = len(self._names)
+        self._names.append(name)
+        self._objs.append(obj)
+        self._head.append(_NONE)
+        self._tail.append(_NONE)
+        self._rhead.append(_NONE)
+        self._rtail.append(_NONE)
+        self._indegree.append(0)
+        self._outdegree.append(0)
+        self._roots.add(self._ids[name])
+        self._leaves.add(self._ids[name])
+        self._ord.append(len(self._pos))
+        self._pos.append(len(self._pos))
+        self._invalidate()
+
+    def add_nodes_from(self, nodes):
+        """
+        Add a collection of nodes to the DAG.
+
+        Unlike add_node, nothing is logged per node. Nodes that already exist
+        are skipped and reported in a single warning.
+
+        :param nodes: An iterable of (name, obj) tuples.
+        """
+        ids = self._ids
+        names = self._names
+        objs = self._objs
+        start = len(names)
+        skipped = 0
+        for name, obj in nodes:
+            if name in ids:
+                skipped += 1
+                continue
+            ids[name] = len(names)
+            names.append(name)
+            objs.append(obj)
+
+        if skipped:
+            logger.warning("Skipped %d node(s) that already exist.", skipped)
+
+        added = len(names) - start
+        if not added:
+            return
+
+        unset = array(_INDEX, [_NONE]) * added
+        zeros = array(_INDEX, [0]) * added
+        for chain in (self._head, self._tail, self._rhead, self._rtail):
+            chain.extend(unset)
+        self._indegree.extend(zeros)
+        self._outdegree.extend(zeros)
+        self._roots.update(range(start, start + added))
+        self._leaves.update(range(start, start + added))
+        # New nodes have no edges, so they can go at the end of the order.
+        positions = array(_INDEX, range(start, start + added))
+        self._ord.extend(positions)
+        self._pos.extend(positions)
+        self._invalidate()
+        logger.debug("Added %d node(s).", added)
 
     def add_edge(self, src, dest):
         """
@@ -85,29 +862,243 @@ class DAG(Graph):
         # Disallow adding edges to the graph before nodes are added.
         error = "Attempted to create edge ({src}, {dest}), but node {node}" \
                 " does not exist."
-        if src not in self.adjacency_table:
+        if src not in self._ids:
             error = error.format(src=src, dest=dest, node=src)
             logger.error(error)
             raise ValueError(error)
 
-        if dest not in self.adjacency_table:
-            logger.error(error, src, dest, dest)
+        if dest not in self._ids:
+            logger.error(error.format(src=src, dest=dest, node=dest))
             return
 
-        # If the edge would create a loop, don't add the edge.
-        if src in self.adjacency_table[dest]:
-            error = error.format(src=src, dest=dest, node=dest)
-            logger.error(error)
-            raise ValueError(error)
-
+        i = self._ids[src]
+        j = self._ids[dest]
         # If dest is not already and edge from src, add it.
-        if dest not in self.adjacency_table[src]:
-            self.adjacency_table[src].append(dest)
-            logging.info("Edge (%s, %s) added.", src, dest)
+        if not self._has_edge(i, j):
+            # If the edge would create a loop, don't add the edge. Only an
+            # edge that goes against the current order can close a cycle.
+            if self._ord[i] > self._ord[j] and not self._reorder(i, j):
+                error = "Edge ({src}, {dest}) would create a cycle because " \
+                        "{src} is reachable from {dest}." \
+                        .format(src=src, dest=dest)
+                logger.error(error)
+                raise ValueError(error)
+
+            self._append_edge(i, j)
+            logger.info("Edge (%s, %s) added.", src, dest)
             return
 
         # Otherwise, we already have the edge.
-        logging.info("Edge (%s, %s) already in DAG.", src, dest)
+        logger.info("Edge (%s, %s) already in DAG.", src, dest)
+
+    def add_edges_from(self, edges):
+        """
+        Add a collection of edges to the DAG.
+
+        All edges are validated before any are added and nothing is logged
+        per edge. Edges that already exist are skipped. Edges that agree with
+        the maintained topological order are appended as they are read; if
+        any do not, the order is recomputed once after all edges are added
+        instead of being repaired per edge. If the edges would create a
+        cycle, none of them are added.
+
+        :param edges: An iterable of (src, dest) tuples of node names.
+        """
+        ids = self._ids
+        pairs = []
+        for src, dest in edges:
+            if src == dest:
+                msg = "Cannot add self referring cycle edge ({}, {})" \
+                      .format(src, dest)
+                logger.error(msg)
+                raise ValueError(msg)
+
+            try:
+                pairs.append((ids[src], ids[dest]))
+            except KeyError as missing:
+                msg = "Attempted to create edge ({}, {}), but node {} does " \
+                      "not exist.".format(src, dest, missing.args[0])
+                logger.error(msg)
+                raise ValueError(msg)
+
+        # Append the edges to the chains in a single pass. This is the same as
+        # _append_edge, but with the arrays bound locally.
+        order = self._ord
+        head, tail = self._head, self._tail
+        rhead, rtail = self._rhead, self._rtail
+        edge_src, edge_dst = self._edge_src, self._edge_dst
+        edge_next, edge_rnext = self._edge_next, self._edge_rnext
+        indegree, outdegree = self._indegree, self._outdegree
+        roots, leaves = self._roots, self._leaves
+        first = len(edge_dst)
+        # The tails of both chains before each edge is added, to roll back.
+        undo = []
+        reorder = False
+        for i, j in pairs:
+            if outdegree[i] and indegree[j] and self._has_edge(i, j):
+                continue
+            if order[i] > order[j]:
+                reorder = True
+
+            edge = len(edge_dst)
+            undo.append((tail[i], rtail[j]))
+            edge_src.append(i)
+            edge_dst.append(j)
+            edge_next.append(_NONE)
+            edge_rnext.append(_NONE)
+            if tail[i] == _NONE:
+                head[i] = edge
+            else:
+                edge_next[tail[i]] = edge
+            tail[i] = edge
+            if rtail[j] == _NONE:
+                rhead[j] = edge
+            else:
+                edge_rnext[rtail[j]] = edge
+            rtail[j] = edge
+            outdegree[i] += 1
+            indegree[j] += 1
+            leaves.discard(i)
+            roots.discard(j)
+
+        if undo:
+            self._invalidate()
+
+        if reorder:
+            try:
+                self._set_order(self._topological_sort())
+            except ValueError:
+                self._truncate_edges(first, undo)
+                msg = "Adding edges would create a cycle. No edges added."
+                logger.error(msg)
+                raise ValueError(msg)
+
+        logger.debug("Added %d edge(s), skipped %d existing edge(s).",
+                     len(undo), len(pairs) - len(undo))
+
+    def _truncate_edges(self, first, undo):
+        """
+        Remove the most recently appended edges from the DAG.
+
+        :param first: Integer index of the first edge to remove. All edges
+        from this index on must have been appended by _append_edge.
+        :param undo: A list of the (tail, rtail) entries of the source and
+        destination of each of those edges from before it was appended.
+        """
+        for edge in range(len(self._edge_dst) - 1, first - 1, -1):
+            i = self._edge_src[edge]
+            j = self._edge_dst[edge]
+            tail, rtail = undo[edge - first]
+            if tail == _NONE:
+                self._head[i] = _NONE
+            else:
+                self._edge_next[tail] = _NONE
+            self._tail[i] = tail
+            if rtail == _NONE:
+                self._rhead[j] = _NONE
+            else:
+                self._edge_rnext[rtail] = _NONE
+            self._rtail[j] = rtail
+            self._outdegree[i] -= 1
+            self._indegree[j] -= 1
+            if not self._outdegree[i]:
+                self._leaves.add(i)
+            if not self._indegree[j]:
+                self._roots.add(j)
+
+        for edges in (self._edge_src, self._edge_dst, self._edge_next,
+                      self._edge_rnext):
+            del edges[first:]
+        self._invalidate()
+
+    def _append_edge(self, i, j):
+        """
+        Append the edge (i, j) to the end of the chains of nodes i and j.
+
+        :param i: Integer index of the source node.
+        :param j: Integer index of the destination node.
+        """
+        edge = len(self._edge_dst)
+        self._edge_src.append(i)
+        self._edge_dst.append(j)
+        self._edge_next.append(_NONE)
+        self._edge_rnext.append(_NONE)
+
+        if self._tail[i] == _NONE:
+            self._head[i] = edge
+        else:
+            self._edge_next[self._tail[i]] = edge
+        self._tail[i] = edge
+
+        if self._rtail[j] == _NONE:
+            self._rhead[j] = edge
+        else:
+            self._edge_rnext[self._rtail[j]] = edge
+        self._rtail[j] = edge
+
+        self._outdegree[i] += 1
+        self._indegree[j] += 1
+        self._leaves.discard(i)
+        self._roots.discard(j)
+        self._invalidate()
+
+    def _set_children(self, i, children):
+        """
+        Replace the edges that start at a node.
+
+        Edges are only removed and added past the first position where the
+        old and new children differ. If a new edge would create a cycle, the
+        old edges are restored.
+
+        :param i: Integer index of the node.
+        :param children: A list of the names of the new children, in order.
+        Names that repeat are added once.
+        """
+        src = self._names[i]
+        new = []
+        for dest in children:
+            if dest not in self._ids:
+                msg = "Attempted to create edge ({src}, {dest}), but node " \
+                      "{dest} does not exist.".format(src=src, dest=dest)
+                logger.error(msg)
+                raise ValueError(msg)
+            if dest == src:
+                msg = "Cannot add self referring cycle edge ({}, {})" \
+                      .format(src, dest)
+                logger.error(msg)
+                raise ValueError(msg)
+            j = self._ids[dest]
+            if j not in new:
+                new.append(j)
+
+        old = list(self._children(i))
+        keep = 0
+        while keep < min(len(old), len(new)) and old[keep] == new[keep]:
+            keep += 1
+        if keep == len(old) == len(new):
+            return
+
+        for j in old[keep:]:
+            self._unlink_edge(i, j)
+        added = []
+        try:
+            for j in new[keep:]:
+                if self._ord[i] > self._ord[j] and not self._reorder(i, j):
+                    msg = "Edge ({src}, {dest}) would create a cycle " \
+                          "because {src} is reachable from {dest}." \
+                          .format(src=src, dest=self._names[j])
+                    logger.error(msg)
+                    raise ValueError(msg)
+                self._append_edge(i, j)
+                added.append(j)
+        except ValueError:
+            for j in added:
+                self._unlink_edge(i, j)
+            for j in old[keep:]:
+                if self._ord[i] > self._ord[j]:
+                    self._reorder(i, j)
+                self._append_edge(i, j)
+            raise
 
     def remove_edge(self, src, dest):
         """
@@ -116,18 +1107,135 @@ class DAG(Graph):
         :param src: Source vertex name.
         :param dest: Destination vertex name.
         """
-        if src not in self.adjacency_table:
+        if src not in self._ids:
             logger.warning("Attempted to remove an edge (%s, %s), but %s"
                            " does not exist.", src, dest, src)
             return
 
-        if dest not in self.adjacency_table:
+        if dest not in self._ids:
             logger.warning("Attempted to remove an edge from (%s, %s), but %s"
                            " does not exist.", src, dest, dest)
             return
 
-        logging.debug("Removing edge (%s, %s).", src, dest)
-        self.adjacency_table[src].remove(dest)
+        logger.debug("Removing edge (%s, %s).", src, dest)
+        if not self._unlink_edge(self._ids[src], self._ids[dest]):
+            msg = "Edge ({}, {}) does not exist.".format(src, dest)
+            logger.error(msg)
+            raise ValueError(msg)
+
+    def _unlink_edge(self, i, j):
+        """
+        Remove the edge (i, j) from the chains of nodes i and j.
+
+        :param i: Integer index of the source node.
+        :param j: Integer index of the destination node.
+        :returns: True if the edge was removed, False if it does not exist.
+        """
+        # Walk the outgoing chain of i to find the edge and unlink it.
+        prev = _NONE
+        edge = self._head[i]
+        while edge != _NONE and self._edge_dst[edge] != j:
+            prev = edge
+            edge = self._edge_next[edge]
+
+        if edge == _NONE:
+            return False
+
+        nxt = self._edge_next[edge]
+        if prev == _NONE:
+            self._head[i] = nxt
+        else:
+            self._edge_next[prev] = nxt
+        if self._tail[i] == edge:
+            self._tail[i] = prev
+
+        # Then unlink it from the incoming chain of j.
+        prev = _NONE
+        redge = self._rhead[j]
+        while redge != edge:
+            prev = redge
+            redge = self._edge_rnext[redge]
+
+        nxt = self._edge_rnext[edge]
+        if prev == _NONE:
+            self._rhead[j] = nxt
+        else:
+            self._edge_rnext[prev] = nxt
+        if self._rtail[j] == edge:
+            self._rtail[j] = prev
+
+        self._outdegree[i] -= 1
+        self._indegree[j] -= 1
+        if not self._outdegree[i]:
+            self._leaves.add(i)
+        if not self._indegree[j]:
+            self._roots.add(j)
+        self._invalidate()
+
+        # Leave the unlinked edge in place; it is dropped on pickling.
+        self._edge_src[edge] = _NONE
+        self._edge_dst[edge] = _NONE
+        self._edge_next[edge] = _NONE
+        self._edge_rnext[edge] = _NONE
+        self._num_removed += 1
+
+        return True
+
+    def dfs_iter(self, src, par=None):
+        """
+        Iterate the subtree of the DAG starting at src in DFS order.
+
+        Each node reachable from src is visited exactly once, on the first
+        edge that discovers it.
+
+        :param src: Source node name to begin search.
+        :param par: Name of parent node to the specified source node.
+        :returns: A generator of (parent, node) name tuples in DFS order.
+        """
+        names = self._names
+        start = self._ids[src]
+        yield par, src
+
+        visited = set([start])
+        stack = [(start, self._children(start))]
+        while stack:
+            root, children = stack[-1]
+            for node in children:
+                if node in visited:
+                    continue
+
+                visited.add(node)
+                yield names[root], names[node]
+                stack.append((node, self._children(node)))
+                break
+            else:
+                stack.pop()
+
+    def bfs_iter(self, src):
+        """
+        Iterate the subtree of the DAG starting at src in BFS order.
+
+        Each node reachable from src is visited exactly once, on the first
+        edge that discovers it.
+
+        :param src: Source node name to begin search.
+        :returns: A generator of (parent, node) name tuples in BFS order.
+        """
+        names = self._names
+        start = self._ids[src]
+        yield None, src
+
+        visited = set([start])
+        queue = deque([start])
+        while queue:
+            root = queue.popleft()
+            for node in self._children(root):
+                if node in visited:
+                    continue
+
+                visited.add(node)
+                queue.append(node)
+                yield names[root], names[node]
 
     def dfs_subtree(self, src, par=None):
         """
@@ -138,13 +1246,11 @@ class DAG(Graph):
         :returns: A list representing the path taken by DFS.
         :returns: A dictionary containing a mapping from node to parent node.
         """
-        path = [src]
-        parent = {src: par}
-        for node in self.adjacency_table[src]:
-            parent[node] = src
-            subpath, children = self.dfs_subtree(node, src)
-            path = path + subpath
-            parent.update(children)
+        path = []
+        parent = {}
+        for root, node in self.dfs_iter(src, par):
+            path.append(node)
+            parent[node] = root
 
         return path, parent
 
@@ -156,18 +1262,97 @@ class DAG(Graph):
         :returns: A list representing the path taken by BFS.
         :returns: A dictionary containing a mapping from node to parent node.
         """
-        queue = deque([src])
-        path = [src]
-        parent = {src: None}
+        path = []
+        parent = {}
+        for root, node in self.bfs_iter(src):
+            path.append(node)
+            parent[node] = root
 
-        while queue:
-            root = queue.popleft()
-            for node in self.adjacency_table[root]:
-                if node in path:
-                    continue
+        return path, parent
 
-                queue.append(node)
-                parent[node] = root
-                path.append(node)
+    def __getstate__(self):
+        """
+        Get the state of the DAG for pickling.
 
-        return path, parent
+        The edge chains are packed into CSR form (an offset per node and a
+        flat array of destinations) so that removed edges are dropped and
+        the pickle only holds what is needed to rebuild the chains. The name
+        to index map, the predecessor chains, the degree counts and the roots
+        and leaves are all rebuilt from the list of names and the CSR arrays.
+        The topological order is kept as the position of each node.
+
+        :returns: A dictionary representing the state of the instance.
+        """
+        state = self.__dict__.copy()
+        offsets = array(_INDEX, [0])
+        targets = array(_INDEX)
+        for i in range(len(self._names)):
+            targets.extend(self._children(i))
+            offsets.append(len(targets))
+
+        for key in ("_ids", "_head", "_tail", "_rhead", "_rtail",
+                    "_edge_src", "_edge_dst", "_edge_next", "_edge_rnext",
+                    "_num_removed", "_indegree", "_outdegree", "_roots",
+                    "_leaves", "_pos",
+                    "_topo_order", "_levels", "_version"):
+            del state[key]
+        state["_csr"] = (offsets, targets)
+
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the state of a DAG from its pickled state.
+
+        :param state: A dictionary produced by __getstate__.
+        """
+        if "_csr" not in state:
+            # Pickles written before the integer layout store the graph as
+            # ordered mappings of names.
+            self._setstate_legacy(state)
+            return
+
+        offsets, targets = state.pop("_csr")
+        names = state.pop("_names")
+        objs = state.pop("_objs")
+        order = state.pop("_ord")
+        self.__dict__.update(state)
+        DAG.__init__(self)
+        self._names = names
+        self._objs = objs
+        self._ids = {name: i for i, name in enumerate(names)}
+        self._ord = order
+        self._pos = array(_INDEX, [0]) * len(names)
+        for node, position in enumerate(order):
+            self._pos[position] = node
+
+        num_nodes = len(names)
+        self._head = array(_INDEX, [_NONE]) * num_nodes
+        self._tail = array(_INDEX, [_NONE]) * num_nodes
+        self._rhead = array(_INDEX, [_NONE]) * num_nodes
+        self._rtail = array(_INDEX, [_NONE]) * num_nodes
+        self._indegree = array(_INDEX, [0]) * num_nodes
+        self._outdegree = array(_INDEX, [0]) * num_nodes
+        self._roots = set(range(num_nodes))
+        self._leaves = set(range(num_nodes))
+        for i in range(num_nodes):
+            for edge in range(offsets[i], offsets[i + 1]):
+                self._append_edge(i, targets[edge])
+
+    def _setstate_legacy(self, state):
+        """
+        Restore a DAG pickled with name keyed adjacency lists.
+
+        :param state: A dictionary with 'values' and 'adjacency_table'
+        mappings of node names.
+        """
+        values = state.pop("values")
+        adjacency = state.pop("adjacency_table")
+        self.__dict__.update(state)
+        DAG.__init__(self)
+        for name, obj in values.items():
+            self.add_node(name, obj)
+        for name, children in adjacency.items():
+            for child in children:
+                self._append_edge(self._ids[name], self._ids[child])
+        self._set_order(self._topological_sort())
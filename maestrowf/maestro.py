@@ -29,7 +29,7 @@
 
 """A script for launching a YAML study specification."""
 from argparse import ArgumentParser, RawTextHelpFormatter
-from filelock import FileLock, Timeout
+from datetime import timedelta
 import inspect
 import logging
 import os
@@ -40,9 +40,13 @@ import sys
 import tabulate
 
 from maestrowf.datastructures import YAMLSpecification
-from maestrowf.datastructures.core import Study
+from maestrowf.abstracts.enums import State
+from maestrowf.conductor import DAEMON_DIR, daemon_running, register_study
+from maestrowf.datastructures.core import ShardStore, StateStore, \
+    StatusFile, Study
 from maestrowf.datastructures.environment import Variable
-from maestrowf.utils import create_parentdir, csvtable_to_dict
+from maestrowf.utils import create_parentdir, csvtable_to_dict, \
+    find_store, mark_store
 
 
 # Program Globals
@@ -73,6 +77,22 @@ def setup_argparser():
                         help="Check the status of the ExecutionGraph "
                         "located as specified by the 'directory' "
                         "argument.")
+    parser.add_argument("--state", type=str, action="append",
+                        choices=[state.name for state in State],
+                        help="With --status, only show steps in this state "
+                        "(can be repeated).")
+    parser.add_argument("--step", type=str, action="append",
+                        help="With --status, only show steps whose names "
+                        "match this shell-style pattern (can be repeated).")
+    parser.add_argument("--summary", action="store_true",
+                        help="With --status, only show the number of steps "
+                        "in each state.")
+    parser.add_argument("--shard", type=str, action="append",
+                        help="With --status, only read the shards (the global "
+                        "workspace is '_global', otherwise the workspace's "
+                        "path in the study, with '/' written as '%%2F') "
+                        "matching this shell-style pattern (can be "
+                        "repeated). Requires the shards state store.")
     parser.add_argument("-l", "--logpath", type=str,
                         help="Alternate path to store program logging.")
     parser.add_argument("-d", "--debug_lvl", type=int, default=2,
@@ -89,6 +109,22 @@ def setup_argparser():
                         "wait between job status checks.")
     parser.add_argument("-y", "--autoyes", action="store_true", default=False,
                         help="Automatically answer yes to input prompts.")
+    parser.add_argument("--store", type=str, default="pickle",
+                        choices=["pickle", "sqlite", "shards"],
+                        help="How the state of the study is kept while it "
+                        "runs:\n"
+                        "pickle - A pickle of the study, a status.csv and a "
+                        "status.bin (Default)\n"
+                        "sqlite - A SQLite database on a local file system\n"
+                        "shards - A file per combination of parameters")
+    parser.add_argument("--daemon", action="store_true", default=False,
+                        help="Conduct the study from the conductor daemon, "
+                        "starting the daemon if it is not running. A study "
+                        "is always handed to a daemon that is already "
+                        "running, which keeps its own SLEEPTIME.")
+    parser.add_argument("-r", "--reduce", action="store_true", default=False,
+                        help="Remove step dependencies that are already "
+                        "implied by other dependencies after staging.")
 
     return parser
 
@@ -150,17 +186,48 @@ def main():
 
     if args.status:
         study_path = os.path.split(args.specification)[0]
+        study_store = find_store(study_path)
+        # The state stores and status.bin can be queried directly, without a
+        # lock, and only read the parts of the status that are needed.
+        stat_bin = os.path.join(study_path, "status.bin")
+        if study_store is not None and study_store.endswith(".shards"):
+            status = ShardStore(study_store)
+        elif study_store is not None:
+            status = StateStore(study_store, read_only=True)
+        elif os.path.exists(stat_bin):
+            status = StatusFile(stat_bin)
+        else:
+            status = None
+
+        query = {}
+        if args.shard:
+            if not isinstance(status, ShardStore):
+                parser.error("--shard requires a study that uses the shards "
+                             "state store.")
+            query["shards"] = args.shard
+
+        if status is not None:
+            if args.summary:
+                counts = status.count_by_state(**query)
+                print(tabulate.tabulate(
+                    [(str(state), counts[state]) for state in State
+                     if state in counts], headers=["State", "Steps"]))
+            else:
+                states = [State[state] for state in args.state or []]
+                print(tabulate.tabulate(
+                    status.status_table(states, args.step, **query),
+                    headers="keys"))
+            status.close()
+            return
+
+        # Studies from before status.bin only have a status.csv, which is
+        # replaced atomically by the conductor, so it can be read without a
+        # lock.
         stat_path = os.path.join(study_path, "status.csv")
-        lock_path = os.path.join(study_path, ".status.lock")
         if os.path.exists(stat_path):
-            lock = FileLock(lock_path)
-            try:
-                with lock.acquire(timeout=10):
-                    with open(stat_path, "r") as stat_file:
-                        _ = csvtable_to_dict(stat_file)
-                        print(tabulate.tabulate(_, headers="keys"))
-            except Timeout:
-                pass
+            with open(stat_path, "r") as stat_file:
+                _ = csvtable_to_dict(stat_file)
+                print(tabulate.tabulate(_, headers="keys"))
 
         return
 
@@ -183,18 +250,56 @@ def main():
 
     # Stage the study.
     path, exec_dag = study.stage()
+    if args.reduce:
+        removed = exec_dag.transitive_reduction()
+        LOGGER.info("Transitive reduction removed %d redundant "
+                    "dependencies.", len(removed))
+
+    # Each level of the graph is a wavefront of steps that can run at the
+    # same time, so the widest level estimates the peak concurrency.
+    levels = exec_dag.levels()[1:]
+    LOGGER.info("Study '%s' staged with %d steps over %d levels. Peak "
+                "concurrency is at most %d steps.", study.name,
+                sum(len(level) for level in levels), len(levels),
+                max([len(level) for level in levels] or [0]))
+    critical, makespan = exec_dag.critical_path()
+    if makespan:
+        LOGGER.info("Estimated makespan from step walltimes is %s. Critical "
+                    "path (%d steps) -- %s", timedelta(seconds=makespan),
+                    len(critical), " -> ".join(critical))
+    else:
+        LOGGER.info("No step of '%s' specifies a walltime. Skipping the "
+                    "makespan estimate.", study.name)
 
     if not spec.batch:
         exec_dag.set_adapter({"type": "local"})
     else:
         exec_dag.set_adapter(spec.batch)
 
+    # Scheduled steps report their exit codes here so that the conductor
+    # learns they ended without waiting for a scheduler status check (see
+    # ScriptAdapter._add_sentinel in
+    # maestrowf/abstracts/interfaces/scriptadapter.py).
+    exec_dag.set_sentinel_dir(os.path.join(path, ".sentinels"))
+
     # Copy the spec to the output directory
     shutil.copy(args.specification, path)
 
     # Generate scripts
     exec_dag.generate_scripts()
-    exec_dag.pickle(os.path.join(path, "{}.pkl".format(study.name)))
+    if args.store == "sqlite":
+        store = StateStore(os.path.join(path, "{}.db".format(study.name)))
+        store.save(exec_dag)
+        store.close()
+        mark_store(path, store.path)
+    elif args.store == "shards":
+        store = ShardStore(
+            os.path.join(path, "{}.shards".format(study.name)))
+        store.save(exec_dag)
+        store.close()
+        mark_store(path, store.path)
+    else:
+        exec_dag.pickle(os.path.join(path, "{}.pkl".format(study.name)))
 
     # If we are automatically launching, just set the input as yes.
     if args.autoyes:
@@ -203,13 +308,28 @@ def main():
         uinput = six.moves.input("Would you like to launch the study?[yn] ")
 
     if uinput.lower() in ACCEPTED_INPUT:
-        # Launch manager with nohup
-        cmd = ["nohup", "conductor",
-               "-t", str(args.sleeptime),
-               "-d", str(args.debug_lvl),
-               path,
-               "&>", "{}.txt".format(os.path.join(
-                study.output_path, exec_dag.name))]
+        if args.daemon or daemon_running():
+            # One daemon conducts every study, so the scheduler is queried
+            # once per check for all of them.
+            if register_study(path):
+                LOGGER.info("Study registered with the running conductor "
+                            "daemon.")
+                sys.exit(0)
+
+            # Launch the daemon with nohup
+            cmd = ["nohup", "conductor", "--daemon",
+                   "-t", str(args.sleeptime),
+                   "-d", str(args.debug_lvl),
+                   "&>", "{}.txt".format(os.path.join(DAEMON_DIR,
+                                                      "conductor"))]
+        else:
+            # Launch manager with nohup
+            cmd = ["nohup", "conductor",
+                   "-t", str(args.sleeptime),
+                   "-d", str(args.debug_lvl),
+                   path,
+                   "&>", "{}.txt".format(os.path.join(
+                    study.output_path, exec_dag.name))]
         LOGGER.debug(" ".join(cmd))
         Popen(" ".join(cmd), shell=True, stdout=PIPE, stderr=PIPE)
 
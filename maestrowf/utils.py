@@ -30,12 +30,20 @@
 """A collection of more general utility functions."""
 
 from collections import OrderedDict
+from datetime import datetime, timedelta
 import logging
 import os
 import time
 
 LOGGER = logging.getLogger(__name__)
 
+# The columns of a study's status table, as written to status.csv.
+STATUS_COLUMNS = (
+    "Step Name", "Workspace", "State", "Run Time", "Elapsed Time",
+    "Start Time", "Submit Time", "End Time", "Number Restarts")
+# The file in a study's directory that names the study's state store.
+STORE_MARKER = ".maestro_store"
+
 
 def generate_filename(path, append_time=True):
     """
@@ -83,6 +91,34 @@ def create_parentdir(path):
         os.makedirs(path)
 
 
+def mark_store(directory, store_path):
+    """
+    Record the state store of a study in the study's directory.
+
+    :param directory: The directory where the study has been set up.
+    :param store_path: The path of the study's state store, which should be
+    in the directory.
+    """
+    with open(os.path.join(directory, STORE_MARKER), "w") as marker:
+        marker.write(os.path.basename(store_path))
+
+
+def find_store(directory):
+    """
+    Find the state store of a study that was recorded with mark_store.
+
+    :param directory: The directory where the study has been set up.
+    :returns: The path of the study's state store, or None if the study
+    does not have one.
+    """
+    try:
+        with open(os.path.join(directory, STORE_MARKER), "r") as marker:
+            name = marker.read().strip()
+    except IOError:
+        return None
+    return os.path.join(directory, name)
+
+
 def apply_function(item, func):
     """
     Utility function for applying a wider range of functions to items.
@@ -109,6 +145,87 @@ def apply_function(item, func):
         raise ValueError(msg)
 
 
+def walltime_to_seconds(walltime):
+    """
+    Convert a walltime string to a number of seconds.
+
+    Walltimes are of the form "[D-]HH:MM:SS", where leading fields may be
+    left off (for example "MM:SS" or "SS"). An empty walltime is zero.
+
+    :param walltime: A string representing a requested walltime.
+    :returns: The number of seconds the walltime represents, as an int.
+    """
+    if not walltime:
+        return 0
+
+    try:
+        days = 0
+        clock = str(walltime).strip()
+        if "-" in clock:
+            days, clock = clock.split("-", 1)
+            days = int(days)
+
+        fields = [int(field) for field in clock.split(":")]
+        if len(fields) > 3 or min(fields + [days]) < 0:
+            raise ValueError
+
+        seconds = 0
+        for field in fields:
+            seconds = seconds * 60 + field
+    except ValueError:
+        msg = "Walltime '{}' is not of the form [D-]HH:MM:SS." \
+              .format(walltime)
+        LOGGER.error(msg)
+        raise ValueError(msg)
+
+    return days * 86400 + seconds
+
+
+def format_timestamp(value):
+    """
+    Format a timestamp for display in a status table.
+
+    :param value: Seconds since the epoch, or None if not set.
+    :returns: A string of the date and time, or '--' if not set.
+    """
+    if value is None:
+        return "--"
+    return str(datetime.fromtimestamp(value))
+
+
+def format_duration(start, end):
+    """
+    Format the time between two timestamps for display in a status table.
+
+    :param start: Seconds since the epoch, or None if not set.
+    :param end: Seconds since the epoch, or None to measure up to now.
+    :returns: A string of the duration, or '--:--:--' if start is not set.
+    """
+    if start is None:
+        return "--:--:--"
+    if end is None:
+        end = time.time()
+    return str(timedelta(seconds=end - start))
+
+
+def status_row(name, workspace, state):
+    """
+    Build the row of a step in a status table.
+
+    :param name: Name of the step.
+    :param workspace: Path to the workspace of the step.
+    :param state: A tuple of the status, job identifiers, number of
+    restarts, and submission, start and end times of the step, as returned
+    by get_execution_state of a step record.
+    :returns: A tuple of the values of the step in each of STATUS_COLUMNS.
+    """
+    status, _, restarts, submit, start, end = state
+    return (name, os.path.split(workspace)[1], str(status),
+            format_duration(start, end), format_duration(submit, end),
+            format_timestamp(start), format_timestamp(submit),
+            format_timestamp(end), str(restarts))
+
+
 def csvtable_to_dict(fstream):
     """
     Convert a csv file stream into an in memory dictionary.
@@ -19,7 +19,6 @@ setup(name='maestrowf',
         'PyYAML',
         'six',
         'enum34',
-        "filelock",
         "tabulate",
         ],
       classifiers=[
@@ -0,0 +1,112 @@
+"""Tests for conducting a study from its state store."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from maestrowf.abstracts.enums import State
+from maestrowf.conductor import asyncio, ConductedStudy, ConductorDaemon, \
+    EventConductor, register_study
+from maestrowf.datastructures.core import ExecutionGraph, StateStore, \
+    StudyStep
+from maestrowf.utils import mark_store
+
+SOURCE = "_source"
+
+
+def build_chain(path, length):
+    """Build a graph of a chain of steps that run locally."""
+    dag = ExecutionGraph()
+    dag.add_description("chain", "A chain of local steps.")
+    dag.add_node(SOURCE, None)
+    parent = SOURCE
+    for i in range(length):
+        step = StudyStep()
+        step.name = "step{}".format(i)
+        step.description = "Step {} of the chain.".format(i)
+        step.run["cmd"] = "echo {}".format(i)
+        workspace = os.path.join(path, step.name)
+        os.makedirs(workspace)
+        dag.add_step(step.name, step, workspace, 0)
+        dag.add_edge(parent, step.name)
+        parent = step.name
+    dag.set_adapter({"type": "local"})
+    dag.generate_scripts()
+    return dag
+
+
+@unittest.skipIf(asyncio is None, "The event conductor requires asyncio.")
+class TestEventConductor(unittest.TestCase):
+    """Run the event conductor on a study kept in a state store."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_sqlite_store(self):
+        store = StateStore(os.path.join(self.path, "chain.db"))
+        store.save(build_chain(self.path, 3))
+        store.close()
+        mark_store(self.path, store.path)
+
+        study = ConductedStudy(self.path)
+        try:
+            EventConductor(study.dag, study.persist, study.write_status,
+                           0.1, flush_interval=0.1).run()
+        finally:
+            study.close()
+
+        store = StateStore(os.path.join(self.path, "chain.db"))
+        try:
+            self.assertEqual(store.count_by_state(), {State.FINISHED: 3})
+            self.assertTrue(store.load().is_complete())
+        finally:
+            store.close()
+
+
+class TestConductorDaemon(unittest.TestCase):
+    """Conduct studies with the conductor daemon."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.study_dir = os.path.join(self.path, "study")
+        self.daemon_dir = os.path.join(self.path, "daemon")
+        os.makedirs(self.study_dir)
+        self.persist = ConductedStudy.persist
+
+    def tearDown(self):
+        ConductedStudy.persist = self.persist
+        shutil.rmtree(self.path)
+
+    def test_retry_after_error(self):
+        pkl_path = os.path.join(self.study_dir, "chain.pkl")
+        build_chain(self.study_dir, 3).pickle(pkl_path)
+        register_study(self.study_dir, self.daemon_dir)
+
+        # Fail to persist the study the first two times.
+        failures = []
+        persist = self.persist
+
+        def flaky_persist(study, study_complete):
+            if len(failures) < 2:
+                failures.append(study_complete)
+                raise RuntimeError("The file system is not responding.")
+            persist(study, study_complete)
+
+        ConductedStudy.persist = flaky_persist
+        daemon = ConductorDaemon(self.daemon_dir, 0.01,
+                                 sentinel_interval=0.01)
+        self.assertTrue(daemon.acquire())
+        daemon.run()
+
+        self.assertEqual(len(failures), 2)
+        dag = ExecutionGraph.unpickle(pkl_path)
+        self.assertTrue(dag.is_complete())
+        self.assertFalse(dag.failed_steps)
+
+
+if __name__ == "__main__":
+    unittest.main()
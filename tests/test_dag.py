@@ -0,0 +1,191 @@
+"""Tests for the DAG and the topological order it maintains."""
+
+import random
+import unittest
+
+from maestrowf.datastructures.dag import DAG
+
+
+def build(nodes, edges=()):
+    """Build a DAG of nodes named by the characters of a string."""
+    dag = DAG()
+    for name in nodes:
+        dag.add_node(name, None)
+    for src, dest in edges:
+        dag.add_edge(src, dest)
+    return dag
+
+
+class TestIncrementalOrder(unittest.TestCase):
+    """Maintain a topological order as edges are added."""
+
+    def assertOrdered(self, dag):
+        position = dict((name, i)
+                        for i, name in enumerate(dag.topological_order()))
+        self.assertEqual(sorted(position), sorted(dag.values))
+        for src, children in dag.adjacency_table.items():
+            for dest in children:
+                self.assertLess(position[src], position[dest])
+
+    def test_edge_against_order(self):
+        dag = build("abcde", [("a", "b"), ("c", "d")])
+        self.assertEqual(dag.topological_order(), tuple("abcde"))
+
+        # e and d are ordered after a, so the nodes between them move.
+        dag.add_edge("e", "a")
+        self.assertEqual(dag.topological_order(), tuple("eacdb"))
+        dag.add_edge("d", "a")
+        self.assertEqual(dag.topological_order(), tuple("ecdab"))
+        self.assertOrdered(dag)
+
+    def test_reorder_moves_only_affected_range(self):
+        dag = build("abcdef", [("a", "b"), ("b", "c")])
+        dag.add_edge("e", "b")
+        self.assertOrdered(dag)
+        # Nodes outside of the range between b and e keep their positions.
+        order = dag.topological_order()
+        self.assertEqual(order[0], "a")
+        self.assertEqual(order[-1], "f")
+
+    def test_cycle_rejected(self):
+        dag = build("abcd", [("a", "b"), ("b", "c"), ("c", "d")])
+        before = dag.topological_order()
+
+        self.assertRaises(ValueError, dag.add_edge, "d", "a")
+        self.assertRaises(ValueError, dag.add_edge, "c", "b")
+        self.assertEqual(dag.children("d"), [])
+        self.assertEqual(dag.children("c"), ["d"])
+        self.assertEqual(dag.num_edges, 3)
+        self.assertEqual(dag.topological_order(), before)
+
+    def test_cycle_through_reordered_nodes(self):
+        dag = build("abcd", [("c", "d"), ("d", "a"), ("a", "b")])
+        self.assertOrdered(dag)
+        self.assertRaises(ValueError, dag.add_edge, "b", "c")
+        self.assertOrdered(dag)
+
+    def test_self_loop_ignored(self):
+        dag = build("ab")
+        dag.add_edge("a", "a")
+        self.assertEqual(dag.num_edges, 0)
+
+    def test_random_edges(self):
+        rng = random.Random(7)
+        names = [str(i) for i in range(40)]
+        dag = build(names)
+        # The names of the nodes that each node can reach.
+        reach = dict((name, set([name])) for name in names)
+        for _ in range(300):
+            src, dest = rng.sample(names, 2)
+            if src in reach[dest]:
+                self.assertRaises(ValueError, dag.add_edge, src, dest)
+                continue
+            dag.add_edge(src, dest)
+            for name in names:
+                if src in reach[name]:
+                    reach[name] |= reach[dest]
+            self.assertOrdered(dag)
+
+
+class TestBulkConstruction(unittest.TestCase):
+    """Add nodes and edges to a DAG in bulk."""
+
+    def test_add_nodes_from(self):
+        dag = build("ab")
+        dag.add_nodes_from([("c", 3), ("a", 1), ("d", 4)])
+        self.assertEqual(list(dag.values), list("abcd"))
+        self.assertIsNone(dag.values["a"])
+        self.assertEqual(dag.values["d"], 4)
+        self.assertEqual(dag.roots(), list("abcd"))
+
+    def test_add_edges_from(self):
+        dag = build("abcd", [("a", "b")])
+        dag.add_edges_from([("a", "b"), ("d", "c"), ("c", "a"), ("d", "a")])
+        self.assertEqual(dag.num_edges, 4)
+        self.assertEqual(dag.children("d"), ["c", "a"])
+        self.assertEqual(dag.parents("a"), ["c", "d"])
+        self.assertEqual(dag.roots(), ["d"])
+        self.assertEqual(dag.leaves(), ["b"])
+        self.assertEqual(dag.topological_order(), tuple("dcab"))
+
+    def test_add_edges_from_rollback(self):
+        dag = build("abcde", [("a", "b"), ("b", "c")])
+        order = dag.topological_order()
+        self.assertRaises(ValueError, dag.add_edges_from,
+                          [("d", "e"), ("e", "a"), ("c", "d")])
+
+        # None of the edges were added, and the edges that were already
+        # there are intact.
+        self.assertEqual(dag.num_edges, 2)
+        self.assertEqual(dict((name, list(children)) for name, children
+                              in dag.adjacency_table.items()),
+                         {"a": ["b"], "b": ["c"], "c": [], "d": [],
+                          "e": []})
+        self.assertEqual(dag.parents("a"), [])
+        self.assertEqual(dag.out_degree("c"), 0)
+        self.assertEqual(dag.in_degree("e"), 0)
+        self.assertEqual(dag.roots(), list("ade"))
+        self.assertEqual(dag.leaves(), list("cde"))
+        self.assertEqual(dag.topological_order(), order)
+
+        # The DAG is still usable after the rollback.
+        dag.add_edges_from([("d", "e"), ("e", "a")])
+        self.assertEqual(dag.topological_order(), tuple("deabc"))
+
+    def test_add_edges_from_invalid(self):
+        dag = build("ab")
+        self.assertRaises(ValueError, dag.add_edges_from,
+                          [("a", "b"), ("a", "x")])
+        self.assertRaises(ValueError, dag.add_edges_from,
+                          [("a", "b"), ("b", "b")])
+        self.assertEqual(dag.num_edges, 0)
+
+
+class TestTransitiveReduction(unittest.TestCase):
+    """Remove the edges of a DAG that are implied by longer paths."""
+
+    def reachable(self, dag):
+        return dict((name, set(dag.bfs_subtree(name)[0]))
+                    for name in dag.values)
+
+    def test_shortcuts_removed(self):
+        dag = build("abcde", [("a", "b"), ("b", "c"), ("a", "c"),
+                              ("c", "d"), ("a", "d"), ("b", "e"),
+                              ("a", "e")])
+        reach = self.reachable(dag)
+
+        removed = dag.transitive_reduction()
+        self.assertEqual(sorted(removed),
+                         [("a", "c"), ("a", "d"), ("a", "e")])
+        self.assertEqual(dag.num_edges, 4)
+        self.assertEqual(dag.children("a"), ["b"])
+        self.assertEqual(self.reachable(dag), reach)
+
+    def test_diamond_kept(self):
+        dag = build("abcd", [("a", "b"), ("a", "c"), ("b", "d"),
+                             ("c", "d")])
+        self.assertEqual(dag.transitive_reduction(), [])
+        self.assertEqual(dag.num_edges, 4)
+
+    def test_random(self):
+        rng = random.Random(11)
+        names = [str(i) for i in range(30)]
+        dag = build(names)
+        for _ in range(120):
+            src, dest = sorted(rng.sample(range(30), 2))
+            dag.add_edge(names[src], names[dest])
+        reach = self.reachable(dag)
+
+        dag.transitive_reduction()
+        self.assertEqual(self.reachable(dag), reach)
+        # No edge that is left can be implied by another path.
+        for src in names:
+            for dest in dag.children(src):
+                others = [child for child in dag.children(src)
+                          if child != dest]
+                for child in others:
+                    self.assertNotIn(dest, reach[child])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,460 @@
+"""Tests for scheduling the steps of an ExecutionGraph."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from maestrowf.abstracts.enums import JobStatusCode, State, SubmissionCode
+from maestrowf.datastructures.core import ExecutionGraph, StudyStep
+from maestrowf.interfaces import ScriptAdapterFactory
+
+SOURCE = "_source"
+
+
+class FakeAdapter(object):
+    """A scheduler that records submissions and reports preset states."""
+
+    # The step name of each submitted job, indexed by job identifier.
+    submitted = []
+    # The State the scheduler reports for each job identifier.
+    states = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, step, path, cwd, job_map=None, env=None):
+        jobid = str(len(FakeAdapter.submitted))
+        FakeAdapter.submitted.append(step.name)
+        return SubmissionCode.OK, jobid
+
+    def check_jobs(self, joblist):
+        return JobStatusCode.OK, dict(
+            (jobid, FakeAdapter.states.get(jobid, State.PENDING))
+            for jobid in joblist)
+
+
+def build_graph(edges, names=None):
+    """
+    Build a graph of scheduled steps.
+
+    :param edges: A list of (parent, step) name pairs. Steps without a
+    parent depend on the source node.
+    :param names: The names of the steps, if some have no edges.
+    :returns: An ExecutionGraph that submits its steps to a FakeAdapter.
+    """
+    if names is None:
+        names = []
+        for edge in edges:
+            names.extend(name for name in edge if name not in names)
+    dag = ExecutionGraph()
+    dag.add_description("test", "A graph of fake steps.")
+    dag.add_node(SOURCE, None)
+    for name in names:
+        step = StudyStep()
+        step.name = name
+        step.run["depends"] = [parent for parent, child in edges
+                               if child == name]
+        dag.add_step(name, step, name, 1)
+        dag.values[name].to_be_scheduled = True
+    for name in names:
+        if not dag.values[name].step.run["depends"]:
+            dag.add_edge(SOURCE, name)
+    for parent, child in edges:
+        dag.add_edge(parent, child)
+    dag.set_adapter({"type": "fake"})
+    return dag
+
+
+class FakeSchedulerTest(unittest.TestCase):
+    """A test that submits steps to a FakeAdapter."""
+
+    def setUp(self):
+        ScriptAdapterFactory.factories["fake"] = FakeAdapter
+        FakeAdapter.submitted = []
+        FakeAdapter.states = {}
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        del ScriptAdapterFactory.factories["fake"]
+        shutil.rmtree(self.path)
+
+    def submit(self, dag):
+        """Submit the ready steps and return their names, sorted."""
+        first = len(FakeAdapter.submitted)
+        dag.submit_ready_steps()
+        return sorted(FakeAdapter.submitted[first:])
+
+    def report(self, dag, **states):
+        """Apply the scheduler states of steps, given by step name."""
+        jobs = dict((dag.values[name].jobid[-1], state)
+                    for name, state in states.items())
+        FakeAdapter.states.update(jobs)
+        dag.poll_steps((JobStatusCode.OK, jobs))
+
+    def waiting(self, dag):
+        """Get the count of unfinished parents of each unfinished step."""
+        return dict((name, dag._waiting[dag._ids[name]])
+                    for name in dag.values
+                    if name not in dag.completed_steps)
+
+
+class TestReadyQueue(FakeSchedulerTest):
+    """Release steps as their parents finish."""
+
+    def test_diamond(self):
+        dag = build_graph([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+        self.assertEqual(self.submit(dag), ["a"])
+        self.assertEqual(self.waiting(dag),
+                         {"a": 0, "b": 1, "c": 1, "d": 2})
+
+        self.report(dag, a=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["b", "c"])
+        self.report(dag, b=State.FINISHED)
+        self.assertEqual(self.waiting(dag)["d"], 1)
+        self.assertEqual(self.submit(dag), [])
+        self.report(dag, c=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["d"])
+        self.report(dag, d=State.FINISHED)
+        self.assertTrue(dag.is_complete())
+
+    def test_failure(self):
+        dag = build_graph([("a", "b"), ("b", "d"), ("c", "d")],
+                          names=["a", "b", "c", "d", "e"])
+        self.assertEqual(self.submit(dag), ["a", "c", "e"])
+
+        self.report(dag, a=State.FAILED)
+        self.assertEqual(dag.failed_steps, set(["a", "b", "d"]))
+        # d was counted as waiting on c, but must not be released once c
+        # finishes since it has already failed.
+        self.report(dag, c=State.FINISHED, e=State.FINISHED)
+        self.assertEqual(self.waiting(dag)["d"], 1)
+        self.assertEqual(self.submit(dag), [])
+        self.assertFalse(dag.has_ready_steps())
+        self.assertTrue(dag.is_complete())
+
+    def test_restart(self):
+        dag = build_graph([("a", "b")])
+        self.submit(dag)
+        self.report(dag, a=State.TIMEDOUT)
+        self.assertEqual(FakeAdapter.submitted, ["a", "a"])
+        self.assertEqual(dag.values["a"].restarts, 1)
+        self.assertEqual(self.waiting(dag)["b"], 1)
+        self.assertEqual(self.submit(dag), [])
+
+        # The restarted job finishing releases b once.
+        self.report(dag, a=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["b"])
+        self.assertEqual(self.submit(dag), [])
+
+    def test_hardware_failure(self):
+        dag = build_graph([("a", "b")])
+        self.submit(dag)
+        self.report(dag, a=State.HWFAILURE)
+        self.assertTrue(dag.has_ready_steps())
+        self.assertEqual(self.submit(dag), ["a"])
+        self.assertEqual(self.waiting(dag)["b"], 1)
+
+    def test_rebuilt_after_unpickle(self):
+        dag = build_graph([("a", "c"), ("b", "c"), ("c", "d")])
+        self.submit(dag)
+        self.report(dag, a=State.FINISHED)
+        path = os.path.join(self.path, "test.pkl")
+        dag.pickle(path)
+
+        dag = ExecutionGraph.unpickle(path)
+        self.assertIsNone(dag._waiting)
+        self.assertEqual(self.submit(dag), [])
+        self.assertEqual(self.waiting(dag), {"b": 0, "c": 1, "d": 1})
+        self.report(dag, b=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["c"])
+
+
+class TestJournal(FakeSchedulerTest):
+    """Persist the changes to a graph in a journal next to its pickle."""
+
+    def setUp(self):
+        super(TestJournal, self).setUp()
+        self.pkl = os.path.join(self.path, "test.pkl")
+        self.journal = self.pkl + ".journal"
+        names = ["s{}".format(i) for i in range(8)]
+        self.dag = build_graph(list(zip(names, names[1:])) +
+                               [("x", "y"), ("y", "z")])
+        self.dag.pickle(self.pkl)
+
+    def states(self, dag):
+        return dag.get_changes(name for name in dag.values
+                               if name != SOURCE)
+
+    def test_replay(self):
+        dag = self.dag
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        self.report(dag, s0=State.FINISHED, x=State.RUNNING)
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        self.assertTrue(os.path.exists(self.journal))
+        self.assertEqual(dag._journaled, 5)
+
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(self.states(loaded), self.states(dag))
+        self.assertEqual(loaded._journaled, 5)
+        self.assertEqual(loaded.in_progress, set(["s1", "x"]))
+
+    def test_nothing_changed(self):
+        self.dag.checkpoint(self.pkl)
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_compaction(self):
+        dag = self.dag
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        for name in ["s{}".format(i) for i in range(4)]:
+            self.report(dag, **{name: State.FINISHED})
+            self.submit(dag)
+            dag.checkpoint(self.pkl)
+        self.assertTrue(os.path.exists(self.journal))
+        self.assertEqual(dag._journaled, 10)
+
+        # The journal would hold as many entries as there are nodes, so the
+        # graph is pickled again instead.
+        self.report(dag, s4=State.FINISHED)
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        self.assertFalse(os.path.exists(self.journal))
+        self.assertEqual(dag._journaled, 0)
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(self.states(loaded), self.states(dag))
+
+        # A new journal starts after the compaction.
+        self.report(dag, s5=State.FINISHED)
+        dag.checkpoint(self.pkl)
+        self.assertTrue(os.path.exists(self.journal))
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(self.states(loaded), self.states(dag))
+
+    def test_partial_entry(self):
+        dag = self.dag
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        expected = self.states(dag)
+        self.report(dag, s0=State.FINISHED)
+        dag.checkpoint(self.pkl)
+        with open(self.journal, "rb") as journal:
+            data = journal.read()
+        with open(self.journal, "wb") as journal:
+            journal.write(data[:-3])
+
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(self.states(loaded), expected)
+
+    def test_stale_journal(self):
+        dag = self.dag
+        self.submit(dag)
+        dag.checkpoint(self.pkl)
+        with open(self.journal, "rb") as journal:
+            stale = journal.read()
+        self.report(dag, s0=State.FINISHED)
+        dag.pickle(self.pkl)
+
+        # A journal left behind from the previous pickle is not replayed.
+        with open(self.journal, "wb") as journal:
+            journal.write(stale)
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(loaded.values["s0"].status, State.FINISHED)
+        self.assertEqual(loaded.completed_steps, dag.completed_steps)
+
+    def test_failed_write(self):
+        dag = self.dag
+        self.submit(dag)
+        os.mkdir(self.journal)
+        self.assertRaises((IOError, OSError), dag.checkpoint, self.pkl)
+        os.rmdir(self.journal)
+
+        # The changes are kept, and written with a full pickle.
+        dag.checkpoint(self.pkl)
+        self.assertFalse(os.path.exists(self.journal))
+        loaded = ExecutionGraph.unpickle(self.pkl)
+        self.assertEqual(self.states(loaded), self.states(dag))
+
+
+class TestFailSteps(FakeSchedulerTest):
+    """Fail steps along with everything that depends on them."""
+
+    def setUp(self):
+        super(TestFailSteps, self).setUp()
+        self.dag = build_graph([("a", "c"), ("b", "c"), ("c", "d"),
+                                ("b", "e"), ("e", "f"), ("g", "h")])
+
+    def test_multiple_sources(self):
+        dag = self.dag
+        self.submit(dag)
+        dag.pop_changes()
+        self.report(dag, a=State.FAILED, b=State.FAILED, g=State.FINISHED)
+
+        self.assertEqual(dag.failed_steps, set("abcdef"))
+        for name in "abcdef":
+            self.assertEqual(dag.values[name].status, State.FAILED)
+        self.assertEqual(dag.in_progress, set())
+        self.assertEqual(sorted(name for name, _, _ in dag.pop_changes()),
+                         list("abcdefg"))
+        self.assertEqual(self.submit(dag), ["h"])
+
+    def test_failed_subtree_not_entered(self):
+        dag = self.dag
+        dag._fail_steps(["e"])
+        end = dag.values["f"].get_execution_state()[5]
+        dag.pop_changes()
+
+        dag._fail_steps(["b"])
+        self.assertEqual(dag.failed_steps, set("bcdef"))
+        # e and f already failed, so they are not marked again.
+        self.assertEqual(dag.values["f"].get_execution_state()[5], end)
+        self.assertEqual(sorted(name for name, _, _ in dag.pop_changes()),
+                         list("bcd"))
+
+    def test_nothing_failed(self):
+        self.dag._fail_steps([])
+        self.assertEqual(self.dag.failed_steps, set())
+        self.assertEqual(self.dag.pop_changes(), [])
+
+
+class TestSentinels(FakeSchedulerTest):
+    """Learn that steps ended from the exit codes their scripts leave."""
+
+    def setUp(self):
+        super(TestSentinels, self).setUp()
+        self.sentinels = os.path.join(self.path, "sentinels")
+        os.mkdir(self.sentinels)
+        self.dag = build_graph([("a", "b"), ("c", "d")], names=list("abcde"))
+        self.dag.set_sentinel_dir(self.sentinels)
+        self.submit(self.dag)
+
+    def write(self, name, code):
+        path = os.path.join(self.sentinels, name + ".exit")
+        with open(path, "w") as sentinel:
+            sentinel.write(code)
+        return path
+
+    def test_finished(self):
+        path = self.write("a", "0\n")
+        self.assertTrue(self.dag.has_sentinels())
+        self.assertEqual(self.dag.check_sentinels(), (1, 0))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(self.dag.has_sentinels())
+        self.assertIn("a", self.dag.completed_steps)
+        self.assertEqual(self.submit(self.dag), ["b"])
+
+    def test_error(self):
+        path = self.write("c", "1")
+        self.assertEqual(self.dag.check_sentinels(), (0, 1))
+
+        # The scheduler reports how the step ended.
+        self.assertFalse(os.path.exists(path))
+        self.assertIn("c", self.dag.in_progress)
+        self.assertEqual(self.dag.values["c"].status, State.PENDING)
+
+    def test_unreadable(self):
+        path = self.write("c", "garbage")
+        self.write("e", "")
+        self.assertEqual(self.dag.check_sentinels(), (0, 2))
+
+        self.assertTrue(os.path.exists(path + ".bad"))
+        self.assertFalse(self.dag.has_sentinels())
+        self.assertEqual(self.dag.check_sentinels(), (0, 0))
+        self.assertEqual(self.dag.in_progress, set("ace"))
+
+    def test_not_in_progress(self):
+        path = self.write("b", "0")
+        other = os.path.join(self.sentinels, "notes.txt")
+        with open(other, "w") as notes:
+            notes.write("0")
+        self.assertEqual(self.dag.check_sentinels(), (0, 0))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(other))
+        self.assertNotIn("b", self.dag.completed_steps)
+
+    def test_no_sentinel_dir(self):
+        self.write("a", "0")
+        self.dag.set_sentinel_dir(None)
+        self.assertFalse(self.dag.has_sentinels())
+        self.assertEqual(self.dag.check_sentinels(), (0, 0))
+        shutil.rmtree(self.sentinels)
+        self.dag.set_sentinel_dir(self.sentinels)
+        self.assertFalse(self.dag.has_sentinels())
+        self.assertEqual(self.dag.check_sentinels(), (0, 0))
+
+
+class TestRecover(FakeSchedulerTest):
+    """Reconcile a graph with the scheduler after a restart."""
+
+    def restart(self, dag):
+        """Pickle and unpickle a graph, as a conductor restart would."""
+        path = os.path.join(self.path, "test.pkl")
+        dag.pickle(path)
+        return ExecutionGraph.unpickle(path)
+
+    def test_recover(self):
+        dag = build_graph([("a", "b"), ("a", "c"), ("d", "e")],
+                          names=list("abcdef"))
+        self.submit(dag)
+        dag = self.restart(dag)
+
+        # While the conductor was down, a finished, d failed, f hit a
+        # hardware failure and the scheduler lost track of e.
+        jobs = dict((name, dag.values[name].jobid[-1]) for name in "adf")
+        FakeAdapter.states = {jobs["a"]: State.FINISHED,
+                              jobs["d"]: State.FAILED,
+                              jobs["f"]: State.HWFAILURE}
+        del FakeAdapter.submitted[:]
+        self.assertEqual(dag.recover(), 4)
+
+        self.assertIn("a", dag.completed_steps)
+        self.assertEqual(dag.failed_steps, set(["d", "e"]))
+        # f is submitted again during the recovery, and the children of a
+        # are ready for the next tick.
+        self.assertEqual(FakeAdapter.submitted, ["f"])
+        self.assertEqual(dag.in_progress, set(["f"]))
+        self.assertEqual(self.submit(dag), ["b", "c"])
+
+    def test_submitted_without_job(self):
+        dag = build_graph([("a", "b")])
+        dag.values["a"].mark_submitted()
+        dag = self.restart(dag)
+
+        self.assertEqual(dag.recover(), 1)
+        self.assertEqual(dag.values["a"].status, State.INITIALIZED)
+        self.assertIsNone(dag.values["a"].get_execution_state()[3])
+        self.assertEqual(self.submit(dag), ["a"])
+
+    def test_missing_job(self):
+        dag = build_graph([("a", "b")])
+        self.submit(dag)
+        dag = self.restart(dag)
+        FakeAdapter.states = {dag.values["a"].jobid[-1]: None}
+
+        self.assertEqual(dag.recover(), 0)
+        self.assertEqual(dag.in_progress, set(["a"]))
+        self.assertEqual(dag.values["a"].status, State.PENDING)
+
+    def test_nothing_in_progress(self):
+        dag = build_graph([("a", "b")])
+        self.assertEqual(dag.recover(), 0)
+        self.assertEqual(self.submit(dag), ["a"])
+
+
+class TestTransitiveReduction(FakeSchedulerTest):
+    """Remove implied dependencies from the steps of a graph."""
+
+    def test_depends_updated(self):
+        dag = build_graph([("a", "b"), ("b", "c"), ("a", "c")])
+        self.assertEqual(dag.transitive_reduction(), [("a", "c")])
+        self.assertEqual(dag.values["c"].step.run["depends"], ["b"])
+        self.assertEqual(dag.values["b"].step.run["depends"], ["a"])
+        self.assertEqual(dag.parents("c"), ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Tests for the binary snapshot format of ExecutionGraphs."""
+
+import os
+import struct
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import ExecutionGraph, snapshot
+
+from test_executiongraph import FakeSchedulerTest, build_graph, SOURCE
+
+
+class TestSnapshot(FakeSchedulerTest):
+    """Write ExecutionGraphs to snapshots and read them back."""
+
+    def setUp(self):
+        super(TestSnapshot, self).setUp()
+        self.dag = build_graph([("a", "b"), ("a", "c"), ("b", "d"),
+                                ("c", "d")], names=list("abcde"))
+        self.dag.set_limits(max_in_flight=4)
+        for name in "abcde":
+            record = self.dag.values[name]
+            record.script = os.path.join(self.path, name + ".sh")
+            record.step.run["cmd"] = "echo {}".format(name)
+            record.step.run["nodes"] = 2
+            record.step.run["walltime"] = "00:10:00"
+        self.dag.values["e"].restart_script = "restart.sh"
+        self.dag.values["d"].step.description = u"Unicode \u00e9 description."
+
+    def run_steps(self):
+        self.submit(self.dag)
+        self.report(self.dag, a=State.FINISHED)
+        self.submit(self.dag)
+        self.report(self.dag, b=State.TIMEDOUT, c=State.FAILED)
+
+    def assertSameGraph(self, loaded, dag):
+        self.assertIsInstance(loaded, ExecutionGraph)
+        self.assertEqual(list(loaded.values), list(dag.values))
+        self.assertEqual(loaded.topological_order(), dag.topological_order())
+        self.assertEqual(dict((name, list(children)) for name, children
+                              in loaded.adjacency_table.items()),
+                         dict((name, list(children)) for name, children
+                              in dag.adjacency_table.items()))
+        self.assertEqual(loaded.adapter, dag.adapter)
+        self.assertEqual(loaded.name, dag.name)
+        self.assertEqual(loaded.description, dag.description)
+        self.assertEqual(loaded.throttle.settings(), dag.throttle.settings())
+        self.assertEqual(loaded.completed_steps, dag.completed_steps)
+        self.assertEqual(loaded.in_progress, dag.in_progress)
+        self.assertEqual(loaded.failed_steps, dag.failed_steps)
+        self.assertIsNone(loaded.values[SOURCE])
+        for name, record in dag.values.items():
+            if record is None:
+                continue
+            other = loaded.values[name]
+            self.assertEqual(other.get_execution_state(),
+                             record.get_execution_state())
+            for field in ("workspace", "script", "restart_script",
+                          "to_be_scheduled", "restart_limit"):
+                self.assertEqual(getattr(other, field),
+                                 getattr(record, field))
+            self.assertEqual(other.step.materialize(),
+                             record.step.materialize())
+
+    def test_round_trip(self):
+        self.assertSameGraph(snapshot.loads(snapshot.dumps(self.dag)),
+                             self.dag)
+        self.run_steps()
+        self.assertSameGraph(snapshot.loads(snapshot.dumps(self.dag)),
+                             self.dag)
+
+    def test_file(self):
+        self.run_steps()
+        path = os.path.join(self.path, "test.snap")
+        self.dag.dump(path)
+        self.assertSameGraph(ExecutionGraph.load(path), self.dag)
+        self.dag.dump(path, compress=True)
+        self.assertSameGraph(ExecutionGraph.load(path), self.dag)
+        self.assertFalse(os.path.exists(path + ".tmp"))
+
+    def test_loaded_graph_runs(self):
+        self.run_steps()
+        loaded = snapshot.loads(snapshot.dumps(self.dag))
+        self.report(loaded, b=State.FINISHED, e=State.FINISHED)
+        self.assertEqual(self.submit(loaded), [])
+        self.assertTrue(loaded.is_complete())
+
+    def test_rejected(self):
+        data = snapshot.dumps(self.dag)
+        self.assertRaises(ValueError, snapshot.loads, data[:4])
+        self.assertRaises(ValueError, snapshot.loads,
+                          b"NOTASNAP" + data[8:])
+        newer = data[:8] + struct.pack("<H", snapshot.VERSION + 1) + \
+            data[10:]
+        self.assertRaises(ValueError, snapshot.loads, newer)
@@ -0,0 +1,118 @@
+"""Tests for the indexed binary status file."""
+
+import fnmatch
+import os
+import shutil
+import tempfile
+import unittest
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core.statusfile import StatusFile, \
+    update_status_file, write_status_file
+from maestrowf.utils import STATUS_COLUMNS, status_row
+
+NAMES = ["run_X.1.Y.2", "run_X.1.Y.10", "run_X.2.Y.1", "run_X.10.Y.1",
+         "post_X.1", "post_X.2", "setup", "run", "r", u"run_\u00e9"]
+
+
+class TestStatusFile(unittest.TestCase):
+    """Write, update and query status files."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.status = os.path.join(self.path, "status.bin")
+        self.rows = []
+        states = [State.FINISHED, State.RUNNING, State.FAILED,
+                  State.INITIALIZED]
+        for i, name in enumerate(NAMES):
+            times = (1000.0 + i, 1010.5 + i, 1020.25 + i) if i % 4 else \
+                (None, None, None)
+            self.rows.append((name, os.path.join(self.path, name),
+                              states[i % 4], i % 3) + times)
+        write_status_file(self.status, self.rows)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def open(self):
+        status = StatusFile(self.status)
+        self.addCleanup(status.close)
+        return status
+
+    def expected(self, rows):
+        table = dict((column, []) for column in STATUS_COLUMNS)
+        for name, workspace, state, restarts, submit, start, end in rows:
+            row = status_row(name, workspace,
+                             (state, None, restarts, submit, start, end))
+            for column, value in zip(STATUS_COLUMNS, row):
+                table[column].append(value)
+        return table
+
+    def test_round_trip(self):
+        status = self.open()
+        self.assertEqual(len(status), len(NAMES))
+        self.assertEqual(dict(status.status_table()),
+                         self.expected(self.rows))
+        self.assertEqual(status.count_by_state(),
+                         {State.FINISHED: 3, State.RUNNING: 3,
+                          State.FAILED: 2, State.INITIALIZED: 2})
+        self.assertFalse(os.path.exists(self.status + ".tmp"))
+
+    def test_update_in_place(self):
+        size = os.path.getsize(self.status)
+        inode = os.stat(self.status).st_ino
+        status = self.open()
+
+        updates = [(1, State.INITIALIZED, 2, None, None, None),
+                   (4, State.TIMEDOUT, 5, 1004.0, 1014.5, 1100.0)]
+        update_status_file(self.status, len(NAMES), updates)
+        for row, state, restarts, submit, start, end in updates:
+            name, workspace = self.rows[row][:2]
+            self.rows[row] = (name, workspace, state, restarts, submit,
+                              start, end)
+
+        self.assertEqual(os.path.getsize(self.status), size)
+        self.assertEqual(os.stat(self.status).st_ino, inode)
+        # A reader that has the file open sees the update.
+        self.assertEqual(dict(status.status_table()),
+                         self.expected(self.rows))
+        self.assertEqual(dict(self.open().status_table()),
+                         self.expected(self.rows))
+
+    def test_update_wrong_count(self):
+        self.assertRaises(ValueError, update_status_file, self.status,
+                          len(NAMES) + 1, [(0, State.FAILED, 0, None, None,
+                                            None)])
+
+    def test_find_by_pattern(self):
+        status = self.open()
+        for pattern in ["run_X.1*", "run_X.1.Y.?", "run*", "r", "r*",
+                        "post_X.[12]", "*Y.1", "[ps]*", "?un", "missing*",
+                        "", u"run_\u00e9", "setup"]:
+            expected = [row for row, name in enumerate(NAMES)
+                        if fnmatch.fnmatchcase(name, pattern)]
+            self.assertEqual(status.find(patterns=[pattern]), expected,
+                             pattern)
+
+    def test_find(self):
+        status = self.open()
+        self.assertEqual(status.find(), list(range(len(NAMES))))
+        self.assertEqual(status.find(states=[State.FAILED]), [2, 6])
+        self.assertEqual(status.find(states=[State.FINISHED],
+                                     patterns=["run*", "post*"]), [0, 4])
+        self.assertEqual(status.find(patterns=["setup", "r"]), [6, 8])
+        table = status.status_table(states=[State.RUNNING],
+                                    patterns=["run_X.1*"])
+        self.assertEqual(table["Step Name"], ["run_X.1.Y.10"])
+
+    def test_not_a_status_file(self):
+        with open(self.status, "rb") as status:
+            truncated = status.read()[:-1]
+        for data in (b"", b"MWFSTAT", b"0" * 64, truncated):
+            with open(self.status, "wb") as status:
+                status.write(data)
+            self.assertRaises(ValueError, StatusFile, self.status)
+
+
+if __name__ == "__main__":
+    unittest.main()
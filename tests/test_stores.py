@@ -0,0 +1,184 @@
+"""Tests for keeping the state of an ExecutionGraph in a store."""
+
+import os
+import sqlite3
+
+from maestrowf.abstracts.enums import State
+from maestrowf.datastructures.core import ShardStore, StateStore
+
+from test_executiongraph import FakeSchedulerTest, build_graph, SOURCE
+
+
+class StoreTest(FakeSchedulerTest):
+    """A test that stores a running graph."""
+
+    def setUp(self):
+        super(StoreTest, self).setUp()
+        self.dag = build_graph([("a", "b"), ("a", "c"), ("b", "d"),
+                                ("c", "d")], names=list("abcde"))
+
+    def run_steps(self):
+        """Take the graph through a few changes of state."""
+        self.submit(self.dag)
+        self.report(self.dag, a=State.FINISHED, e=State.RUNNING)
+        self.submit(self.dag)
+        self.report(self.dag, b=State.FAILED)
+
+    def assertSameGraph(self, loaded, dag):
+        names = [name for name in dag.values if name != SOURCE]
+        self.assertEqual(list(loaded.values), list(dag.values))
+        self.assertEqual(dict((name, list(children)) for name, children
+                              in loaded.adjacency_table.items()),
+                         dict((name, list(children)) for name, children
+                              in dag.adjacency_table.items()))
+        self.assertEqual(loaded.get_changes(names), dag.get_changes(names))
+        self.assertEqual(loaded.completed_steps, dag.completed_steps)
+        self.assertEqual(loaded.in_progress, dag.in_progress)
+        self.assertEqual(loaded.failed_steps, dag.failed_steps)
+        self.assertEqual(loaded.adapter, dag.adapter)
+
+
+class TestStateStore(StoreTest):
+    """Keep the state of a graph in a SQLite database."""
+
+    def setUp(self):
+        super(TestStateStore, self).setUp()
+        self.db = os.path.join(self.path, "test.db")
+        self.store = StateStore(self.db)
+
+    def tearDown(self):
+        self.store.close()
+        super(TestStateStore, self).tearDown()
+
+    def reopen(self, read_only=False):
+        store = StateStore(self.db, read_only=read_only)
+        self.addCleanup(store.close)
+        return store
+
+    def test_round_trip(self):
+        self.store.save(self.dag)
+        self.assertSameGraph(self.reopen().load(), self.dag)
+
+        self.run_steps()
+        self.assertEqual(self.store.commit(self.dag), 5)
+        self.assertEqual(self.store.commit(self.dag), 0)
+        loaded = self.reopen().load()
+        self.assertSameGraph(loaded, self.dag)
+
+        # A loaded graph commits its own changes.
+        self.report(loaded, e=State.FINISHED)
+        self.assertEqual(self.store.commit(loaded), 1)
+        self.assertSameGraph(self.reopen().load(), loaded)
+
+    def test_queries(self):
+        self.store.save(self.dag)
+        self.run_steps()
+        self.store.commit(self.dag)
+
+        store = self.reopen(read_only=True)
+        self.assertEqual(store.count_by_state(),
+                         {State.FINISHED: 1, State.FAILED: 2,
+                          State.RUNNING: 1, State.PENDING: 1})
+        table = store.status_table(states=[State.FAILED])
+        self.assertEqual(table["Step Name"], ["b", "d"])
+        table = store.status_table(patterns=["[ce]"])
+        self.assertEqual(table["Step Name"], ["c", "e"])
+        self.assertEqual(table["State"],
+                         [str(State.PENDING), str(State.RUNNING)])
+
+    def test_read_only(self):
+        self.store.save(self.dag)
+        store = self.reopen(read_only=True)
+        self.run_steps()
+        self.assertRaises(sqlite3.Error, store.commit, self.dag)
+
+        # The changes that could not be written are kept for the next
+        # commit.
+        self.assertEqual(self.store.commit(self.dag), 5)
+        self.assertSameGraph(store.load(), self.dag)
+
+    def test_read_only_missing(self):
+        self.assertRaises(IOError, StateStore,
+                          os.path.join(self.path, "missing.db"),
+                          read_only=True)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.path, "missing.db")))
+
+    def test_empty(self):
+        self.assertRaises(ValueError, self.store.load)
+
+
+class TestShardStore(StoreTest):
+    """Keep the state of a graph in one shard per workspace."""
+
+    def setUp(self):
+        super(TestShardStore, self).setUp()
+        self.shards = os.path.join(self.path, "test.shards")
+        self.store = ShardStore(self.shards)
+        # a runs in the study's workspace, b and c in one parameter
+        # combination, d in another and e outside of the study.
+        workspaces = {"a": self.path,
+                      "b": os.path.join(self.path, "b", "X.1"),
+                      "c": os.path.join(self.path, "c", "X.1"),
+                      "d": os.path.join(self.path, "d", "X.2"),
+                      "e": "/elsewhere/_e"}
+        for name, workspace in workspaces.items():
+            self.dag.values[name].workspace = workspace
+
+    def test_shard_names(self):
+        self.assertEqual(self.store.shard_name(self.path), "_global")
+        self.assertEqual(
+            self.store.shard_name(os.path.join(self.path, "b", "X.1")),
+            "b%2FX.1")
+        self.assertEqual(
+            self.store.shard_name(os.path.join(self.path, "_global")),
+            "%5Fglobal")
+        self.assertEqual(self.store.shard_name("/elsewhere/_e"),
+                         "%2Felsewhere%2F_e")
+        # Names that differ only in how their separators are spelled are
+        # not confused.
+        self.assertNotEqual(
+            self.store.shard_name(os.path.join(self.path, "b_X.1")),
+            self.store.shard_name(os.path.join(self.path, "b", "X.1")))
+
+    def test_round_trip(self):
+        self.store.save(self.dag)
+        self.assertEqual(self.store.shards(),
+                         ["%2Felsewhere%2F_e", "_global", "b%2FX.1",
+                          "c%2FX.1", "d%2FX.2"])
+        self.assertSameGraph(ShardStore(self.shards).load(), self.dag)
+
+        self.run_steps()
+        # Every step changed, and each step has a shard of its own.
+        self.assertEqual(self.store.commit(self.dag), 5)
+        self.assertEqual(self.store.commit(self.dag), 0)
+        loaded = ShardStore(self.shards).load()
+        self.assertSameGraph(loaded, self.dag)
+
+        self.report(self.dag, e=State.FINISHED)
+        self.assertEqual(self.store.commit(self.dag), 1)
+        self.assertSameGraph(ShardStore(self.shards).load(), self.dag)
+
+    def test_save_removes_stale_shards(self):
+        self.store.save(self.dag)
+        self.dag.values["d"].workspace = os.path.join(self.path, "b", "X.1")
+        self.store.save(self.dag)
+        self.assertNotIn("d%2FX.2", self.store.shards())
+        self.assertSameGraph(ShardStore(self.shards).load(), self.dag)
+
+    def test_queries(self):
+        self.store.save(self.dag)
+        self.run_steps()
+        self.store.commit(self.dag)
+
+        store = ShardStore(self.shards)
+        self.assertEqual(store.count_by_state(shards=["?%2FX.1"]),
+                         {State.FAILED: 1, State.PENDING: 1})
+        table = store.status_table(states=[State.FAILED])
+        self.assertEqual(sorted(table["Step Name"]), ["b", "d"])
+        table = store.status_table(patterns=["a"], shards=["_global"])
+        self.assertEqual(table["Step Name"], ["a"])
+        self.assertEqual(table["Workspace"], [os.path.basename(self.path)])
+
+    def test_empty(self):
+        self.assertRaises(ValueError, self.store.load)
@@ -0,0 +1,145 @@
+"""Tests for limiting how fast steps are submitted."""
+
+import pickle
+import unittest
+
+from maestrowf.abstracts.enums import JobStatusCode, State
+from maestrowf.datastructures.core import throttle
+from maestrowf.datastructures.core.throttle import Throttle
+
+from test_executiongraph import FakeSchedulerTest, build_graph
+
+
+class FakeClock(object):
+    """A clock that only moves when it is told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class TestThrottle(unittest.TestCase):
+    """Count submissions against the limits of a Throttle."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.time = throttle.time
+        throttle.time = self.clock
+
+    def tearDown(self):
+        throttle.time = self.time
+
+    def test_unlimited(self):
+        limits = Throttle()
+        self.assertFalse(limits)
+        self.assertIsNone(limits.allowance(100))
+        limits.consume(100)
+        self.assertIsNone(limits.delay())
+
+    def test_invalid(self):
+        for key in Throttle.SETTINGS:
+            self.assertRaises(ValueError, Throttle, **{key: 0})
+            self.assertRaises(ValueError, Throttle, **{key: -1})
+
+    def test_max_in_flight(self):
+        limits = Throttle(max_in_flight=4)
+        self.assertTrue(limits)
+        self.assertEqual(limits.allowance(0), 4)
+        self.assertEqual(limits.allowance(3), 1)
+        self.assertEqual(limits.allowance(6), 0)
+
+    def test_max_submissions(self):
+        limits = Throttle(max_submissions=3)
+        limits.consume(2)
+        self.assertEqual(limits.allowance(0), 1)
+        limits.consume(1)
+        self.assertEqual(limits.allowance(0), 0)
+        limits.tick()
+        self.assertEqual(limits.allowance(0), 3)
+
+    def test_token_bucket(self):
+        limits = Throttle(submit_rate=2)
+        # The bucket starts full, holding the rate rounded up.
+        self.assertEqual(limits.submit_burst, 2)
+        self.assertEqual(limits.allowance(0), 2)
+        self.assertIsNone(limits.delay())
+
+        limits.consume(2)
+        self.assertEqual(limits.allowance(0), 0)
+        self.assertAlmostEqual(limits.delay(), 0.5)
+
+        self.clock.now += 0.25
+        self.assertEqual(limits.allowance(0), 0)
+        self.assertAlmostEqual(limits.delay(), 0.25)
+        self.clock.now += 0.25
+        self.assertEqual(limits.allowance(0), 1)
+        self.assertIsNone(limits.delay())
+
+        # The bucket never holds more than the burst.
+        self.clock.now += 60
+        self.assertEqual(limits.allowance(0), 2)
+
+    def test_fractional_rate(self):
+        limits = Throttle(submit_rate=0.5, submit_burst=3)
+        self.assertEqual(limits.allowance(0), 3)
+        limits.consume(3)
+        self.assertAlmostEqual(limits.delay(), 2.0)
+        self.clock.now += 5
+        self.assertEqual(limits.allowance(0), 2)
+
+    def test_tightest_limit(self):
+        limits = Throttle(max_in_flight=10, max_submissions=5,
+                          submit_rate=3)
+        self.assertEqual(limits.allowance(8), 2)
+        self.assertEqual(limits.allowance(0), 3)
+        limits.consume(3)
+        self.clock.now += 10
+        self.assertEqual(limits.allowance(0), 2)
+
+    def test_pickle(self):
+        limits = Throttle(max_in_flight=4, submit_rate=1.5)
+        limits.consume(2)
+        loaded = pickle.loads(pickle.dumps(limits))
+        self.assertEqual(loaded.settings(),
+                         {"max_in_flight": 4, "submit_rate": 1.5,
+                          "submit_burst": 2})
+        # The token bucket starts over.
+        self.assertEqual(loaded.allowance(0), 2)
+
+
+class TestGraphLimits(FakeSchedulerTest):
+    """Hold ready steps of a graph beyond its limits."""
+
+    def test_max_in_flight(self):
+        dag = build_graph([], names=list("abcde"))
+        dag.set_adapter({"type": "fake", "max_in_flight": 2})
+        self.assertEqual(dag.adapter, {"type": "fake"})
+        self.assertEqual(dag.throttle.settings(), {"max_in_flight": 2})
+
+        self.assertEqual(self.submit(dag), ["a", "b"])
+        self.assertEqual(self.submit(dag), [])
+        self.assertTrue(dag.has_ready_steps())
+        self.report(dag, a=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["c"])
+        self.report(dag, b=State.FINISHED, c=State.FINISHED)
+        self.assertEqual(self.submit(dag), ["d", "e"])
+        self.assertFalse(dag.has_ready_steps())
+
+    def test_set_limits(self):
+        dag = build_graph([], names=list("abc"))
+        dag.set_limits(max_submissions=1)
+        dag.set_limits(max_in_flight=5, submit_rate=None)
+        self.assertEqual(dag.throttle.settings(),
+                         {"max_in_flight": 5, "max_submissions": 1})
+        self.assertRaises(ValueError, dag.set_limits, max_jobs=3)
+        self.assertEqual(self.submit(dag), ["a"])
+        self.assertEqual(self.submit(dag), [])
+        # A status check starts a new tick.
+        dag.poll_steps((JobStatusCode.NOJOBS, {}))
+        self.assertEqual(self.submit(dag), ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()